@@ -0,0 +1,81 @@
+"""Compare AdminGetEvent's batch get against one get_item per event, on moto.
+
+moto answers in-process, so the absolute numbers only show request overhead
+(serialisation, signing, response parsing). Against DynamoDB every request
+also pays a network round trip, which is what BatchGetItem saves most of: N
+sequential gets cost N round trips, a batch of N costs ceil(N / 100).
+
+    python3 benchmarks/bench_batch_get.py --events 50 200 500
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+MAIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAYERS_DIR = os.path.join(MAIN_DIR, 'lambda', 'layers')
+FUNCTIONS_DIR = os.path.join(MAIN_DIR, 'lambda', 'functions')
+
+os.environ.update({
+    'AWS_DEFAULT_REGION': 'ap-southeast-1',
+    'AWS_ACCESS_KEY_ID': 'testing',
+    'AWS_SECRET_ACCESS_KEY': 'testing',
+    'POWERTOOLS_TRACE_DISABLED': 'true',
+    'LOG_LEVEL': 'WARNING',
+    'WEB_ORIGIN': '*',
+    'EVENT_TABLE': 'Event'
+})
+sys.path[:0] = [os.path.join(FUNCTIONS_DIR, 'AdminGetEvent')]
+sys.path.extend(os.path.join(LAYERS_DIR, layer, 'python') for layer in sorted(os.listdir(LAYERS_DIR)))
+
+import boto3
+from moto import mock_dynamodb
+
+def create_table(events):
+    table = boto3.resource('dynamodb').create_table(
+        TableName='Event',
+        KeySchema=[{'AttributeName': 'eventId', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[{'AttributeName': 'eventId', 'AttributeType': 'S'}],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    with table.batch_writer() as writer:
+        for index in range(events):
+            writer.put_item(Item={'eventId': f'event{index}', 'title': f'Event {index}', 'status': 'ACTIVE', 'longDescription': 'x' * 2000})
+    return table
+
+def measure(function, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, nargs='+', default=[50, 200, 500])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f'{"events":>7} {"sequential ms":>14} {"requests":>9} {"batch ms":>9} {"requests":>9} {"projected ms":>13}')
+    for events in args.events:
+        with mock_dynamodb():
+            create_table(events)
+            import lambda_function
+
+            eventIds = [f'event{index}' for index in range(events)]
+            sequential = measure(lambda: [lambda_function.get_event(eventId) for eventId in eventIds], args.runs)
+            batch = measure(lambda: lambda_function.get_events(eventIds), args.runs)
+            projected = measure(lambda: lambda_function.get_events(eventIds, ['title', 'status']), args.runs)
+            print(f'{events:7d} {sequential:14.1f} {events:9d} {batch:9.1f} {-(-events // 100):9d} {projected:13.1f}')
+
+            # The table and its lazily created client belong to this mock
+            del sys.modules['lambda_function']
+            import aws_client_helper
+            aws_client_helper._SESSION = None
+            aws_client_helper._CLIENTS.clear()
+            aws_client_helper._RESOURCES.clear()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Compare cold-import time of the Lambda layers with and without precompiled bytecode.
+
+Each sample runs in a fresh interpreter with bytecode writing disabled, which
+mirrors the read-only /opt mount on Lambda: without shipped pycs every import
+recompiles from source on every cold start.
+
+    python3 benchmarks/bench_cold_import.py --runs 10
+    python3 benchmarks/bench_cold_import.py --runs 10 --prune
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+MAIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAYERS_DIR = os.path.join(MAIN_DIR, 'lambda', 'layers')
+FUNCTIONS_DIR = os.path.join(MAIN_DIR, 'lambda', 'functions')
+PRUNE_SCRIPT = os.path.join(MAIN_DIR, 'cdk_stacks', 'build_scripts', 'prune_layer.py')
+
+# Modules imported at init by the Admin* functions
+COLD_IMPORT_MODULES = [
+    'boto3',
+    'boto3.dynamodb.conditions',
+    'requests',
+    'requests_aws4auth',
+    'simplejson',
+    'aws_lambda_powertools',
+    'http_helper',
+    'enum_helper',
+    'custom_exceptions'
+]
+
+IMPORT_SNIPPET = '''
+import sys, time
+sys.path[:0] = {paths!r}
+start = time.perf_counter()
+for module in {modules!r}:
+    __import__(module)
+print(time.perf_counter() - start)
+'''
+
+def copy_layers(targetDir, compile_, prune=False):
+    layerPaths = []
+    for layer in sorted(os.listdir(LAYERS_DIR)):
+        source = os.path.join(LAYERS_DIR, layer, 'python')
+        if not os.path.isdir(source):
+            continue
+
+        destination = os.path.join(targetDir, layer, 'python')
+        shutil.copytree(source, destination, ignore=shutil.ignore_patterns('__pycache__', '*.pyc'))
+        if prune and layer == 'LambdaBase':
+            subprocess.check_call([
+                sys.executable, PRUNE_SCRIPT, destination,
+                '--sources', FUNCTIONS_DIR, os.path.join(LAYERS_DIR, 'Generic', 'python')
+            ], stdout=subprocess.DEVNULL)
+        if compile_:
+            subprocess.check_call([
+                sys.executable, '-m', 'compileall', '-q', '-j', '0',
+                '--invalidation-mode', 'unchecked-hash', destination
+            ])
+        layerPaths.append(destination)
+
+    return layerPaths
+
+def measure(layerPaths, modules, runs):
+    snippet = IMPORT_SNIPPET.format(paths=layerPaths, modules=modules)
+    samples = []
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, '-B', '-c', snippet], env={**os.environ, 'POWERTOOLS_TRACE_DISABLED': 'true'})
+        samples.append(float(output.strip().splitlines()[-1]) * 1000)
+
+    return samples
+
+def report(label, samples):
+    print(f'{label:<24} median {statistics.median(samples):8.1f} ms   min {min(samples):8.1f} ms   max {max(samples):8.1f} ms')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--modules', nargs='+', default=COLD_IMPORT_MODULES)
+    parser.add_argument('--prune', action='store_true', help='Also measure a pruned and precompiled LambdaBase layer')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as sourceDir, tempfile.TemporaryDirectory() as compiledDir, tempfile.TemporaryDirectory() as prunedDir:
+        sourceSamples = measure(copy_layers(sourceDir, compile_=False), args.modules, args.runs)
+        compiledSamples = measure(copy_layers(compiledDir, compile_=True), args.modules, args.runs)
+        prunedSamples = measure(copy_layers(prunedDir, compile_=True, prune=True), args.modules, args.runs) if args.prune else None
+
+    print(f'Cold import of {len(args.modules)} modules, {args.runs} runs, {sys.implementation.cache_tag}')
+    report('source only', sourceSamples)
+    report('precompiled bytecode', compiledSamples)
+    if prunedSamples:
+        report('pruned + precompiled', prunedSamples)
+    print(f'speedup                  {statistics.median(sourceSamples) / statistics.median(compiledSamples):8.2f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Measure how much work the Admin* handlers do at import time.
+
+Clients and tables come from the Generic layer's aws_client_helper and are
+only built on first use, so the import (Lambda init phase) no longer pays for
+boto3 session, service model and endpoint setup. For each handler this prints
+the module import time and the time spent materialising its table afterwards,
+which is what the old module-level boto3.resource('dynamodb').Table() cost.
+
+    python3 benchmarks/bench_handler_init.py --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+MAIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAYERS_DIR = os.path.join(MAIN_DIR, 'lambda', 'layers')
+FUNCTIONS_DIR = os.path.join(MAIN_DIR, 'lambda', 'functions')
+
+DYNAMODB_HANDLERS = ['AdminCreateEvent', 'AdminGetEvent', 'AdminUpdateEvent', 'AdminDeleteEvent']
+
+INIT_SNIPPET = '''
+import sys, time
+sys.path[:0] = {paths!r}
+start = time.perf_counter()
+import lambda_function
+imported = time.perf_counter()
+lambda_function.EVENT_DDB_TABLE.name
+print(imported - start, time.perf_counter() - imported)
+'''
+
+BENCH_ENVIRONMENT = {
+    'AWS_DEFAULT_REGION': 'ap-southeast-1',
+    'AWS_ACCESS_KEY_ID': 'testing',
+    'AWS_SECRET_ACCESS_KEY': 'testing',
+    'POWERTOOLS_TRACE_DISABLED': 'true',
+    'WEB_ORIGIN': '*',
+    'EVENT_TABLE': 'Event'
+}
+
+def measure(functionName, runs):
+    layerPaths = [os.path.join(LAYERS_DIR, layer, 'python') for layer in sorted(os.listdir(LAYERS_DIR))]
+    snippet = INIT_SNIPPET.format(paths=[os.path.join(FUNCTIONS_DIR, functionName)] + layerPaths)
+
+    importSamples, deferredSamples = [], []
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, '-c', snippet], env={**os.environ, **BENCH_ENVIRONMENT})
+        importTime, deferredTime = output.decode().strip().splitlines()[-1].split()
+        importSamples.append(float(importTime) * 1000)
+        deferredSamples.append(float(deferredTime) * 1000)
+
+    return statistics.median(importSamples), statistics.median(deferredSamples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f'{"handler":<20} {"import ms":>10} {"deferred ms":>12} {"init saved":>11}')
+    for functionName in DYNAMODB_HANDLERS:
+        importTime, deferredTime = measure(functionName, args.runs)
+        saved = deferredTime / (importTime + deferredTime) * 100
+        print(f'{functionName:<20} {importTime:10.1f} {deferredTime:12.1f} {saved:10.1f}%')
+
+if __name__ == '__main__':
+    main()
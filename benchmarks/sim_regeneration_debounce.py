@@ -0,0 +1,115 @@
+"""Simulate how many public site rebuilds the coalesced regeneration trigger saves.
+
+Admin edits arrive in bursts on a simulated clock. Each edit calls
+codepipeline_helper.triggerPublicWebRegeneration against a moto DynamoDB state
+table and a fake pipeline that stays InProgress for --pipeline-seconds. The
+scheduled PublicWebRegeneration flush runs every --flush-seconds. Reports the
+executions started with and without a state table, and how long the last edit
+of each burst waited for a run that includes it.
+
+    python3 benchmarks/sim_regeneration_debounce.py
+    python3 benchmarks/sim_regeneration_debounce.py --bursts 20 --edits-per-burst 50 --debounce-seconds 120
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+
+MAIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAYERS_DIR = os.path.join(MAIN_DIR, 'lambda', 'layers')
+
+os.environ.update({
+    'AWS_DEFAULT_REGION': 'ap-southeast-1',
+    'AWS_ACCESS_KEY_ID': 'testing',
+    'AWS_SECRET_ACCESS_KEY': 'testing',
+    'POWERTOOLS_TRACE_DISABLED': 'true',
+    'LOG_LEVEL': 'WARNING'
+})
+sys.path.extend(os.path.join(LAYERS_DIR, layer, 'python') for layer in sorted(os.listdir(LAYERS_DIR)))
+
+import boto3
+from moto import mock_dynamodb
+
+import codepipeline_helper
+from codepipeline_helper import triggerPublicWebRegeneration, flushPublicWebRegeneration
+
+PIPELINE_NAME = 'PublicWeb'
+
+class FakePipeline(object):
+    # Records start times, an execution is InProgress for `duration` seconds
+
+    def __init__(self, duration):
+        self.duration = duration
+        self.now = 0
+        self.starts = []
+
+    def start_pipeline_execution(self, name):
+        self.starts.append(self.now)
+        return {'pipelineExecutionId': str(len(self.starts))}
+
+    def list_pipeline_executions(self, pipelineName, maxResults=None):
+        return {'pipelineExecutionSummaries': [
+            {'status': 'InProgress' if self.now < start + self.duration else 'Succeeded'}
+            for start in reversed(self.starts)
+        ][:maxResults]}
+
+def edit_times(bursts, editsPerBurst, burstSeconds, quietSeconds, seed):
+    rng = random.Random(seed)
+    times, burstEnds, start = [], [], 0
+    for _ in range(bursts):
+        burst = sorted(start + rng.uniform(0, burstSeconds) for _ in range(editsPerBurst))
+        times.extend(burst)
+        burstEnds.append(burst[-1])
+        start += burstSeconds + quietSeconds
+    return times, burstEnds
+
+def simulate(times, burstEnds, args, table=None):
+    pipeline = FakePipeline(args.pipeline_seconds)
+    codepipeline_helper.CODE_PIPELINE_CLIENT = pipeline
+
+    flushes = [second for second in range(0, int(times[-1]) + args.pipeline_seconds * 4, args.flush_seconds)]
+    calls = sorted([(time, 'edit') for time in times] + ([(second, 'flush') for second in flushes] if table else []))
+    for time, kind in calls:
+        pipeline.now = time
+        if kind == 'edit':
+            triggerPublicWebRegeneration(PIPELINE_NAME, table, now=time, debounceSeconds=args.debounce_seconds)
+        else:
+            flushPublicWebRegeneration(PIPELINE_NAME, table, now=time, debounceSeconds=args.debounce_seconds)
+
+    # A run includes every edit made before it started
+    waits = [min(start for start in pipeline.starts if start >= end) - end for end in burstEnds]
+    return len(pipeline.starts), waits
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bursts', type=int, default=10)
+    parser.add_argument('--edits-per-burst', type=int, default=50)
+    parser.add_argument('--burst-seconds', type=int, default=300)
+    parser.add_argument('--quiet-seconds', type=int, default=1800)
+    parser.add_argument('--debounce-seconds', type=int, default=60)
+    parser.add_argument('--flush-seconds', type=int, default=60)
+    parser.add_argument('--pipeline-seconds', type=int, default=240)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    times, burstEnds = edit_times(args.bursts, args.edits_per_burst, args.burst_seconds, args.quiet_seconds, args.seed)
+
+    with mock_dynamodb():
+        table = boto3.resource('dynamodb').create_table(
+            TableName='PublicWebRegeneration',
+            KeySchema=[{'AttributeName': 'pipelineName', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'pipelineName', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        naiveRuns, naiveWaits = simulate(times, burstEnds, args)
+        coalescedRuns, coalescedWaits = simulate(times, burstEnds, args, table)
+
+    print(f'{len(times)} edits in {args.bursts} bursts, debounce {args.debounce_seconds}s, flush every {args.flush_seconds}s, pipeline {args.pipeline_seconds}s')
+    print(f'{"trigger":>10} {"runs":>6} {"median wait s":>14} {"max wait s":>11}')
+    for name, runs, waits in [('per edit', naiveRuns, naiveWaits), ('coalesced', coalescedRuns, coalescedWaits)]:
+        print(f'{name:>10} {runs:>6} {statistics.median(waits):>14.1f} {max(waits):>11.1f}')
+    print(f'{naiveRuns - coalescedRuns} runs saved ({(naiveRuns - coalescedRuns) / naiveRuns:.0%})')
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,17 @@
 import aws_cdk as cdk
 from aws_cdk import aws_iam as iam
 from aws_cdk import aws_ssm as ssm
+from aws_cdk import aws_ec2 as ec2
+from aws_cdk import aws_sqs as sqs
+from aws_cdk import aws_events as events
+from aws_cdk import aws_events_targets as events_targets
 from aws_cdk import aws_lambda as lambda_
+from aws_cdk import aws_dynamodb as dynamodb
+from aws_cdk import aws_lambda_event_sources as lambda_event_sources
 
 from datetime import datetime
 from constructs import Construct
+from cdk_stacks.layer_build import lambda_architecture, source_bundling
 
 class AdminLambdaStack(cdk.Stack):
 
@@ -13,9 +20,52 @@ class AdminLambdaStack(cdk.Stack):
 
         # Parameters
         lambda_dir = './lambda/functions/'
+        runtime = lambda_.Runtime.PYTHON_3_8
+        architecture = lambda_architecture(self)
         LambdaBaseLayerArn = ssm.StringParameter.from_string_parameter_name(self, 'LambdaBaseLayerArn', 'LambdaBaseLayerArn').string_value
         GenericLayerArn = ssm.StringParameter.from_string_parameter_name(self, 'GenericLayerArn', 'GenericLayerArn').string_value
         OpenSearchEndpoint = ssm.StringParameter.from_string_parameter_name(self, 'OpenSearchDomainEndpoint', 'OpenSearchDomainEndpoint').string_value
+        EventTableStreamArn = ssm.StringParameter.from_string_parameter_name(self, 'EventTableStreamArn', 'EventTableStreamArn').string_value
+
+        # Public site regeneration is only wired up when its pipeline is named,
+        # e.g. cdk deploy -c publicWebPipelineName=PublicWeb. With a manifest
+        # bucket (-c publicWebManifestBucket=...) each run gets a change manifest.
+        PublicWebPipelineName = self.node.try_get_context('publicWebPipelineName')
+        PublicWebManifestBucket = self.node.try_get_context('publicWebManifestBucket')
+        RegenerationEnvironment = {
+            'PUBLIC_WEB_PIPELINE_NAME': PublicWebPipelineName,
+            'REGENERATION_TABLE': 'PublicWebRegeneration',
+            'REGENERATION_DEBOUNCE_SECONDS': '60',
+            **({'REGENERATION_MANIFEST_BUCKET': PublicWebManifestBucket} if PublicWebManifestBucket else {})
+        } if PublicWebPipelineName else {}
+
+        # The Redis read-through cache is opt-in. Without -c redisHost=... the
+        # functions stay outside any VPC and read straight from DynamoDB/OpenSearch.
+        # With it, the functions that use the cache join the Redis VPC through
+        # -c redisVpcId=... -c redisSubnetIds=subnet-a,subnet-b -c redisSecurityGroupId=...
+        RedisHost = self.node.try_get_context('redisHost')
+        CacheEnvironment = {}
+        CacheNetworking = {}
+        if RedisHost:
+            RedisVpcId = self.node.try_get_context('redisVpcId')
+            RedisSubnetIds = self.node.try_get_context('redisSubnetIds')
+            RedisSecurityGroupId = self.node.try_get_context('redisSecurityGroupId')
+            if not (RedisVpcId and RedisSubnetIds and RedisSecurityGroupId):
+                raise ValueError('redisHost also needs redisVpcId, redisSubnetIds and redisSecurityGroupId')
+
+            CacheEnvironment = {
+                'REDIS_HOST': RedisHost,
+                'REDIS_PORT': str(self.node.try_get_context('redisPort') or 6379),
+                'REDIS_SSL': str(self.node.try_get_context('redisSsl') or 'false').lower()
+            }
+            CacheNetworking = {
+                'vpc': ec2.Vpc.from_vpc_attributes(self, 'RedisVpc', vpc_id=RedisVpcId, availability_zones=[]),
+                'vpc_subnets': ec2.SubnetSelection(subnets=[
+                    ec2.Subnet.from_subnet_id(self, f'RedisSubnet{index}', subnetId.strip())
+                    for index, subnetId in enumerate(RedisSubnetIds.split(','))
+                ]),
+                'security_groups': [ec2.SecurityGroup.from_security_group_id(self, 'RedisSecurityGroup', RedisSecurityGroupId)]
+            }
 
         # Datetime now
         now = datetime.now().strftime('%Y-%m-%dT%H:%M:%S.%fZ')
@@ -31,10 +81,80 @@ class AdminLambdaStack(cdk.Stack):
                 iam.ManagedPolicy.from_managed_policy_arn(self, 'AmazonDynamoDBFullAccess', 'arn:aws:iam::aws:policy/AmazonDynamoDBFullAccess'),
                 iam.ManagedPolicy.from_managed_policy_arn(self, 'AmazonS3FullAccess', 'arn:aws:iam::aws:policy/AmazonS3FullAccess'),
                 iam.ManagedPolicy.from_managed_policy_arn(self, 'AmazonOpenSearchServiceFullAccess', 'arn:aws:iam::aws:policy/AmazonOpenSearchServiceFullAccess'),
+                iam.ManagedPolicy.from_managed_policy_arn(self, 'AmazonSQSFullAccess', 'arn:aws:iam::aws:policy/AmazonSQSFullAccess'),
+                iam.ManagedPolicy.from_managed_policy_arn(self, 'AWSCodePipelineFullAccess', 'arn:aws:iam::aws:policy/AWSCodePipeline_FullAccess'),
                 iam.ManagedPolicy.from_managed_policy_arn(self, 'AWSLambdaVPCAccessExecutionRole', 'arn:aws:iam::aws:policy/service-role/AWSLambdaVPCAccessExecutionRole')
             ]
         )
 
+        EventStreamIndexerRole = iam.Role(
+            self, 'EventStreamIndexerRole',
+            role_name='EventStreamIndexerRole',
+            assumed_by=iam.ServicePrincipal('lambda.amazonaws.com'),
+            description='IAM Role to be used by the Event Table Stream Triggered Lambda Function',
+            managed_policies=[
+                iam.ManagedPolicy.from_managed_policy_arn(self, 'IndexerAWSXrayWriteOnlyAccess', 'arn:aws:iam::aws:policy/AWSXrayWriteOnlyAccess'),
+                iam.ManagedPolicy.from_managed_policy_arn(self, 'IndexerAmazonDynamoDBFullAccess', 'arn:aws:iam::aws:policy/AmazonDynamoDBFullAccess'),
+                iam.ManagedPolicy.from_managed_policy_arn(self, 'IndexerAmazonOpenSearchServiceFullAccess', 'arn:aws:iam::aws:policy/AmazonOpenSearchServiceFullAccess'),
+                iam.ManagedPolicy.from_managed_policy_arn(self, 'IndexerAWSLambdaVPCAccessExecutionRole', 'arn:aws:iam::aws:policy/service-role/AWSLambdaVPCAccessExecutionRole')
+            ]
+        )
+
+        # DynamoDB Tables
+        EventTable = dynamodb.Table.from_table_attributes(
+            self, 'EventTable',
+            table_name='Event',
+            table_stream_arn=EventTableStreamArn
+        )
+
+        # Segment progress of EventReindex runs, so an interrupted run resumes
+        ReindexCheckpointTable = dynamodb.Table(
+            self, 'ReindexCheckpointTable',
+            table_name='ReindexCheckpoint',
+            partition_key=dynamodb.Attribute(name='checkpointId', type=dynamodb.AttributeType.STRING),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=cdk.RemovalPolicy.RETAIN
+        )
+        ReindexCheckpointTable.grant_read_write_data(EventStreamIndexerRole)
+
+        # Pending public site changes and the debounce window, one item per pipeline
+        if PublicWebPipelineName:
+            PublicWebRegenerationTable = dynamodb.Table(
+                self, 'PublicWebRegenerationTable',
+                table_name='PublicWebRegeneration',
+                partition_key=dynamodb.Attribute(name='pipelineName', type=dynamodb.AttributeType.STRING),
+                billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+                removal_policy=cdk.RemovalPolicy.RETAIN
+            )
+            PublicWebRegenerationTable.grant_read_write_data(ApiGatewayAdminLambdaRole)
+            RegenerationEnvironment['REGENERATION_TABLE'] = PublicWebRegenerationTable.table_name
+
+        # SQS Queues
+        # Bulk deletes that run out of time checkpoint the remaining eventIds here
+        EventBulkDeleteDLQ = sqs.Queue(
+            self, 'EventBulkDeleteDLQ',
+            queue_name='EventBulkDeleteDLQ',
+            retention_period=cdk.Duration.days(14)
+        )
+
+        EventBulkDeleteQueue = sqs.Queue(
+            self, 'EventBulkDeleteQueue',
+            queue_name='EventBulkDeleteQueue',
+            visibility_timeout=cdk.Duration.seconds(180),
+            dead_letter_queue=sqs.DeadLetterQueue(max_receive_count=3, queue=EventBulkDeleteDLQ)
+        )
+
+        # Stream records the indexer still fails on after every retry are kept
+        # here instead of being dropped, so the index drift can be replayed
+        EventStreamIndexerDLQ = sqs.Queue(
+            self, 'EventStreamIndexerDLQ',
+            queue_name='EventStreamIndexerDLQ',
+            retention_period=cdk.Duration.days(14)
+        )
+        # The functions get their roles without policy updates, so the grant
+        # the on-failure destination would add is made on the role itself
+        EventStreamIndexerDLQ.grant_send_messages(EventStreamIndexerRole)
+
         # Lambda Layers
         LambdaBaseLayer = lambda_.LayerVersion.from_layer_version_arn(
             self, 'LambdaBaseLayer',
@@ -50,15 +170,18 @@ class AdminLambdaStack(cdk.Stack):
         AdminCreateEvent = lambda_.Function(
             self, 'AdminCreateEvent',
             function_name='AdminCreateEvent',
-            runtime=lambda_.Runtime.PYTHON_3_8,
+            runtime=runtime,
+            architecture=architecture,
             handler='lambda_function.lambda_handler',
-            code=lambda_.Code.from_asset(lambda_dir + 'AdminCreateEvent'),
+            code=self.function_code(lambda_dir + 'AdminCreateEvent', runtime, architecture),
             layers=[LambdaBaseLayer, GenericLayer],
             description="Function to Create Event in Admin Portal",
             role=ApiGatewayAdminLambdaRole.without_policy_updates(),
             environment={
                 'WEB_ORIGIN': '*',
-                'EVENT_TABLE': 'Event'
+                'EVENT_TABLE': 'Event',
+                'MODEL_CACHE_ENABLED': 'true',
+                **RegenerationEnvironment
             },
             timeout=cdk.Duration.seconds(30),
             tracing=lambda_.Tracing.ACTIVE,
@@ -68,16 +191,20 @@ class AdminLambdaStack(cdk.Stack):
         AdminGetEvent = lambda_.Function(
             self, 'AdminGetEvent',
             function_name='AdminGetEvent',
-            runtime=lambda_.Runtime.PYTHON_3_8,
+            runtime=runtime,
+            architecture=architecture,
             handler='lambda_function.lambda_handler',
-            code=lambda_.Code.from_asset(lambda_dir + 'AdminGetEvent'),
+            code=self.function_code(lambda_dir + 'AdminGetEvent', runtime, architecture),
             layers=[LambdaBaseLayer, GenericLayer],
             description="Function to Get Event in Admin Portal",
             role=ApiGatewayAdminLambdaRole.without_policy_updates(),
             environment={
                 'WEB_ORIGIN': '*',
-                'EVENT_TABLE': 'Event'
+                'EVENT_TABLE': 'Event',
+                'MODEL_CACHE_ENABLED': 'true',
+                **CacheEnvironment
             },
+            **CacheNetworking,
             timeout=cdk.Duration.seconds(30),
             tracing=lambda_.Tracing.ACTIVE,
             memory_size=512
@@ -86,16 +213,21 @@ class AdminLambdaStack(cdk.Stack):
         AdminUpdateEvent = lambda_.Function(
             self, 'AdminUpdateEvent',
             function_name='AdminUpdateEvent',
-            runtime=lambda_.Runtime.PYTHON_3_8,
+            runtime=runtime,
+            architecture=architecture,
             handler='lambda_function.lambda_handler',
-            code=lambda_.Code.from_asset(lambda_dir + 'AdminUpdateEvent'),
+            code=self.function_code(lambda_dir + 'AdminUpdateEvent', runtime, architecture),
             layers=[LambdaBaseLayer, GenericLayer],
             description="Function to Update Event in Admin Portal",
             role=ApiGatewayAdminLambdaRole.without_policy_updates(),
             environment={
                 'WEB_ORIGIN': '*',
-                'EVENT_TABLE': 'Event'
+                'EVENT_TABLE': 'Event',
+                'MODEL_CACHE_ENABLED': 'true',
+                **RegenerationEnvironment,
+                **CacheEnvironment
             },
+            **CacheNetworking,
             timeout=cdk.Duration.seconds(30),
             tracing=lambda_.Tracing.ACTIVE,
             memory_size=512
@@ -104,35 +236,145 @@ class AdminLambdaStack(cdk.Stack):
         AdminDeleteEvent = lambda_.Function(
             self, 'AdminDeleteEvent',
             function_name='AdminDeleteEvent',
-            runtime=lambda_.Runtime.PYTHON_3_8,
+            runtime=runtime,
+            architecture=architecture,
             handler='lambda_function.lambda_handler',
-            code=lambda_.Code.from_asset(lambda_dir + 'AdminDeleteEvent'),
+            code=self.function_code(lambda_dir + 'AdminDeleteEvent', runtime, architecture),
             layers=[LambdaBaseLayer, GenericLayer],
             description="Function to Delete Event in Admin Portal",
             role=ApiGatewayAdminLambdaRole.without_policy_updates(),
             environment={
                 'WEB_ORIGIN': '*',
-                'EVENT_TABLE': 'Event'
+                'EVENT_TABLE': 'Event',
+                'BULK_DELETE_QUEUE_URL': EventBulkDeleteQueue.queue_url,
+                'BULK_DELETE_CONCURRENCY': '16',
+                'MODEL_CACHE_ENABLED': 'true',
+                **RegenerationEnvironment,
+                **CacheEnvironment
             },
+            **CacheNetworking,
             timeout=cdk.Duration.seconds(30),
             tracing=lambda_.Tracing.ACTIVE,
             memory_size=512
         )
 
+        # One checkpoint per invocation, so each gets the whole timeout
+        AdminDeleteEvent.add_event_source(lambda_event_sources.SqsEventSource(
+            EventBulkDeleteQueue,
+            batch_size=1,
+            report_batch_item_failures=True
+        ))
+
         AdminListEvents = lambda_.Function(
             self, 'AdminListEvents',
             function_name='AdminListEvents',
-            runtime=lambda_.Runtime.PYTHON_3_8,
+            runtime=runtime,
+            architecture=architecture,
             handler='lambda_function.lambda_handler',
-            code=lambda_.Code.from_asset(lambda_dir + 'AdminListEvents'),
+            code=self.function_code(lambda_dir + 'AdminListEvents', runtime, architecture),
             layers=[LambdaBaseLayer, GenericLayer],
             description="Function to List Events in Admin Portal",
             role=ApiGatewayAdminLambdaRole.without_policy_updates(),
             environment={
                 'WEB_ORIGIN': '*',
-                'ES_DOMAIN_ENDPOINT': OpenSearchEndpoint
+                'ES_DOMAIN_ENDPOINT': OpenSearchEndpoint,
+                **CacheEnvironment
             },
+            **CacheNetworking,
             timeout=cdk.Duration.seconds(30),
             tracing=lambda_.Tracing.ACTIVE,
             memory_size=512
         )
+
+        EventStreamIndexer = lambda_.Function(
+            self, 'EventStreamIndexer',
+            function_name='EventStreamIndexer',
+            runtime=runtime,
+            architecture=architecture,
+            handler='lambda_function.lambda_handler',
+            code=self.function_code(lambda_dir + 'EventStreamIndexer', runtime, architecture),
+            layers=[LambdaBaseLayer, GenericLayer],
+            description="Function to Index Event Table Changes into OpenSearch",
+            role=EventStreamIndexerRole.without_policy_updates(),
+            environment={
+                'ES_DOMAIN_ENDPOINT': OpenSearchEndpoint,
+                'BULK_CHUNK_SIZE': '500',
+                **CacheEnvironment
+            },
+            **CacheNetworking,
+            timeout=cdk.Duration.seconds(60),
+            tracing=lambda_.Tracing.ACTIVE,
+            memory_size=512
+        )
+
+        # Failed documents are reported per record, so only the batch tail from
+        # the first failure is retried. A batch that keeps failing as a whole is
+        # split in halves to isolate a poison record, which ends up on the DLQ
+        # after the last retry.
+        EventStreamIndexer.add_event_source(lambda_event_sources.DynamoEventSource(
+            EventTable,
+            starting_position=lambda_.StartingPosition.TRIM_HORIZON,
+            batch_size=1000,
+            max_batching_window=cdk.Duration.seconds(1),
+            report_batch_item_failures=True,
+            bisect_batch_on_error=True,
+            retry_attempts=10,
+            on_failure=lambda_event_sources.SqsDlq(EventStreamIndexerDLQ)
+        ))
+
+        EventReindex = lambda_.Function(
+            self, 'EventReindex',
+            function_name='EventReindex',
+            runtime=runtime,
+            architecture=architecture,
+            handler='lambda_function.lambda_handler',
+            code=self.function_code(lambda_dir + 'EventReindex', runtime, architecture),
+            layers=[LambdaBaseLayer, GenericLayer],
+            description="Function to Rebuild the OpenSearch Event Index from the Event Table",
+            role=EventStreamIndexerRole.without_policy_updates(),
+            environment={
+                'EVENT_TABLE': 'Event',
+                'CHECKPOINT_TABLE': ReindexCheckpointTable.table_name,
+                'ES_DOMAIN_ENDPOINT': OpenSearchEndpoint,
+                'REINDEX_TOTAL_SEGMENTS': '8',
+                'MODEL_CACHE_ENABLED': 'true'
+            },
+            timeout=cdk.Duration.minutes(15),
+            tracing=lambda_.Tracing.ACTIVE,
+            memory_size=1024
+        )
+
+        if PublicWebPipelineName:
+            PublicWebRegeneration = lambda_.Function(
+                self, 'PublicWebRegeneration',
+                function_name='PublicWebRegeneration',
+                runtime=runtime,
+                architecture=architecture,
+                handler='lambda_function.lambda_handler',
+                code=self.function_code(lambda_dir + 'PublicWebRegeneration', runtime, architecture),
+                layers=[LambdaBaseLayer, GenericLayer],
+                description="Function to Publish Pending Event Changes to the Public Site",
+                role=ApiGatewayAdminLambdaRole.without_policy_updates(),
+                environment={
+                    **RegenerationEnvironment,
+                    'MODEL_CACHE_ENABLED': 'true'
+                },
+                timeout=cdk.Duration.seconds(30),
+                tracing=lambda_.Tracing.ACTIVE,
+                memory_size=256
+            )
+
+            # Starts the run for edits that fell inside a debounce window once it has passed
+            events.Rule(
+                self, 'PublicWebRegenerationSchedule',
+                rule_name='PublicWebRegenerationSchedule',
+                schedule=events.Schedule.rate(cdk.Duration.minutes(1)),
+                targets=[events_targets.LambdaFunction(PublicWebRegeneration)]
+            )
+
+    def function_code(self, functionPath, runtime, architecture):
+        return lambda_.Code.from_asset(
+            functionPath,
+            exclude=['**/__pycache__'],
+            bundling=source_bundling(runtime, architecture)
+        )
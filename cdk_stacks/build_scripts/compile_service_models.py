@@ -0,0 +1,63 @@
+"""Precompile botocore and boto3 model JSON files into marshal caches.
+
+Each <name>.json under botocore/data and boto3/data gets a <name>.marshal
+sibling holding (format, botocore version, data). The Generic layer's
+model_cache_helper.MarshalFileLoader reads it at runtime and falls back to the
+JSON file when the version does not match. marshal output is specific to the
+interpreter version, so this must run with the runtime's own Python.
+"""
+import argparse
+import gzip
+import json
+import marshal
+import os
+import sys
+
+MODEL_CACHE_EXTENSION = '.marshal'
+MODEL_CACHE_FORMAT = 1
+MODEL_DATA_DIRS = ('botocore/data', 'boto3/data')
+
+def load_json(path):
+    openMethod = gzip.open if path.endswith('.gz') else open
+    with openMethod(path, 'rb') as fp:
+        return json.loads(fp.read().decode('utf-8'))
+
+def compile_models(targetDir, botocoreVersion):
+    compiled, jsonBytes, cacheBytes = 0, 0, 0
+    for dataDir in MODEL_DATA_DIRS:
+        for root, _, files in os.walk(os.path.join(targetDir, dataDir)):
+            for fileName in files:
+                if fileName.endswith('.json'):
+                    basePath = os.path.join(root, fileName[:-len('.json')])
+                elif fileName.endswith('.json.gz'):
+                    basePath = os.path.join(root, fileName[:-len('.json.gz')])
+                else:
+                    continue
+
+                sourcePath = os.path.join(root, fileName)
+                payload = marshal.dumps((MODEL_CACHE_FORMAT, botocoreVersion, load_json(sourcePath)))
+                with open(basePath + MODEL_CACHE_EXTENSION, 'wb') as fp:
+                    fp.write(payload)
+
+                compiled += 1
+                jsonBytes += os.path.getsize(sourcePath)
+                cacheBytes += len(payload)
+
+    return {'models': compiled, 'jsonBytes': jsonBytes, 'marshalBytes': cacheBytes}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('target', help='Directory the layer dependencies were installed into')
+    args = parser.parse_args()
+
+    targetDir = os.path.abspath(args.target)
+    sys.path.insert(0, targetDir)
+    import botocore
+
+    result = compile_models(targetDir, botocore.__version__)
+    result['botocoreVersion'] = botocore.__version__
+    print('[service-model-cache] ' + json.dumps(result))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
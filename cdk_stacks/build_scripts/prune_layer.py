@@ -0,0 +1,246 @@
+"""Prune a dependencies layer down to what the Lambda functions can reach.
+
+Walks the imports of the function and Generic layer sources through the
+installed packages, removes top-level packages (and their dist-info) that are
+never imported, and drops every botocore/boto3 service model that is not
+created with a client or resource call in the sources.
+"""
+import argparse
+import ast
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+# Calls whose first string argument names an AWS service, e.g. boto3.client('dynamodb')
+# or the Generic layer's aws_client_helper.GetClient('codepipeline')
+CLIENT_FACTORY_NAMES = {'client', 'resource', 'GetClient', 'GetResource', 'LazyClient'}
+
+# Calls that always reach a fixed service
+SERVICE_FACTORY_NAMES = {'GetTable': 'dynamodb'}
+
+# Services used without an explicit client call in the sources: credential
+# providers (sts) and the X-Ray sampling rule poller created by powertools Tracer
+ALWAYS_KEPT_SERVICES = {'sts', 'xray'}
+
+# Layer entries that are never imported at runtime
+ALWAYS_REMOVED_ENTRIES = {'bin'}
+
+# Python 2 compatibility packages. Dependencies only import them from optional
+# plugins that never load on Lambda (e.g. aws_xray_sdk's EC2 plugin), so they
+# are kept only when the sources import them directly
+PYTHON2_COMPAT_PACKAGES = {'future', 'past', 'libfuturize', 'libpasteurize'}
+
+LIST_SERVICES_SNIPPET = '''
+import sys, time
+sys.path.insert(0, {target!r})
+from botocore.loaders import Loader
+start = time.perf_counter()
+services = Loader().list_available_services('service-2')
+print(len(services), (time.perf_counter() - start) * 1000)
+'''
+
+def iter_python_files(path):
+    if os.path.isfile(path):
+        if path.endswith('.py'):
+            yield path
+        return
+
+    for root, dirs, files in os.walk(path):
+        dirs[:] = [directory for directory in dirs if directory != '__pycache__']
+        for fileName in files:
+            if fileName.endswith('.py'):
+                yield os.path.join(root, fileName)
+
+def parse_file(filePath):
+    with open(filePath, 'rb') as fp:
+        try:
+            return ast.parse(fp.read(), filePath)
+        except (SyntaxError, ValueError):
+            # Python 2 only modules shipped by compatibility packages
+            return None
+
+def referenced_names(tree):
+    # Top-level module names imported anywhere in the file (including function
+    # bodies and try/except fallbacks) plus bare string constants, which is how
+    # lazy importers such as powertools' LazyLoader refer to modules
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split('.')[0])
+        elif isinstance(node, ast.Constant) and isinstance(node.value, str) and node.value.isidentifier():
+            names.add(node.value)
+    return names
+
+def referenced_services(tree):
+    services = set()
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call) or not node.args:
+            continue
+
+        func = node.func
+        funcName = func.attr if isinstance(func, ast.Attribute) else getattr(func, 'id', None)
+        if funcName in SERVICE_FACTORY_NAMES:
+            services.add(SERVICE_FACTORY_NAMES[funcName])
+
+        firstArg = node.args[0]
+        if funcName in CLIENT_FACTORY_NAMES and isinstance(firstArg, ast.Constant) and isinstance(firstArg.value, str):
+            services.add(firstArg.value)
+    return services
+
+def layer_entries(targetDir):
+    # Map importable top-level names to their path inside the layer
+    entries = {}
+    for entry in os.listdir(targetDir):
+        path = os.path.join(targetDir, entry)
+        if entry.endswith(('.dist-info', '.egg-info')):
+            continue
+        if os.path.isdir(path) and entry.isidentifier():
+            entries[entry] = path
+        elif entry.endswith('.py'):
+            entries[entry[:-3]] = path
+    return entries
+
+def reachable_entries(targetDir, sourcePaths):
+    entries = layer_entries(targetDir)
+
+    pending = set()
+    for sourcePath in sourcePaths:
+        for filePath in iter_python_files(sourcePath):
+            tree = parse_file(filePath)
+            if tree:
+                pending |= referenced_names(tree) & entries.keys()
+
+    reachable = set()
+    while pending:
+        name = pending.pop()
+        reachable.add(name)
+        for filePath in iter_python_files(entries[name]):
+            tree = parse_file(filePath)
+            if tree:
+                pending |= (referenced_names(tree) & entries.keys()) - reachable - PYTHON2_COMPAT_PACKAGES
+
+    return reachable, entries
+
+def source_services(sourcePaths):
+    services = set(ALWAYS_KEPT_SERVICES)
+    for sourcePath in sourcePaths:
+        for filePath in iter_python_files(sourcePath):
+            tree = parse_file(filePath)
+            if tree:
+                services |= referenced_services(tree)
+    return services
+
+def dist_info_owners(targetDir):
+    # Top-level names each installed distribution owns, read from its RECORD
+    owners = {}
+    for entry in os.listdir(targetDir):
+        if not entry.endswith('.dist-info'):
+            continue
+
+        topLevels = set()
+        recordPath = os.path.join(targetDir, entry, 'RECORD')
+        if os.path.isfile(recordPath):
+            with open(recordPath) as fp:
+                for line in fp:
+                    topLevel = line.split(',')[0].split('/')[0]
+                    if topLevel.endswith('.py'):
+                        topLevel = topLevel[:-3]
+                    if topLevel and not topLevel.endswith('.dist-info') and topLevel not in ('..', '__pycache__'):
+                        topLevels.add(topLevel)
+        owners[entry] = topLevels
+    return owners
+
+def remove_path(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+def prune_service_models(dataDir, services):
+    removed = []
+    if not os.path.isdir(dataDir):
+        return removed
+
+    for entry in os.listdir(dataDir):
+        path = os.path.join(dataDir, entry)
+        if os.path.isdir(path) and entry not in services:
+            shutil.rmtree(path)
+            removed.append(entry)
+    return removed
+
+def directory_size(path):
+    totalBytes, totalFiles = 0, 0
+    for root, _, files in os.walk(path):
+        for fileName in files:
+            filePath = os.path.join(root, fileName)
+            if not os.path.islink(filePath):
+                totalBytes += os.path.getsize(filePath)
+                totalFiles += 1
+    return totalBytes, totalFiles
+
+def time_list_available_services(targetDir):
+    try:
+        output = subprocess.check_output([sys.executable, '-B', '-c', LIST_SERVICES_SNIPPET.format(target=targetDir)])
+    except subprocess.CalledProcessError:
+        return None
+    count, elapsed = output.decode().split()
+    return int(count), float(elapsed)
+
+def prune_layer(targetDir, sourcePaths, extraServices=()):
+    reachable, entries = reachable_entries(targetDir, sourcePaths)
+    services = source_services(sourcePaths) | set(extraServices)
+
+    removedPackages = sorted(set(entries) - reachable)
+    for name in removedPackages:
+        remove_path(entries[name])
+
+    for name in ALWAYS_REMOVED_ENTRIES:
+        remove_path(os.path.join(targetDir, name))
+
+    for distInfo, topLevels in dist_info_owners(targetDir).items():
+        if topLevels and not topLevels & reachable:
+            remove_path(os.path.join(targetDir, distInfo))
+
+    removedServices = []
+    for dataDir in ('botocore/data', 'boto3/data'):
+        removedServices += prune_service_models(os.path.join(targetDir, dataDir), services)
+
+    return {
+        'keptServices': sorted(services),
+        'removedPackages': removedPackages,
+        'removedServiceModels': len(removedServices)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('target', help='Directory the layer dependencies were installed into')
+    parser.add_argument('--sources', nargs='+', required=True, help='Function and shared layer sources to walk')
+    parser.add_argument('--keep-services', nargs='*', default=[], help='Service models to keep in addition to the detected ones')
+    args = parser.parse_args()
+
+    targetDir = os.path.abspath(args.target)
+    sizeBefore, filesBefore = directory_size(targetDir)
+    listBefore = time_list_available_services(targetDir)
+
+    result = prune_layer(targetDir, args.sources, args.keep_services)
+
+    sizeAfter, filesAfter = directory_size(targetDir)
+    listAfter = time_list_available_services(targetDir)
+
+    result['sizeBytes'] = {'before': sizeBefore, 'after': sizeAfter}
+    result['files'] = {'before': filesBefore, 'after': filesAfter}
+    if listBefore and listAfter:
+        result['listAvailableServices'] = {
+            'before': {'services': listBefore[0], 'ms': round(listBefore[1], 2)},
+            'after': {'services': listAfter[0], 'ms': round(listAfter[1], 2)}
+        }
+
+    print('[prune-layer] ' + json.dumps(result))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""Report C-accelerated packages in a layer build that fell back to pure Python.
+
+Runs inside the Lambda bundling image so the extension modules are imported by
+the same interpreter, platform and architecture that the function will use.
+"""
+import argparse
+import importlib
+import importlib.machinery
+import os
+import sys
+
+# Packages that silently fall back to a pure-Python implementation when their
+# compiled extension cannot be loaded
+NATIVE_SPEEDUP_MODULES = {
+    'simplejson': 'simplejson._speedups',
+    'wrapt': 'wrapt._wrappers',
+}
+
+def find_foreign_extensions(targetDir):
+    # Untagged '.so' files are accepted as-is, tagged ones (e.g. cpython-38-darwin)
+    # must carry one of this interpreter's own extension tags
+    taggedSuffixes = tuple(suffix for suffix in importlib.machinery.EXTENSION_SUFFIXES if suffix != '.so')
+
+    foreignExtensions = []
+    for root, _, files in os.walk(targetDir):
+        for fileName in files:
+            if not fileName.endswith('.so') or fileName.count('.') < 2:
+                continue
+            if not fileName.endswith(taggedSuffixes):
+                foreignExtensions.append(os.path.relpath(os.path.join(root, fileName), targetDir))
+
+    return foreignExtensions
+
+def find_missing_speedups(targetDir):
+    missingSpeedups = []
+    for package, module in NATIVE_SPEEDUP_MODULES.items():
+        if not os.path.isdir(os.path.join(targetDir, package)):
+            continue
+
+        try:
+            importlib.import_module(module)
+        except ImportError as ex:
+            missingSpeedups.append(f'{module} ({ex})')
+
+    return missingSpeedups
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('target', help='Directory the layer dependencies were installed into')
+    parser.add_argument('--strict', action='store_true', help='Exit non-zero when any speedup is missing')
+    args = parser.parse_args()
+
+    targetDir = os.path.abspath(args.target)
+    sys.path.insert(0, targetDir)
+
+    missingSpeedups = find_missing_speedups(targetDir)
+    foreignExtensions = find_foreign_extensions(targetDir)
+
+    for module in missingSpeedups:
+        print(f'[native-speedups] pure-Python fallback: {module}')
+    for extension in foreignExtensions:
+        print(f'[native-speedups] not loadable on this platform: {extension}')
+
+    if not missingSpeedups and not foreignExtensions:
+        print(f'[native-speedups] all native extensions load on {sys.platform} {sys.version.split()[0]}')
+        return 0
+
+    return 1 if args.strict else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
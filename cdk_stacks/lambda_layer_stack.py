@@ -1,23 +1,31 @@
 import os
-import subprocess
 
 import aws_cdk as cdk
 from aws_cdk import aws_ssm as ssm
 from aws_cdk import aws_lambda as lambda_
 
 from constructs import Construct
+from cdk_stacks.layer_build import dependencies_asset_hash, dependencies_bundling, lambda_architecture, source_bundling
 
 class LambdaLayerStack(cdk.Stack):
 
     def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
+        # Build Target
+        runtime = lambda_.Runtime.PYTHON_3_8
+        architecture = lambda_architecture(self)
+        strictNativeSpeedups = self.node.try_get_context('strictNativeSpeedups') != 'false'
+        pruneLayer = self.node.try_get_context('pruneLayer') != 'false'
+        serviceModelCache = self.node.try_get_context('serviceModelCache') != 'false'
+
         # Lambda layers
         LambdaBaseLayer = lambda_.LayerVersion(
             self, 'LambdaBaseLayer',
             layer_version_name='LambdaBaseLayer',
-            code=self.create_dependencies_layer('./lambda/layers/LambdaBase'),
-            compatible_runtimes=[lambda_.Runtime.PYTHON_3_8],
+            code=self.create_dependencies_layer('./lambda/layers/LambdaBase', runtime, architecture, strictNativeSpeedups, pruneLayer, serviceModelCache),
+            compatible_runtimes=[runtime],
+            compatible_architectures=[architecture],
             description="Lambda Layer with AwsLambdaPowerTools, SimpleJson, Requests, aws4auth and elasticsearch Dependency",
             removal_policy=cdk.RemovalPolicy.RETAIN
         )
@@ -25,8 +33,13 @@ class LambdaLayerStack(cdk.Stack):
         GenericLayer = lambda_.LayerVersion(
             self, 'GenericLayer',
             layer_version_name='GenericLayer',
-            code=lambda_.Code.from_asset('./lambda/layers/Generic'),
-            compatible_runtimes=[lambda_.Runtime.PYTHON_3_8],
+            code=lambda_.Code.from_asset(
+                './lambda/layers/Generic',
+                exclude=['**/__pycache__'],
+                bundling=source_bundling(runtime, architecture)
+            ),
+            compatible_runtimes=[runtime],
+            compatible_architectures=[architecture],
             description="Lambda Layer for common code",
             removal_policy=cdk.RemovalPolicy.RETAIN
         )
@@ -48,13 +61,19 @@ class LambdaLayerStack(cdk.Stack):
             parameter_name='GenericLayerArn'
         )
 
-    def create_dependencies_layer(self, localPath):
+    def create_dependencies_layer(self, localPath, runtime, architecture, strictNativeSpeedups=True, pruneLayer=True, serviceModelCache=True):
         main_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         while localPath[0] == '.' or localPath[0] == '/':
             localPath = localPath[1:]
         
         layerPath = f'{main_dir}/{localPath}'
-        
-        if not os.path.exists(f'{layerPath}/python'):
-            subprocess.check_call(f'pip install -r {layerPath}/requirements.txt -t {layerPath}/python', shell=True)
-        return lambda_.Code.from_asset(layerPath)
\ No newline at end of file
+
+        # The vendored python/ directory is only used by the local test suite,
+        # the deployed layer is always rebuilt for the target runtime
+        return lambda_.Code.from_asset(
+            layerPath,
+            exclude=['python'],
+            asset_hash_type=cdk.AssetHashType.CUSTOM,
+            asset_hash=dependencies_asset_hash(layerPath, runtime, architecture, strictNativeSpeedups, pruneLayer, serviceModelCache),
+            bundling=dependencies_bundling(runtime, architecture, strictNativeSpeedups, pruneLayer, serviceModelCache)
+        )
@@ -0,0 +1,99 @@
+import os
+import hashlib
+
+import aws_cdk as cdk
+from aws_cdk import aws_lambda as lambda_
+
+MAIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUILD_SCRIPTS_DIR = os.path.join(MAIN_DIR, 'cdk_stacks', 'build_scripts')
+BUILD_SCRIPTS_MOUNT = '/build-scripts'
+
+# Sources whose imports and boto3 client/resource calls decide what the pruned layer keeps
+PRUNE_SOURCE_DIRS = {
+    'functions': os.path.join(MAIN_DIR, 'lambda', 'functions'),
+    'generic': os.path.join(MAIN_DIR, 'lambda', 'layers', 'Generic', 'python')
+}
+PRUNE_SOURCES_MOUNT = '/prune-sources'
+
+# /opt and /var/task are read-only on Lambda, so without shipped bytecode every
+# cold start recompiles the sources. unchecked-hash pycs are used as-is without
+# comparing against the source mtime, which asset zipping does not preserve.
+COMPILE_BYTECODE_COMMAND = 'python -m compileall -q -j 0 --invalidation-mode unchecked-hash'
+
+def lambda_architecture(scope):
+    # cdk synth -c lambdaArchitecture=arm64 to build layers and functions for Graviton
+    if scope.node.try_get_context('lambdaArchitecture') == 'arm64':
+        return lambda_.Architecture.ARM_64
+    return lambda_.Architecture.X86_64
+
+def dependencies_bundling(runtime, architecture, strictNativeSpeedups=True, pruneLayer=True, serviceModelCache=True):
+    # Resolve wheels inside the runtime's own build image so pip picks the
+    # manylinux builds for the target interpreter and architecture
+    verifyCommand = f'python {BUILD_SCRIPTS_MOUNT}/verify_native_speedups.py /asset-output/python'
+    if strictNativeSpeedups:
+        verifyCommand += ' --strict'
+
+    commands = [
+        'pip install --no-cache-dir -r /asset-input/requirements.txt -t /asset-output/python',
+        verifyCommand
+    ]
+    volumes = [cdk.DockerVolume(host_path=BUILD_SCRIPTS_DIR, container_path=BUILD_SCRIPTS_MOUNT)]
+
+    if pruneLayer:
+        pruneSources = ' '.join(f'{PRUNE_SOURCES_MOUNT}/{name}' for name in PRUNE_SOURCE_DIRS)
+        commands.append(f'python {BUILD_SCRIPTS_MOUNT}/prune_layer.py /asset-output/python --sources {pruneSources}')
+        volumes += [
+            cdk.DockerVolume(host_path=hostPath, container_path=f'{PRUNE_SOURCES_MOUNT}/{name}')
+            for name, hostPath in PRUNE_SOURCE_DIRS.items()
+        ]
+
+    if serviceModelCache:
+        # Read at runtime by model_cache_helper.MarshalFileLoader in the Generic layer
+        commands.append(f'python {BUILD_SCRIPTS_MOUNT}/compile_service_models.py /asset-output/python')
+
+    commands.append(f'{COMPILE_BYTECODE_COMMAND} /asset-output/python')
+
+    return cdk.BundlingOptions(
+        image=runtime.bundling_image,
+        platform=architecture.docker_platform,
+        command=['bash', '-c', ' && '.join(commands)],
+        volumes=volumes
+    )
+
+def dependencies_asset_hash(layerPath, runtime, architecture, strictNativeSpeedups=True, pruneLayer=True, serviceModelCache=True):
+    # CDK only hashes the asset directory (requirements.txt), but the pruned layer
+    # also depends on the mounted sources and build scripts, so a handler that
+    # starts using a new service must produce a new layer
+    hashDirs = [BUILD_SCRIPTS_DIR]
+    if pruneLayer:
+        hashDirs += PRUNE_SOURCE_DIRS.values()
+
+    digest = hashlib.sha256()
+    digest.update(f'{runtime.name}|{architecture.name}|{strictNativeSpeedups}|{pruneLayer}|{serviceModelCache}'.encode())
+    digest.update(_file_digest(os.path.join(layerPath, 'requirements.txt')))
+    for hashDir in hashDirs:
+        for root, dirs, files in os.walk(hashDir):
+            dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+            for fileName in sorted(files):
+                filePath = os.path.join(root, fileName)
+                digest.update(os.path.relpath(filePath, MAIN_DIR).encode())
+                digest.update(_file_digest(filePath))
+    return digest.hexdigest()
+
+def _file_digest(filePath):
+    with open(filePath, 'rb') as file:
+        return hashlib.sha256(file.read()).digest()
+
+def source_bundling(runtime, architecture):
+    # Copy plain source assets (Generic layer, function code) and precompile
+    # them with the runtime's own interpreter so the magic number matches
+    commands = [
+        'cp -R /asset-input/. /asset-output/',
+        f'{COMPILE_BYTECODE_COMMAND} /asset-output'
+    ]
+
+    return cdk.BundlingOptions(
+        image=runtime.bundling_image,
+        platform=architecture.docker_platform,
+        command=['bash', '-c', ' && '.join(commands)]
+    )
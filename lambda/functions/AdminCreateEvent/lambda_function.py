@@ -1,24 +1,31 @@
 import os
 import uuid
-import boto3
 import simplejson as json
 from datetime import datetime
-from boto3.dynamodb.conditions import Key
+from concurrent.futures import ThreadPoolExecutor
 from aws_lambda_powertools import Logger, Tracer
 
 # Custom Libraries
 from enum_helper import EventStatus
-from http_helper import HttpResponse
+from http_helper import HttpResponse, VersionETag
+from aws_client_helper import GetTable, PrewarmClients
+from dynamodb_helper import TransactWriteItems
+from seourl_guard_helper import SEOURL_CONFLICT_REASON, SeoUrlGuardPut
+from codepipeline_helper import triggerPublicWebRegeneration, changeManifestEntry
 from custom_exceptions import BadRequestError
 
 # Environment Variables
 WEB_ORIGIN = os.environ.get('WEB_ORIGIN')
 EVENT_TABLE = os.environ.get('EVENT_TABLE')
+BATCH_MAX_EVENTS = int(os.environ.get('BATCH_MAX_EVENTS', '500'))
+BATCH_WRITE_CONCURRENCY = int(os.environ.get('BATCH_WRITE_CONCURRENCY', '8'))
+PUBLIC_WEB_PIPELINE_NAME = os.environ.get('PUBLIC_WEB_PIPELINE_NAME')
+REGENERATION_TABLE = os.environ.get('REGENERATION_TABLE')
 
 # AWS Client or Resource
-DDB_RESOURCE = boto3.resource('dynamodb')
-
-EVENT_DDB_TABLE = DDB_RESOURCE.Table(EVENT_TABLE)
+PrewarmClients()
+EVENT_DDB_TABLE = GetTable(EVENT_TABLE)
+REGENERATION_DDB_TABLE = GetTable(REGENERATION_TABLE) if REGENERATION_TABLE else None
 
 logger = Logger()
 tracer = Tracer()
@@ -31,51 +38,24 @@ def lambda_handler(event, context):
         eventBody = event.get('body') or '{}'
         requestBody = json.loads(eventBody)
 
-        event_ = {
-            'eventId': str(uuid.uuid4()),
-
-            'title': requestBody.get('title'),
-            'shortDescription': requestBody.get('shortDescription'),
-            'longDescription': requestBody.get('longDescription'),
-            'media': requestBody.get('media'),
-            'status': requestBody.get('status'),
-            'isHighlighted': requestBody.get('isHighlighted'),
-
-            'region': requestBody.get('region'),
-            'venue': requestBody.get('venue'),
-            'displayVenue': requestBody.get('displayVenue'),
-            'eventDate': requestBody.get('eventDate'),
-            'displayDate': requestBody.get('displayDate'),
-            'openingHours': requestBody.get('openingHours'),
-            'admission': requestBody.get('admission'),
-            'displayAdmission': requestBody.get('displayAdmission'),
-
-            'organizer': requestBody.get('organizer'),
-            'category': requestBody.get('category'),
-            'topic': requestBody.get('tag'),
-
-            'seoUrl': requestBody.get('seoUrl'),
-            'ticketUrl': requestBody.get('ticketUrl'),
-            'websiteUrl': requestBody.get('websiteUrl'),
-            'facebookUrl': requestBody.get('facebookUrl'),
-            'instagramUrl': requestBody.get('instagramUrl'),
-
-            'isDeleted': False,
-            'createdAt': now,
-            'createdBy': requesterEmail,
-            'updatedAt': now,
-            'updatedBy': requesterEmail
-        }
-
-        if not requestBody or event_.get('status') not in [EventStatus.ACTIVE, EventStatus.INACTIVE]:
+        # A list of events under 'events' creates them all in one request
+        if 'events' in requestBody:
+            results = create_events_batch(requestBody.get('events'), requesterEmail, now)
+            return HttpResponse(200, origin=WEB_ORIGIN, data={
+                'results': results,
+                'created': sum(1 for result in results if result['status'] == 'CREATED'),
+                'failed': sum(1 for result in results if result['status'] != 'CREATED')
+            })
+
+        event_ = build_event(requestBody, requesterEmail, now)
+
+        if not requestBody or event_.get('status') not in [EventStatus.ACTIVE, EventStatus.INACTIVE] or not is_valid_seourl(event_.get('seoUrl')):
             raise BadRequestError('Invalid Parameters')
         
-        if check_seourl_existence(event_.get('seoUrl')):
-            raise BadRequestError('SeoUrl already exists.')
-        
         create_event(event_)
+        regenerate_public_web([created_change(event_)])
 
-        return HttpResponse(200, origin=WEB_ORIGIN, data=event_)
+        return HttpResponse(200, origin=WEB_ORIGIN, data=event_, headers={'ETag': VersionETag(event_['version'])})
     except BadRequestError as ex:
         logger.exception({'message': str(ex)})
         return HttpResponse(400, origin=WEB_ORIGIN, data={'message': str(ex)})
@@ -87,15 +67,130 @@ def lambda_handler(event, context):
         logger.exception({'message': str(ex)})
         return HttpResponse(500, origin=WEB_ORIGIN, data={'message': 'Something went wrong. Please try again later.'})
 
+def build_event(requestBody, requesterEmail, now):
+    return {
+        'eventId': str(uuid.uuid4()),
+
+        'title': requestBody.get('title'),
+        'shortDescription': requestBody.get('shortDescription'),
+        'longDescription': requestBody.get('longDescription'),
+        'media': requestBody.get('media'),
+        'status': requestBody.get('status'),
+        'isHighlighted': requestBody.get('isHighlighted'),
+
+        'region': requestBody.get('region'),
+        'venue': requestBody.get('venue'),
+        'displayVenue': requestBody.get('displayVenue'),
+        'eventDate': requestBody.get('eventDate'),
+        'displayDate': requestBody.get('displayDate'),
+        'openingHours': requestBody.get('openingHours'),
+        'admission': requestBody.get('admission'),
+        'displayAdmission': requestBody.get('displayAdmission'),
+
+        'organizer': requestBody.get('organizer'),
+        'category': requestBody.get('category'),
+        'topic': requestBody.get('tag'),
+
+        'seoUrl': requestBody.get('seoUrl'),
+        'ticketUrl': requestBody.get('ticketUrl'),
+        'websiteUrl': requestBody.get('websiteUrl'),
+        'facebookUrl': requestBody.get('facebookUrl'),
+        'instagramUrl': requestBody.get('instagramUrl'),
+
+        'isDeleted': False,
+        'version': 1,
+        'createdAt': now,
+        'createdBy': requesterEmail,
+        'updatedAt': now,
+        'updatedBy': requesterEmail
+    }
+
+def is_valid_seourl(seoUrl):
+    return isinstance(seoUrl, str) and bool(seoUrl)
+
 @tracer.capture_method
-def check_seourl_existence(seoUrl):
-    eventResp = EVENT_DDB_TABLE.query(
-        IndexName='gsi-seoUrl',
-        KeyConditionExpression=Key('seoUrl').eq(seoUrl)
-    )
+def create_event(event_):
+    # The event and its seoUrl guard are written together or not at all, so a
+    # concurrent create with the same seoUrl cancels one of the two transactions
+    if not is_valid_seourl(event_.get('seoUrl')):
+        raise BadRequestError('Invalid Parameters')
+
+    reasons = TransactWriteItems(EVENT_DDB_TABLE, [
+        {'Put': {
+            'Item': event_,
+            'ConditionExpression': 'attribute_not_exists(#eventId)',
+            'ExpressionAttributeNames': {'#eventId': 'eventId'}
+        }},
+        SeoUrlGuardPut(event_['seoUrl'], event_['eventId'])
+    ])
+
+    if reasons and reasons[1] == SEOURL_CONFLICT_REASON:
+        raise BadRequestError('SeoUrl already exists.')
+    if reasons:
+        raise Exception(f'Failed to create Event: {reasons}')
 
-    return eventResp.get('Items')
+@tracer.capture_method
+def create_events_batch(events, requesterEmail, now):
+    if not isinstance(events, list) or not events or len(events) > BATCH_MAX_EVENTS:
+        raise BadRequestError('Invalid Parameters')
+
+    results = []
+    candidates = dict()
+    for index, requestBody in enumerate(events):
+        result = {'index': index, 'eventId': None, 'status': 'INVALID', 'message': 'Invalid Parameters'}
+        results.append(result)
+        if not isinstance(requestBody, dict) or not requestBody:
+            continue
+
+        event_ = build_event(requestBody, requesterEmail, now)
+        seoUrl = event_.get('seoUrl')
+        if event_.get('status') not in [EventStatus.ACTIVE, EventStatus.INACTIVE] or not is_valid_seourl(seoUrl):
+            continue
+
+        # The first event in the batch keeps a repeated seoUrl
+        if seoUrl in candidates:
+            result.update({'status': 'DUPLICATE', 'message': 'SeoUrl duplicated in batch.'})
+            continue
+
+        result.update({'eventId': event_['eventId'], 'status': 'PENDING', 'message': None})
+        candidates[seoUrl] = (result, event_)
+
+    for (result, _), error in zip(candidates.values(), create_events([event_ for _, event_ in candidates.values()])):
+        if isinstance(error, BadRequestError):
+            result.update({'eventId': None, 'status': 'DUPLICATE', 'message': str(error)})
+        elif error:
+            result.update({'eventId': None, 'status': 'FAILED', 'message': 'Event was not written, please retry.'})
+        else:
+            result.update({'status': 'CREATED', 'message': None})
+
+    createdEvents = [event_ for result, event_ in candidates.values() if result['status'] == 'CREATED']
+    if createdEvents:
+        regenerate_public_web([created_change(event_) for event_ in createdEvents])
+
+    return results
 
 @tracer.capture_method
-def create_event(event_):
-    EVENT_DDB_TABLE.put_item(Item=event_)
+def create_events(events):
+    # One transaction per event, a bounded number in flight at a time. Returns
+    # the exception each event failed with, or None once it was written.
+    def create(event_):
+        try:
+            create_event(event_)
+        except Exception as ex:
+            logger.warning({'message': str(ex), 'eventId': event_['eventId']})
+            return ex
+
+    if not events:
+        return []
+
+    with ThreadPoolExecutor(max_workers=min(BATCH_WRITE_CONCURRENCY, len(events))) as executor:
+        return list(executor.map(create, events))
+
+def created_change(event_):
+    return changeManifestEntry(event_['eventId'], [field for field, value in event_.items() if value is not None], newSeoUrl=event_['seoUrl'])
+
+def regenerate_public_web(changes):
+    # Coalesced per debounce window when REGENERATION_TABLE is set, the
+    # changes go into the manifest of the run that publishes them
+    if PUBLIC_WEB_PIPELINE_NAME:
+        triggerPublicWebRegeneration(PUBLIC_WEB_PIPELINE_NAME, REGENERATION_DDB_TABLE, changes=changes)
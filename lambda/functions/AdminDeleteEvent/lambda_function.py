@@ -1,41 +1,106 @@
 import os
-import boto3
+import time
+import simplejson as json
 from decimal import Decimal
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from boto3.dynamodb.conditions import Key, Attr
 from aws_lambda_powertools import Logger, Tracer
 
 # Custom Libraries
-from http_helper import HttpResponse
-from custom_exceptions import BadRequestError
+from http_helper import HttpResponse, GetIfMatchVersion
+from aws_client_helper import GetTable, LazyClient, PrewarmClients
+from seourl_guard_helper import IsSeoUrlGuard
+from codepipeline_helper import triggerPublicWebRegeneration, changeManifestEntry
+from cache_helper import GetRedisClient
+from event_cache_helper import InvalidateEventCache
+from custom_exceptions import BadRequestError, ConflictError, NotFoundError
 
 # Environment Variables
 WEB_ORIGIN = os.environ.get('WEB_ORIGIN')
 EVENT_TABLE = os.environ.get('EVENT_TABLE')
+BULK_DELETE_QUEUE_URL = os.environ.get('BULK_DELETE_QUEUE_URL')
+BULK_MAX_EVENT_IDS = int(os.environ.get('BULK_MAX_EVENT_IDS', '5000'))
+BULK_DELETE_CONCURRENCY = int(os.environ.get('BULK_DELETE_CONCURRENCY', '16'))
+BULK_DELETE_MAX_ATTEMPTS = int(os.environ.get('BULK_DELETE_MAX_ATTEMPTS', '3'))
+BULK_DELETE_CONNECT_TIMEOUT = float(os.environ.get('BULK_DELETE_CONNECT_TIMEOUT', '1'))
+BULK_DELETE_READ_TIMEOUT = float(os.environ.get('BULK_DELETE_READ_TIMEOUT', '2'))
+PUBLIC_WEB_PIPELINE_NAME = os.environ.get('PUBLIC_WEB_PIPELINE_NAME')
+REGENERATION_TABLE = os.environ.get('REGENERATION_TABLE')
 
-# AWS Client or Resource
-DDB_RESOURCE = boto3.resource('dynamodb')
+# eventIds per checkpoint message, well inside the 256 KB SQS message limit
+CHECKPOINT_CHUNK_SIZE = 1000
+
+# No new update is started this close to the Lambda timeout, what is left is
+# checkpointed to the bulk delete queue and finished from there. An update
+# started just before the deadline can take every attempt timing out, plus
+# the 1s, 2s, 4s, ... backoff between them.
+DEADLINE_MARGIN_SECONDS = (
+    BULK_DELETE_MAX_ATTEMPTS * (BULK_DELETE_CONNECT_TIMEOUT + BULK_DELETE_READ_TIMEOUT)
+    + sum(min(2 ** attempt, 20) for attempt in range(BULK_DELETE_MAX_ATTEMPTS - 1))
+)
 
-EVENT_DDB_TABLE = DDB_RESOURCE.Table(EVENT_TABLE)
+SOFT_DELETE_EXPRESSION = 'SET isDeleted=:isDeleted, updatedAt=:updatedAt, updatedBy=:updatedBy, #version=if_not_exists(#version, :zero) + :one'
+
+# AWS Client or Resource
+PrewarmClients()
+EVENT_DDB_TABLE = GetTable(EVENT_TABLE)
+# Adaptive retries rate limit the client itself once DynamoDB throttles, so the
+# whole pool slows down together instead of every thread retrying on its own.
+# Short timeouts keep DEADLINE_MARGIN_SECONDS well inside the Lambda timeout.
+BULK_EVENT_DDB_TABLE = GetTable(
+    EVENT_TABLE,
+    retries={'mode': 'adaptive', 'max_attempts': BULK_DELETE_MAX_ATTEMPTS},
+    connect_timeout=BULK_DELETE_CONNECT_TIMEOUT,
+    read_timeout=BULK_DELETE_READ_TIMEOUT,
+    max_pool_connections=BULK_DELETE_CONCURRENCY
+)
+SQS_CLIENT = LazyClient('sqs')
+REDIS_CLIENT = GetRedisClient()
+REGENERATION_DDB_TABLE = GetTable(REGENERATION_TABLE) if REGENERATION_TABLE else None
 
 logger = Logger()
 tracer = Tracer()
 
 @tracer.capture_lambda_handler
 def lambda_handler(event, context):
+    # Bulk deletes that ran out of time come back from their checkpoint queue
+    if event.get('Records'):
+        return resume_bulk_delete(event['Records'], context)
+
     try:
         now = datetime.now().strftime('%Y-%m-%dT%H:%M:%S.%fZ')
         requesterEmail = event.get('requestContext', {}).get('authorizer', {}).get('claims', {}).get('email')
         queryStringParameters = event.get('queryStringParameters') or {}
+        requestBody = json.loads(event.get('body') or '{}')
+
+        # A list of eventIds in the body deletes them all in one request
+        if 'eventIds' in requestBody:
+            eventIds = requestBody.get('eventIds')
+            if not isinstance(eventIds, list) or not eventIds or len(eventIds) > BULK_MAX_EVENT_IDS or not all(isinstance(eventId, str) and eventId for eventId in eventIds):
+                raise BadRequestError('Invalid Parameters')
+
+            results = delete_events_bulk(eventIds, requesterEmail, now, get_deadline(context))
+            statuses = [result['status'] for result in results]
+            return HttpResponse(200, origin=WEB_ORIGIN, data={
+                'results': results,
+                **{status.lower(): statuses.count(status) for status in ['DELETED', 'NOT_FOUND', 'QUEUED', 'FAILED']}
+            })
+
         eventId = queryStringParameters.get('eventId')
+        expectedVersion = GetIfMatchVersion(event)
 
         if not queryStringParameters or not eventId:
             raise BadRequestError('Invalid Parameters')
         
-        delete_event(eventId, requesterEmail, now)
+        delete_event(eventId, requesterEmail, now, expectedVersion)
         return HttpResponse(200, origin=WEB_ORIGIN, data={'message': 'Successfully deleted Event.'})
     except BadRequestError as ex:
         return HttpResponse(400, origin=WEB_ORIGIN, data={'message': str(ex)})
+    except ConflictError as ex:
+        return HttpResponse(409, origin=WEB_ORIGIN, data={'message': str(ex)})
+    except NotFoundError as ex:
+        return HttpResponse(404, origin=WEB_ORIGIN, data={'message': str(ex)})
     except Exception as ex:
         tracer.put_annotation('lambda_error', 'true')
         tracer.put_annotation('lambda_name', context.function_name)
@@ -45,13 +110,141 @@ def lambda_handler(event, context):
         return HttpResponse(500, origin=WEB_ORIGIN, data={'message': 'Something went wrong. Please try again later.'})
 
 @tracer.capture_method
-def delete_event(eventId, requesterEmail, now):
-    EVENT_DDB_TABLE.update_item(
-        Key={'eventId': eventId},
-        UpdateExpression='SET isDeleted=:isDeleted, updatedAt=:updatedAt, updatedBy=:updatedBy',
-        ExpressionAttributeValues={
-            ':isDeleted': True,
-            ':updatedAt': now,
-            ':updatedBy': requesterEmail
-        }
-    )
+def delete_event(eventId, requesterEmail, now, expectedVersion=None):
+    # seoUrl guard items share the table but are not events
+    if IsSeoUrlGuard(eventId):
+        raise NotFoundError('Event Not Found.')
+
+    expressionAttributeValues = {
+        ':isDeleted': True,
+        ':updatedAt': now,
+        ':updatedBy': requesterEmail,
+        ':zero': 0,
+        ':one': 1
+    }
+
+    # Only an existing event is deleted. With If-Match the delete only goes
+    # through on the version the client saw, events written before versioning
+    # count as version 0.
+    conditionExpression = 'attribute_exists(eventId)'
+    if expectedVersion == 0:
+        conditionExpression += ' AND attribute_not_exists(#version)'
+    elif expectedVersion is not None:
+        conditionExpression += ' AND #version = :expectedVersion'
+        expressionAttributeValues[':expectedVersion'] = expectedVersion
+
+    try:
+        eventResp = EVENT_DDB_TABLE.update_item(
+            Key={'eventId': eventId},
+            UpdateExpression=SOFT_DELETE_EXPRESSION,
+            ConditionExpression=conditionExpression,
+            ExpressionAttributeNames={'#version': 'version'},
+            ExpressionAttributeValues=expressionAttributeValues,
+            ReturnValues='ALL_OLD'
+        )
+    except EVENT_DDB_TABLE.meta.client.exceptions.ConditionalCheckFailedException:
+        # Only read on failure, to tell a stale version from a missing event
+        if expectedVersion is not None and EVENT_DDB_TABLE.get_item(Key={'eventId': eventId}, ProjectionExpression='eventId').get('Item'):
+            raise ConflictError('Event has been modified, please reload it.')
+        raise NotFoundError('Event Not Found.')
+
+    InvalidateEventCache(REDIS_CLIENT, [eventId])
+    regenerate_public_web([deleted_change(eventId, eventResp.get('Attributes'))])
+
+def get_deadline(context):
+    if hasattr(context, 'get_remaining_time_in_millis'):
+        return time.monotonic() + context.get_remaining_time_in_millis() / 1000 - DEADLINE_MARGIN_SECONDS
+    return None
+
+@tracer.capture_method
+def delete_events_bulk(eventIds, requesterEmail, now, deadline=None):
+    # Per eventId outcome in request order: DELETED, NOT_FOUND, QUEUED (left
+    # for the checkpoint queue) or FAILED
+    deletedEvents = dict()
+    def soft_delete(eventId):
+        if IsSeoUrlGuard(eventId):
+            return 'NOT_FOUND'
+        if deadline and time.monotonic() > deadline:
+            return 'PENDING'
+
+        try:
+            eventResp = BULK_EVENT_DDB_TABLE.update_item(
+                Key={'eventId': eventId},
+                UpdateExpression=SOFT_DELETE_EXPRESSION,
+                ConditionExpression='attribute_exists(eventId)',
+                ExpressionAttributeNames={'#version': 'version'},
+                ExpressionAttributeValues={':isDeleted': True, ':updatedAt': now, ':updatedBy': requesterEmail, ':zero': 0, ':one': 1},
+                ReturnValues='ALL_OLD'
+            )
+            deletedEvents[eventId] = eventResp.get('Attributes')
+            return 'DELETED'
+        except BULK_EVENT_DDB_TABLE.meta.client.exceptions.ConditionalCheckFailedException:
+            return 'NOT_FOUND'
+        except Exception as ex:
+            logger.warning({'message': str(ex), 'eventId': eventId})
+            return 'FAILED'
+
+    eventIds = list(dict.fromkeys(eventIds))
+    with ThreadPoolExecutor(max_workers=min(BULK_DELETE_CONCURRENCY, len(eventIds))) as executor:
+        statuses = dict(zip(eventIds, executor.map(soft_delete, eventIds)))
+
+    # One invalidation and one regeneration request for the whole request
+    # rather than one per event
+    deletedIds = [eventId for eventId, status in statuses.items() if status == 'DELETED']
+    if deletedIds:
+        InvalidateEventCache(REDIS_CLIENT, deletedIds)
+        regenerate_public_web([deleted_change(eventId, deletedEvents.get(eventId)) for eventId in deletedIds])
+
+    pendingIds = [eventId for eventId, status in statuses.items() if status == 'PENDING']
+    if pendingIds:
+        queuedIds = checkpoint_bulk_delete(pendingIds, requesterEmail, now)
+        for eventId in pendingIds:
+            statuses[eventId] = 'QUEUED' if eventId in queuedIds else 'FAILED'
+
+    return [{'eventId': eventId, 'status': status} for eventId, status in statuses.items()]
+
+@tracer.capture_method
+def checkpoint_bulk_delete(eventIds, requesterEmail, now):
+    # Returns the eventIds that made it onto the queue
+    if not BULK_DELETE_QUEUE_URL:
+        logger.warning({'message': 'No bulk delete queue to checkpoint to', 'eventIds': len(eventIds)})
+        return set()
+
+    chunks = [eventIds[start:start + CHECKPOINT_CHUNK_SIZE] for start in range(0, len(eventIds), CHECKPOINT_CHUNK_SIZE)]
+    entries = [
+        {'Id': str(index), 'MessageBody': json.dumps({'eventIds': chunk, 'requesterEmail': requesterEmail, 'now': now})}
+        for index, chunk in enumerate(chunks)
+    ]
+
+    queuedIds = set()
+    for start in range(0, len(entries), 10):
+        response = SQS_CLIENT.send_message_batch(QueueUrl=BULK_DELETE_QUEUE_URL, Entries=entries[start:start + 10])
+        for entry in response.get('Successful', []):
+            queuedIds.update(chunks[int(entry['Id'])])
+
+    return queuedIds
+
+@tracer.capture_method
+def resume_bulk_delete(records, context):
+    batchItemFailures = []
+    for record in records:
+        try:
+            checkpoint = json.loads(record['body'])
+            results = delete_events_bulk(checkpoint['eventIds'], checkpoint.get('requesterEmail'), checkpoint.get('now'), get_deadline(context))
+            statuses = [result['status'] for result in results]
+            logger.info({'message': 'Resumed bulk delete', **{status.lower(): statuses.count(status) for status in set(statuses)}})
+        except Exception as ex:
+            logger.exception({'message': str(ex)})
+            batchItemFailures.append({'itemIdentifier': record.get('messageId')})
+
+    return {'batchItemFailures': batchItemFailures}
+
+def deleted_change(eventId, previous):
+    # The page of a soft-deleted event comes down from the seoUrl it had
+    return changeManifestEntry(eventId, ['isDeleted'], oldSeoUrl=(previous or {}).get('seoUrl'))
+
+def regenerate_public_web(changes):
+    # Coalesced per debounce window when REGENERATION_TABLE is set, the
+    # changes go into the manifest of the run that publishes them
+    if PUBLIC_WEB_PIPELINE_NAME:
+        triggerPublicWebRegeneration(PUBLIC_WEB_PIPELINE_NAME, REGENERATION_DDB_TABLE, changes=changes)
@@ -1,19 +1,28 @@
 import os
-import boto3
+import re
 from aws_lambda_powertools import Logger, Tracer
 
 # Custom Libraries
-from http_helper import HttpResponse
+from http_helper import HttpResponse, VersionETag
+from aws_client_helper import GetTable, PrewarmClients
+from dynamodb_helper import BatchGetItems
+from seourl_guard_helper import IsSeoUrlGuard
+from cache_helper import GetRedisClient, GetOrLoadCacheValue, GetCacheValues, SetCacheValues
+from event_cache_helper import EVENT_CACHE_TTL, EventCacheKey, GetEventLocalCache
 from custom_exceptions import BadRequestError, NotFoundError
 
 # Environment Variables
 WEB_ORIGIN = os.environ.get('WEB_ORIGIN')
 EVENT_TABLE = os.environ.get('EVENT_TABLE')
+BATCH_MAX_EVENT_IDS = int(os.environ.get('BATCH_MAX_EVENT_IDS', '500'))
 
-# AWS Client or Resource
-DDB_RESOURCE = boto3.resource('dynamodb')
+FIELD_NAME_PATTERN = re.compile(r'^[A-Za-z][A-Za-z0-9_]*$')
 
-EVENT_DDB_TABLE = DDB_RESOURCE.Table(EVENT_TABLE)
+# AWS Client or Resource
+PrewarmClients()
+EVENT_DDB_TABLE = GetTable(EVENT_TABLE)
+REDIS_CLIENT = GetRedisClient()
+EVENT_LOCAL_CACHE = GetEventLocalCache()
 
 logger = Logger()
 tracer = Tracer()
@@ -24,11 +33,22 @@ def lambda_handler(event, context):
         queryStringParameters = event.get('queryStringParameters') or {}
         eventId = queryStringParameters.get('eventId')
 
+        # eventIds=a,b,c returns several events in one call, fields=x,y limits the attributes returned
+        if queryStringParameters.get('eventIds') is not None:
+            eventIds = parse_list(queryStringParameters.get('eventIds'))
+            fields = parse_list(queryStringParameters.get('fields'))
+            if not eventIds or len(eventIds) > BATCH_MAX_EVENT_IDS or not all(FIELD_NAME_PATTERN.match(field) for field in fields):
+                raise BadRequestError('Invalid Parameters')
+
+            data = get_events(eventIds, fields)
+            return HttpResponse(200, origin=WEB_ORIGIN, data=data)
+
         if not queryStringParameters or not eventId:
             raise BadRequestError('Invalid Parameters')
         
         event = get_event(eventId)
-        return HttpResponse(200, origin=WEB_ORIGIN, data=event)
+        # Sent back as If-Match on AdminUpdateEvent/AdminDeleteEvent
+        return HttpResponse(200, origin=WEB_ORIGIN, data=event, headers={'ETag': VersionETag(event.get('version', 0))})
     except BadRequestError as ex:
         return HttpResponse(400, origin=WEB_ORIGIN, data={'message': str(ex)})
     except NotFoundError as ex:
@@ -43,11 +63,65 @@ def lambda_handler(event, context):
 
 @tracer.capture_method
 def get_event(eventId):
-    eventResp = EVENT_DDB_TABLE.get_item(
-        Key={'eventId': eventId}
-    )
+    # seoUrl guard items share the table but are not events
+    if IsSeoUrlGuard(eventId):
+        raise NotFoundError('Event Not Found.')
+
+    # Read through the event cache, missing events are not cached
+    item = GetOrLoadCacheValue(REDIS_CLIENT, EventCacheKey(eventId), lambda: load_event(eventId), EVENT_CACHE_TTL, 'event', EVENT_LOCAL_CACHE)
 
-    if not eventResp.get('Item'):
+    if not item:
         raise NotFoundError('Event Not Found.')
     
+    return item
+
+def load_event(eventId):
+    eventResp = EVENT_DDB_TABLE.get_item(
+        Key={'eventId': eventId}
+    )
     return eventResp.get('Item')
+
+
+def parse_list(value):
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+@tracer.capture_method
+def get_events(eventIds, fields=None):
+    # eventId is always projected so the items can be matched to the request
+    projectionFields = ['eventId'] + [field for field in fields if field != 'eventId'] if fields else None
+    orderedIds = list(dict.fromkeys(eventIds))
+    itemsById = get_items_by_id([eventId for eventId in orderedIds if not IsSeoUrlGuard(eventId)], projectionFields)
+
+    return {
+        'items': [itemsById[eventId] for eventId in orderedIds if eventId in itemsById],
+        'notFound': [eventId for eventId in orderedIds if eventId not in itemsById]
+    }
+
+@tracer.capture_method
+def get_items_by_id(eventIds, projectionFields=None):
+    if REDIS_CLIENT is None:
+        items = BatchGetItems(EVENT_DDB_TABLE, [{'eventId': eventId} for eventId in eventIds], projectionFields) if eventIds else []
+        return {item['eventId']: item for item in items}
+
+    # Cached events are read with one MGET and the rest fetched whole, a
+    # projection does not lower the read capacity DynamoDB charges, and
+    # cached back with one pipelined MSET. The projection is then applied here.
+    itemsById = dict()
+    try:
+        cached = GetCacheValues(REDIS_CLIENT, [EventCacheKey(eventId) for eventId in eventIds])
+        itemsById = {item['eventId']: item for item in cached.values()}
+    except Exception as ex:
+        logger.warning({'message': 'Cache read failed', 'error': str(ex)})
+
+    missingIds = [eventId for eventId in eventIds if eventId not in itemsById]
+    if missingIds:
+        items = BatchGetItems(EVENT_DDB_TABLE, [{'eventId': eventId} for eventId in missingIds])
+        try:
+            SetCacheValues(REDIS_CLIENT, {EventCacheKey(item['eventId']): item for item in items}, EVENT_CACHE_TTL)
+        except Exception as ex:
+            logger.warning({'message': 'Cache write failed', 'error': str(ex)})
+        itemsById.update({item['eventId']: item for item in items})
+
+    if projectionFields:
+        itemsById = {eventId: {field: item[field] for field in projectionFields if field in item} for eventId, item in itemsById.items()}
+    return itemsById
@@ -1,12 +1,17 @@
 import os
-import boto3
-import requests
+import base64
+import binascii
 import simplejson as json
 from requests_aws4auth import AWS4Auth
 from aws_lambda_powertools import Logger, Tracer
 
 # Custom Libraries
 from http_helper import HttpResponse
+from credentials_helper import GetCredentials
+from opensearch_helper import OpenSearchTransport
+from event_index_helper import EVENT_INDEX_ALIAS, EVENT_KEYWORD_FIELDS, EVENT_SORT_FIELDS
+from cache_helper import GetRedisClient, GetCacheGeneration, GetOrLoadCacheValue
+from event_cache_helper import EVENT_LIST_CACHE_TTL, EVENT_LIST_GENERATION, EventListCacheKey
 from custom_exceptions import BadRequestError, NotFoundError
 
 # Environment Variables
@@ -14,13 +19,32 @@ WEB_ORIGIN = os.environ.get('WEB_ORIGIN')
 ES_DOMAIN_ENDPOINT = os.environ.get('ES_DOMAIN_ENDPOINT')
 
 # Get AWS Credentials
-CREDENTIALS = boto3.Session().get_credentials()
-ACCESS_KEY = CREDENTIALS.access_key
-SECRET_ACCESS_KEY = CREDENTIALS.secret_key
-AWSAUTH = AWS4Auth(ACCESS_KEY, SECRET_ACCESS_KEY, 'ap-southeast-1', 'es', session_token=CREDENTIALS.token)
-HEADERS = { 'Content-Type': 'application/json' }
+AWSAUTH = AWS4Auth(region='ap-southeast-1', service='es', refreshable_credentials=GetCredentials())
 
-NON_SORT_KEYWORD_FIELDS = ['title', 'shortDescription', 'longDescription', 'status', 'venue']
+# Pooled keep-alive connections reused across warm invocations
+OS_TRANSPORT = OpenSearchTransport(ES_DOMAIN_ENDPOINT, AWSAUTH)
+REDIS_CLIENT = GetRedisClient()
+
+# Filters the listing accepts, anything else in the request is rejected
+TERM_FILTER_FIELDS = EVENT_KEYWORD_FIELDS
+BOOLEAN_FILTER_FIELDS = ['isHighlighted']
+RANGE_FILTER_FIELDS = ['eventDate']
+RANGE_OPERATORS = ['gt', 'gte', 'lt', 'lte']
+
+# Fields that can be counted alongside the listing, and how many buckets each may return
+FACET_FIELDS = [field for field in EVENT_KEYWORD_FIELDS if field != 'venue']
+FACET_DEFAULT_SIZE = 10
+FACET_MAX_SIZE = 100
+
+# Unique per document, makes the sort order total so search_after never skips or repeats hits
+SORT_TIEBREAKER_FIELD = 'eventId'
+PIT_KEEP_ALIVE = '1m'
+
+# Only these parts of the search response are sent back, the rest (_index,
+# _score, _shards, took) is dropped by OpenSearch before serialising
+SEARCH_FILTER_PATH = ['hits.hits._source', 'hits.total']
+CURSOR_FILTER_PATH = ['hits.hits.sort', 'pit_id']
+FACET_FILTER_PATH = ['aggregations.*.buckets.key', 'aggregations.*.buckets.doc_count']
 
 logger = Logger()
 tracer = Tracer()
@@ -38,9 +62,27 @@ def lambda_handler(event, context):
         sortField = sort.get('field') or 'title'
         sortDirection = sort.get('direction') or 'asc'
 
-        data = get_events_from_os(sortField, sortDirection, limit, nextToken)
+        # Only mapped fields are sortable, text fields would fail in OpenSearch
+        if sortField not in EVENT_SORT_FIELDS:
+            raise BadRequestError(f'Invalid sort field: {sortField}')
+        if sortDirection not in ['asc', 'desc']:
+            raise BadRequestError('Invalid sort direction')
+
+        # Numeric nextToken keeps the from/size offset paging used by existing clients,
+        # an opaque string nextToken or pagination=cursor switches to search_after
+        if isinstance(nextToken, str) and nextToken.isdigit():
+            nextToken = int(nextToken)
+        cursorMode = requestBody.get('pagination') == 'cursor' or isinstance(nextToken, str)
+        pointInTime = requestBody.get('pointInTime') is True
+        trackTotalHits = parse_track_total_hits(requestBody.get('trackTotalHits'))
+        filters = compile_filters(requestBody.get('filters') or {})
+        facets = compile_facets(requestBody.get('facets') or {})
+
+        data = list_events(sortField, sortDirection, limit, nextToken, cursorMode, pointInTime, trackTotalHits, filters, facets)
 
         return HttpResponse(200, origin=WEB_ORIGIN, data=data)
+    except BadRequestError as ex:
+        return HttpResponse(400, origin=WEB_ORIGIN, data={'message': str(ex)})
     except Exception as ex:
         tracer.put_annotation('lambda_error', 'true')
         tracer.put_annotation('lambda_name', context.function_name)
@@ -49,42 +91,185 @@ def lambda_handler(event, context):
         logger.exception({'message': str(ex)})
         return HttpResponse(500, origin=WEB_ORIGIN, data={'message': 'Something went wrong. Please try again later.'})
 
+def compile_filters(filters):
+    # Filter context clauses are not scored and OpenSearch caches their
+    # bitsets, so repeated listings with the same filters skip the lookup
+    if not isinstance(filters, dict):
+        raise BadRequestError('Invalid filters')
+
+    clauses = []
+    for field in sorted(filters):
+        value = filters[field]
+        if field in TERM_FILTER_FIELDS:
+            if isinstance(value, list) and value and all(isinstance(item, str) for item in value):
+                clauses.append({'terms': {field: sorted(set(value))}})
+            elif isinstance(value, str):
+                clauses.append({'term': {field: value}})
+            else:
+                raise BadRequestError(f'Invalid filter value: {field}')
+        elif field in BOOLEAN_FILTER_FIELDS:
+            if not isinstance(value, bool):
+                raise BadRequestError(f'Invalid filter value: {field}')
+            clauses.append({'term': {field: value}})
+        elif field in RANGE_FILTER_FIELDS:
+            if not isinstance(value, dict) or not value or set(value) - set(RANGE_OPERATORS) or not all(isinstance(item, str) for item in value.values()):
+                raise BadRequestError(f'Invalid filter value: {field}')
+            clauses.append({'range': {field: {operator: value[operator] for operator in sorted(value)}}})
+        else:
+            raise BadRequestError(f'Invalid filter: {field}')
+
+    return clauses
+
+def compile_facets(facets):
+    # Accepts a list of fields, or a mapping of field to bucket count
+    if isinstance(facets, list):
+        facets = {field: FACET_DEFAULT_SIZE for field in facets}
+    if not isinstance(facets, dict):
+        raise BadRequestError('Invalid facets')
+
+    aggregations = dict()
+    for field in sorted(facets):
+        size = facets[field]
+        if field not in FACET_FIELDS:
+            raise BadRequestError(f'Invalid facet: {field}')
+        if isinstance(size, bool) or not isinstance(size, int) or not 0 < size <= FACET_MAX_SIZE:
+            raise BadRequestError(f'Invalid facet size: {field}')
+        aggregations[field] = {'terms': {'field': field, 'size': size}}
+
+    return aggregations
+
+def parse_track_total_hits(trackTotalHits):
+    # true counts exactly, false skips counting, a number counts up to that
+    # many hits and reports the rest as a lower bound
+    if trackTotalHits is None or isinstance(trackTotalHits, bool):
+        return trackTotalHits
+    if isinstance(trackTotalHits, int) and trackTotalHits > 0:
+        return trackTotalHits
+    raise BadRequestError('Invalid trackTotalHits')
+
+def encode_cursor(sortValues, pitId=None):
+    cursor = {'sort': sortValues}
+    if pitId:
+        cursor['pit'] = pitId
+    return base64.urlsafe_b64encode(json.dumps(cursor, separators=(',', ':')).encode()).decode()
+
+def decode_cursor(nextToken):
+    try:
+        cursor = json.loads(base64.urlsafe_b64decode(nextToken.encode()))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        raise BadRequestError('Invalid nextToken')
+
+    if not isinstance(cursor, dict) or not isinstance(cursor.get('sort'), list):
+        raise BadRequestError('Invalid nextToken')
+    return cursor.get('sort'), cursor.get('pit')
+
 @tracer.capture_method
-def get_events_from_os(sortField, sortDirection, limit, nextToken):
-    esURL = 'https://' + ES_DOMAIN_ENDPOINT + "/event/_doc/_search"
+def open_point_in_time():
+    response = OS_TRANSPORT.request('POST', f'/{EVENT_INDEX_ALIAS}/_search/point_in_time', params={'keep_alive': PIT_KEEP_ALIVE})
+    return response.get('pit_id')
+
+@tracer.capture_method
+def close_point_in_time(pitId):
+    OS_TRANSPORT.request('DELETE', '/_search/point_in_time', {'pit_id': [pitId]})
+
+@tracer.capture_method
+def list_events(sortField, sortDirection, limit, nextToken, cursorMode=False, pointInTime=False, trackTotalHits=None, filters=None, facets=None):
+    args = (sortField, sortDirection, limit, nextToken, cursorMode, pointInTime, trackTotalHits, filters, facets)
+
+    # Point-in-time pages belong to one client's snapshot and are never cached
+    if REDIS_CLIENT is None or pointInTime or (isinstance(nextToken, str) and decode_cursor(nextToken)[1]):
+        return get_events_from_os(*args)
+
+    try:
+        generation = GetCacheGeneration(REDIS_CLIENT, EVENT_LIST_GENERATION)
+    except Exception as ex:
+        logger.warning({'message': 'Cache read failed', 'error': str(ex)})
+        return get_events_from_os(*args)
+
+    cacheKey = EventListCacheKey(generation, args)
+    return GetOrLoadCacheValue(REDIS_CLIENT, cacheKey, lambda: get_events_from_os(*args), EVENT_LIST_CACHE_TTL, 'eventList')
+
+@tracer.capture_method
+def get_events_from_os(sortField, sortDirection, limit, nextToken, cursorMode=False, pointInTime=False, trackTotalHits=None, filters=None, facets=None):
     query = {
         'bool': {
-            'must': [],
-            'filter': {'term': {'isDeleted': False}}
+            'filter': [{'term': {'isDeleted': False}}] + (filters or [])
         }
     }
 
-    if sortField in NON_SORT_KEYWORD_FIELDS:
-        sortField += '.keyword'
+    # title and venue sort on their normalized keyword sub-field
+    sortField = EVENT_SORT_FIELDS.get(sortField, sortField)
 
     payload = dict()
     payload['query'] = query
     payload['size'] = limit
-    payload['sort'] = {sortField: {'order': sortDirection}}
-    payload['from'] = nextToken
+    payload['sort'] = [
+        {sortField: {'order': sortDirection}},
+        {SORT_TIEBREAKER_FIELD: {'order': 'asc'}}
+    ]
     payload['_source'] = [
         'eventId', 'title', 'shortDescription', 'seoUrl',
         'displayAdmission', 'eventDate', 'displayDate', 'displayVenue',
         'venue', 'region', 'media', 'category', 'topic', 'status'
     ]
+    if trackTotalHits is not None:
+        payload['track_total_hits'] = trackTotalHits
+    if facets:
+        # Counted in the same search as the hits, over the same filtered documents
+        payload['aggs'] = facets
+
+    searchPath = f'/{EVENT_INDEX_ALIAS}/_search'
+    pitId = None
+    if cursorMode:
+        # search_after seeks straight to the last hit's sort values, so every
+        # page costs the same and is not capped by max_result_window
+        searchAfter = None
+        if isinstance(nextToken, str):
+            searchAfter, pitId = decode_cursor(nextToken)
+        elif pointInTime:
+            pitId = open_point_in_time()
+
+        if searchAfter:
+            payload['search_after'] = searchAfter
+        if pitId:
+            # A point-in-time search already names its index
+            payload['pit'] = {'id': pitId, 'keep_alive': PIT_KEEP_ALIVE}
+            searchPath = '/_search'
+    else:
+        payload['from'] = nextToken
 
-    response = requests.request("GET", esURL, data=json.dumps(payload), headers=HEADERS, auth=AWSAUTH)
-    responseText = json.loads(response.text)
+    filterPath = SEARCH_FILTER_PATH + (CURSOR_FILTER_PATH if cursorMode else []) + (FACET_FILTER_PATH if facets else [])
+    responseText = OS_TRANSPORT.request('GET', searchPath, payload, params={'filter_path': ','.join(filterPath)})
+    logger.info({'message': 'OpenSearch timings', **OS_TRANSPORT.lastTimings})
 
     data = dict()
     data['items'] = []
 
-    for hit in responseText.get('hits', {}).get('hits', []):
-        print(hit)
+    hits = responseText.get('hits', {}).get('hits', [])
+    for hit in hits:
         hitSource = hit.get('_source', {})
         data['items'].append(hitSource)
-    
-    data['total'] = responseText.get('hits', {}).get('total', {}).get('value')
-    data['nextToken'] = limit + nextToken if limit == len(data['items']) else nextToken + len(data['items'])
+
+    total = responseText.get('hits', {}).get('total', {})
+    data['total'] = total.get('value')
+    if total.get('relation') == 'gte':
+        data['totalRelation'] = 'gte'
+
+    if facets:
+        # Buckets are returned as [key, count] pairs to keep the payload small
+        aggregations = responseText.get('aggregations', {})
+        data['facets'] = {
+            field: [[bucket.get('key'), bucket.get('doc_count')] for bucket in aggregations.get(field, {}).get('buckets', [])]
+            for field in facets
+        }
+
+    if not cursorMode:
+        data['nextToken'] = limit + nextToken if limit == len(data['items']) else nextToken + len(data['items'])
+    elif hits and limit == len(hits):
+        data['nextToken'] = encode_cursor(hits[-1].get('sort'), responseText.get('pit_id') or pitId)
+    else:
+        data['nextToken'] = None
+        if pitId:
+            close_point_in_time(pitId)
 
     return data
@@ -1,24 +1,46 @@
 import os
-import boto3
 import simplejson as json
 from decimal import Decimal
 from datetime import datetime
-from boto3.dynamodb.conditions import Key, Attr
+from functools import lru_cache
 from aws_lambda_powertools import Logger, Tracer
 
 # Custom Libraries
 from enum_helper import EventStatus
-from http_helper import HttpResponse
-from custom_exceptions import BadRequestError
+from http_helper import HttpResponse, GetIfMatchVersion, VersionETag
+from aws_client_helper import GetTable, PrewarmClients
+from dynamodb_helper import TransactWriteItems
+from seourl_guard_helper import SEOURL_CONFLICT_REASON, IsSeoUrlGuard, SeoUrlGuardPut, SeoUrlGuardDelete
+from codepipeline_helper import triggerPublicWebRegeneration, changeManifestEntry
+from cache_helper import GetRedisClient
+from event_cache_helper import InvalidateEventCache
+from custom_exceptions import BadRequestError, ConflictError, NotFoundError
 
 # Environment Variables
 WEB_ORIGIN = os.environ.get('WEB_ORIGIN')
 EVENT_TABLE = os.environ.get('EVENT_TABLE')
+PUBLIC_WEB_PIPELINE_NAME = os.environ.get('PUBLIC_WEB_PIPELINE_NAME')
+REGENERATION_TABLE = os.environ.get('REGENERATION_TABLE')
 
 # AWS Client or Resource
-DDB_RESOURCE = boto3.resource('dynamodb')
+PrewarmClients()
+EVENT_DDB_TABLE = GetTable(EVENT_TABLE)
+REDIS_CLIENT = GetRedisClient()
+REGENERATION_DDB_TABLE = GetTable(REGENERATION_TABLE) if REGENERATION_TABLE else None
 
-EVENT_DDB_TABLE = DDB_RESOURCE.Table(EVENT_TABLE)
+# Attributes a sparse update may write, every other key in the body is ignored
+UPDATABLE_FIELDS = (
+    'title', 'shortDescription', 'longDescription', 'media', 'status', 'isHighlighted', 'venue',
+    'displayVenue', 'region', 'eventDate', 'displayDate', 'openingHours', 'admission',
+    'displayAdmission', 'organizer', 'category', 'topic', 'seoUrl', 'ticketUrl', 'websiteUrl',
+    'facebookUrl', 'instagramUrl'
+)
+
+# Every write bumps the version, events written before versioning start from 0
+VERSION_UPDATE_EXPRESSION = '#version=if_not_exists(#version, :zero) + :one'
+# Written by every update, never a reason to regenerate a page on their own
+BOOKKEEPING_FIELDS = ('eventId', 'version', 'updatedAt', 'updatedBy')
+CONFLICT_MESSAGE = 'Event has been modified, please reload it.'
 
 logger = Logger()
 tracer = Tracer()
@@ -30,6 +52,21 @@ def lambda_handler(event, context):
         requesterEmail = event.get('requestContext', {}).get('authorizer', {}).get('claims', {}).get('email')
         eventBody = event.get('body') or '{}'
         requestBody = json.loads(eventBody)
+        queryStringParameters = event.get('queryStringParameters') or {}
+        expectedVersion = GetIfMatchVersion(event)
+
+        if queryStringParameters.get('mode') == 'sparse':
+            eventId = requestBody.get('eventId')
+            changes = {field: requestBody[field] for field in UPDATABLE_FIELDS if field in requestBody}
+
+            if not eventId or not changes or ('status' in changes and changes['status'] not in [EventStatus.ACTIVE, EventStatus.INACTIVE]):
+                raise BadRequestError('Invalid Parameters')
+
+            if 'seoUrl' in changes and not is_valid_seourl(changes['seoUrl']):
+                raise BadRequestError('Invalid Parameters')
+
+            event = update_event_fields(eventId, changes, requesterEmail, now, expectedVersion)
+            return HttpResponse(200, origin=WEB_ORIGIN, data=event, headers={'ETag': VersionETag(event['version'])})
 
         eventId = requestBody.get('eventId')
         title = requestBody.get('title')
@@ -55,22 +92,23 @@ def lambda_handler(event, context):
         facebookUrl = requestBody.get('facebookUrl')
         instagramUrl = requestBody.get('instagramUrl')
 
-        if not requestBody or not eventId or status not in [EventStatus.ACTIVE, EventStatus.INACTIVE]:
+        if not requestBody or not eventId or status not in [EventStatus.ACTIVE, EventStatus.INACTIVE] or not is_valid_seourl(seoUrl):
             raise BadRequestError('Invalid Parameters')
-        
-        if check_seourl_existence(eventId, seoUrl):
-            raise BadRequestError('SeoUrl already exists.')
 
         event = update_event(
             eventId, title, shortDescription, longDescription, media, status, displayVenue,
             isHighlighted, venue, region, eventDate, displayDate, openingHours, admission, 
             category, topic, seoUrl, ticketUrl, websiteUrl, displayAdmission, organizer,
-            facebookUrl, instagramUrl, requesterEmail, now
+            facebookUrl, instagramUrl, requesterEmail, now, expectedVersion
         )
 
-        return HttpResponse(200, origin=WEB_ORIGIN, data=event)
+        return HttpResponse(200, origin=WEB_ORIGIN, data=event, headers={'ETag': VersionETag(event['version'])})
     except BadRequestError as ex:
         return HttpResponse(400, origin=WEB_ORIGIN, data={'message': str(ex)})
+    except ConflictError as ex:
+        return HttpResponse(409, origin=WEB_ORIGIN, data={'message': str(ex)})
+    except NotFoundError as ex:
+        return HttpResponse(404, origin=WEB_ORIGIN, data={'message': str(ex)})
     except Exception as ex:
         tracer.put_annotation('lambda_error', 'true')
         tracer.put_annotation('lambda_name', context.function_name)
@@ -79,28 +117,124 @@ def lambda_handler(event, context):
         logger.exception({'message': str(ex)})
         return HttpResponse(500, origin=WEB_ORIGIN, data={'message': 'Something went wrong. Please try again later.'})
 
+def is_valid_seourl(seoUrl):
+    return isinstance(seoUrl, str) and bool(seoUrl)
+
+def version_condition(version, expressionAttributeValues):
+    if not version:
+        return 'attribute_not_exists(#version)'
+
+    expressionAttributeValues[':expectedVersion'] = version
+    return '#version = :expectedVersion'
+
+def changed_fields(previous, expressionAttributeNames, expressionAttributeValues):
+    # Only the fields whose value changed, rewriting an event as it was
+    # leaves its pages as they are
+    return [
+        field for field in expressionAttributeNames.values()
+        if field not in BOOKKEEPING_FIELDS and f':{field}' in expressionAttributeValues
+        and (previous is None or previous.get(field) != expressionAttributeValues[f':{field}'])
+    ]
+
 @tracer.capture_method
-def check_seourl_existence(eventId, seoUrl):
-    eventResp = EVENT_DDB_TABLE.query(
-        IndexName='gsi-seoUrl',
-        KeyConditionExpression=Key('seoUrl').eq(seoUrl),
-        FilterExpression=Attr('eventId').ne(eventId)
-    )
-    
-    return eventResp.get('Items')
+def write_event_update(eventId, seoUrl, updateExpression, expressionAttributeNames, expressionAttributeValues, mustExist=False, expectedVersion=None):
+    # An update that keeps the seoUrl also keeps its guard, so it is a single
+    # update_item conditional on the seoUrl being unchanged. Only when that
+    # fails is the event read, to move the guard along with a new seoUrl.
+    # Returns the event as it was before the update and the version it now has.
+
+    # seoUrl guard items share the table but are not events
+    if IsSeoUrlGuard(eventId):
+        raise NotFoundError('Event Not Found.')
+
+    expressionAttributeNames = {**expressionAttributeNames, '#eventId': 'eventId', '#seoUrl': 'seoUrl', '#version': 'version'}
+    updateValues = dict(expressionAttributeValues)
+    conditionExpression = 'attribute_exists(#eventId) AND #seoUrl = :seoUrl'
+    if expectedVersion is not None:
+        conditionExpression += ' AND ' + version_condition(expectedVersion, updateValues)
+
+    try:
+        previous = EVENT_DDB_TABLE.update_item(
+            Key={'eventId': eventId},
+            UpdateExpression=updateExpression,
+            ConditionExpression=conditionExpression,
+            ExpressionAttributeNames=expressionAttributeNames,
+            ExpressionAttributeValues=updateValues,
+            ReturnValues='ALL_OLD'
+        ).get('Attributes')
+    except EVENT_DDB_TABLE.meta.client.exceptions.ConditionalCheckFailedException:
+        previous = move_event_seourl(eventId, seoUrl, updateExpression, expressionAttributeNames, expressionAttributeValues, mustExist, expectedVersion)
+
+    previousSeoUrl = (previous or {}).get('seoUrl')
+    changedFields = changed_fields(previous, expressionAttributeNames, expressionAttributeValues)
+
+    InvalidateEventCache(REDIS_CLIENT, [eventId])
+    if changedFields:
+        regenerate_public_web([changeManifestEntry(eventId, changedFields, previousSeoUrl, seoUrl)])
+    return previous or {'eventId': eventId}, int((previous or {}).get('version', 0)) + 1
+
+def move_event_seourl(eventId, seoUrl, updateExpression, expressionAttributeNames, expressionAttributeValues, mustExist, expectedVersion):
+    # The event update, the guard of the new seoUrl and the release of the old
+    # one go in one transaction, conditional on the seoUrl that was read and
+    # the If-Match version (or the version read without one), so a concurrent
+    # update cannot leave a guard behind. Returns the event as it was before
+    # the update.
+    previous = EVENT_DDB_TABLE.get_item(Key={'eventId': eventId}, ConsistentRead=True).get('Item')
+    if previous is None and mustExist:
+        raise BadRequestError('Event not found.')
+
+    previousSeoUrl = (previous or {}).get('seoUrl')
+    expressionAttributeValues = dict(expressionAttributeValues)
+    if previous is None and expectedVersion is None:
+        conditionExpression = 'attribute_not_exists(#eventId)'
+    else:
+        # The If-Match version goes into the condition as it is, a stale one
+        # cancels the transaction
+        version = expectedVersion if expectedVersion is not None else int((previous or {}).get('version', 0))
+        conditionExpression = 'attribute_exists(#eventId) AND ' + version_condition(version, expressionAttributeValues)
+        if previousSeoUrl is None:
+            conditionExpression += ' AND attribute_not_exists(#seoUrl)'
+        else:
+            conditionExpression += ' AND #seoUrl = :previousSeoUrl'
+            expressionAttributeValues[':previousSeoUrl'] = previousSeoUrl
+
+    actions = [
+        {'Update': {
+            'Key': {'eventId': eventId},
+            'UpdateExpression': updateExpression,
+            'ConditionExpression': conditionExpression,
+            'ExpressionAttributeNames': expressionAttributeNames,
+            'ExpressionAttributeValues': expressionAttributeValues
+        }}
+    ]
+    # Lost a race to an update that kept the seoUrl, the guard stays as it is
+    if previous is None or previousSeoUrl != seoUrl:
+        actions.append(SeoUrlGuardPut(seoUrl, eventId))
+        if previousSeoUrl:
+            actions.append(SeoUrlGuardDelete(previousSeoUrl, eventId))
+
+    reasons = TransactWriteItems(EVENT_DDB_TABLE, actions)
+    if reasons and reasons[0] == SEOURL_CONFLICT_REASON:
+        raise ConflictError(CONFLICT_MESSAGE)
+    if reasons and len(reasons) > 1 and reasons[1] == SEOURL_CONFLICT_REASON:
+        raise BadRequestError('SeoUrl already exists.')
+    if reasons:
+        raise Exception(f'Failed to update Event: {reasons}')
+
+    return previous
 
 @tracer.capture_method
 def update_event(
     eventId, title, shortDescription, longDescription, media, status, displayVenue,
     isHighlighted, venue, region, eventDate, displayDate, openingHours, admission, 
     category, topic, seoUrl, ticketUrl, websiteUrl, displayAdmission, organizer,
-    facebookUrl, instagramUrl, requesterEmail, now
+    facebookUrl, instagramUrl, requesterEmail, now, expectedVersion=None
 ):
     updateExpression = 'SET #title=:title, #shortDescription=:shortDescription, #longDescription=:longDescription, #media=:media, #status=:status, #displayVenue=:displayVenue'
     updateExpression += ', #isHighlighted=:isHighlighted, #venue=:venue, #region=:region, #eventDate=:eventDate, #displayDate=:displayDate, #openingHours=:openingHours'
     updateExpression += ', #admission=:admission, #category=:category, #topic=:topic, #seoUrl=:seoUrl, #organizer=:organizer'
     updateExpression += ', #ticketUrl=:ticketUrl, #websiteUrl=:websiteUrl, #facebookUrl=:facebookUrl, #instagramUrl=:instagramUrl'
-    updateExpression += ', #updatedAt=:updatedAt, #updatedBy=:updatedBy, #displayAdmission=:displayAdmission'
+    updateExpression += ', #updatedAt=:updatedAt, #updatedBy=:updatedBy, #displayAdmission=:displayAdmission, ' + VERSION_UPDATE_EXPRESSION
 
     expressionAttributeNames = {
         '#title': 'title',
@@ -153,19 +287,78 @@ def update_event(
         ':facebookUrl': facebookUrl,
         ':instagramUrl': instagramUrl,
         ':updatedAt': now,
-        ':updatedBy': requesterEmail
+        ':updatedBy': requesterEmail,
+        ':zero': 0,
+        ':one': 1
     }
 
-    eventResp = EVENT_DDB_TABLE.update_item(
-        Key={'eventId': eventId},
-        UpdateExpression=updateExpression,
-        ExpressionAttributeNames=expressionAttributeNames,
-        ExpressionAttributeValues=expressionAttributeValues,
-        ReturnValues='ALL_NEW'
-    )
-
-    event = eventResp.get('Attributes')
-    if not event:
-        raise Exception('Failed to update Event.')
-    
-    return event
+    # Every attribute is set, so the stored event merged with the new values is
+    # what ALL_NEW would have returned
+    previous, version = write_event_update(eventId, seoUrl, updateExpression, expressionAttributeNames, expressionAttributeValues, expectedVersion=expectedVersion)
+    return {**previous, **{name: expressionAttributeValues[f':{name}'] for name in expressionAttributeNames.values()}, 'version': version}
+
+@lru_cache(maxsize=128)
+def sparse_update_template(fields):
+    # Keyed by the sorted tuple of changed fields, so requests touching the same
+    # fields share one expression. The returned dict must not be mutated.
+    fields = fields + ('updatedAt', 'updatedBy')
+    updateExpression = 'SET ' + ', '.join(f'#{field}=:{field}' for field in fields) + ', ' + VERSION_UPDATE_EXPRESSION
+    expressionAttributeNames = {f'#{field}': field for field in fields + ('eventId', 'version')}
+
+    return updateExpression, expressionAttributeNames
+
+@tracer.capture_method
+def update_event_fields(eventId, changes, requesterEmail, now, expectedVersion=None):
+    if IsSeoUrlGuard(eventId):
+        raise NotFoundError('Event Not Found.')
+
+    updateExpression, expressionAttributeNames = sparse_update_template(tuple(sorted(changes)))
+
+    expressionAttributeValues = {f':{field}': value for field, value in changes.items()}
+    expressionAttributeValues[':updatedAt'] = now
+    expressionAttributeValues[':updatedBy'] = requesterEmail
+    expressionAttributeValues[':zero'] = 0
+    expressionAttributeValues[':one'] = 1
+
+    if 'seoUrl' in changes:
+        # Moving the seoUrl also moves its guard, which needs a transaction
+        # instead of UPDATED_NEW, the written values are returned as they are
+        _, version = write_event_update(eventId, changes['seoUrl'], updateExpression, expressionAttributeNames, expressionAttributeValues, mustExist=True, expectedVersion=expectedVersion)
+        return {'eventId': eventId, **changes, 'updatedAt': now, 'updatedBy': requesterEmail, 'version': version}
+
+    # A sparse update must not create a partial Event
+    conditionExpression = 'attribute_exists(#eventId)'
+    if expectedVersion is not None:
+        conditionExpression += ' AND ' + version_condition(expectedVersion, expressionAttributeValues)
+
+    try:
+        eventResp = EVENT_DDB_TABLE.update_item(
+            Key={'eventId': eventId},
+            UpdateExpression=updateExpression,
+            ConditionExpression=conditionExpression,
+            ExpressionAttributeNames=expressionAttributeNames,
+            ExpressionAttributeValues=expressionAttributeValues,
+            ReturnValues='ALL_OLD'
+        )
+    except EVENT_DDB_TABLE.meta.client.exceptions.ConditionalCheckFailedException:
+        # Only read on failure, to tell a stale version from a missing event
+        if expectedVersion is not None and EVENT_DDB_TABLE.get_item(Key={'eventId': eventId}, ProjectionExpression='eventId').get('Item'):
+            raise ConflictError(CONFLICT_MESSAGE)
+        raise BadRequestError('Event not found.')
+
+    # Compared against the event as it was, so rewriting a value it already
+    # had does not regenerate its pages
+    previous = eventResp.get('Attributes', {})
+    changedFields = changed_fields(previous, expressionAttributeNames, expressionAttributeValues)
+
+    InvalidateEventCache(REDIS_CLIENT, [eventId])
+    # The seoUrl was not moved, the build looks it up by eventId
+    if changedFields:
+        regenerate_public_web([changeManifestEntry(eventId, changedFields)])
+    return {'eventId': eventId, **changes, 'updatedAt': now, 'updatedBy': requesterEmail, 'version': int(previous.get('version', 0)) + 1}
+
+def regenerate_public_web(changes):
+    # Coalesced per debounce window when REGENERATION_TABLE is set, the
+    # changes go into the manifest of the run that publishes them
+    if PUBLIC_WEB_PIPELINE_NAME:
+        triggerPublicWebRegeneration(PUBLIC_WEB_PIPELINE_NAME, REGENERATION_DDB_TABLE, changes=changes)
@@ -0,0 +1,208 @@
+import os
+import time
+import uuid
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from elasticsearch.helpers import parallel_bulk
+from requests_aws4auth import AWS4Auth
+from aws_lambda_powertools import Logger, Tracer
+
+# Custom Libraries
+from aws_client_helper import GetTable
+from credentials_helper import GetCredentials
+from opensearch_helper import OpenSearchTransport
+from opensearch_bulk_helper import OpenSearchBulkClient
+from event_index_helper import EVENT_INDEX_ALIAS
+from seourl_guard_helper import IsSeoUrlGuard
+
+# Environment Variables
+EVENT_TABLE = os.environ.get('EVENT_TABLE')
+CHECKPOINT_TABLE = os.environ.get('CHECKPOINT_TABLE')
+ES_DOMAIN_ENDPOINT = os.environ.get('ES_DOMAIN_ENDPOINT')
+REINDEX_TOTAL_SEGMENTS = int(os.environ.get('REINDEX_TOTAL_SEGMENTS', '8'))
+SCAN_PAGE_LIMIT = int(os.environ.get('SCAN_PAGE_LIMIT', '0'))
+BULK_THREAD_COUNT = int(os.environ.get('BULK_THREAD_COUNT', '2'))
+BULK_INITIAL_CHUNK_SIZE = int(os.environ.get('BULK_INITIAL_CHUNK_SIZE', '500'))
+BULK_MIN_CHUNK_SIZE = int(os.environ.get('BULK_MIN_CHUNK_SIZE', '50'))
+BULK_MAX_CHUNK_SIZE = int(os.environ.get('BULK_MAX_CHUNK_SIZE', '2000'))
+BULK_TARGET_LATENCY = float(os.environ.get('BULK_TARGET_LATENCY', '1'))
+BULK_MAX_RETRIES = int(os.environ.get('BULK_MAX_RETRIES', '5'))
+BULK_INITIAL_BACKOFF = float(os.environ.get('BULK_INITIAL_BACKOFF', '0.5'))
+BULK_MAX_BACKOFF = float(os.environ.get('BULK_MAX_BACKOFF', '10'))
+
+# No new scan page is started this close to the Lambda timeout, the run is
+# resumed from its checkpoints by invoking again with the same runId
+DEADLINE_MARGIN_SECONDS = 30
+
+class AdaptiveChunkSize(object):
+    """Bulk chunk size shared by every segment.
+
+    Halved whenever OpenSearch throttles (429), shrunk while bulk requests take
+    longer than the target latency and grown step by step while they finish
+    well inside it.
+    """
+
+    def __init__(self, chunkSize=BULK_INITIAL_CHUNK_SIZE, minimum=BULK_MIN_CHUNK_SIZE, maximum=BULK_MAX_CHUNK_SIZE, targetLatency=BULK_TARGET_LATENCY):
+        self.chunkSize = chunkSize
+        self.minimum = minimum
+        self.maximum = maximum
+        self.targetLatency = targetLatency
+        self.lock = threading.Lock()
+
+    def record(self, bulkLines, seconds, statusCode, throttledItems):
+        with self.lock:
+            if statusCode == 429 or throttledItems:
+                self.chunkSize = max(self.minimum, self.chunkSize // 2)
+            elif seconds > self.targetLatency:
+                self.chunkSize = max(self.minimum, int(self.chunkSize * 0.8))
+            elif seconds < self.targetLatency / 2:
+                self.chunkSize = min(self.maximum, self.chunkSize + self.minimum)
+
+# AWS Client or Resource
+EVENT_DDB_TABLE = GetTable(EVENT_TABLE)
+CHECKPOINT_DDB_TABLE = GetTable(CHECKPOINT_TABLE)
+
+# Get AWS Credentials
+AWSAUTH = AWS4Auth(region='ap-southeast-1', service='es', refreshable_credentials=GetCredentials())
+
+# Pooled keep-alive connections reused across warm invocations
+OS_TRANSPORT = OpenSearchTransport(ES_DOMAIN_ENDPOINT, AWSAUTH, poolMaxsize=REINDEX_TOTAL_SEGMENTS * BULK_THREAD_COUNT)
+CHUNK_SIZE = AdaptiveChunkSize()
+BULK_CLIENT = OpenSearchBulkClient(OS_TRANSPORT, onResponse=CHUNK_SIZE.record)
+
+logger = Logger()
+tracer = Tracer()
+
+@tracer.capture_lambda_handler
+def lambda_handler(event, context):
+    runId = event.get('runId') or str(uuid.uuid4())
+    run = load_run(runId, event.get('targetIndex') or EVENT_INDEX_ALIAS, int(event.get('totalSegments') or REINDEX_TOTAL_SEGMENTS))
+
+    deadline = None
+    if hasattr(context, 'get_remaining_time_in_millis'):
+        deadline = time.monotonic() + context.get_remaining_time_in_millis() / 1000 - DEADLINE_MARGIN_SECONDS
+
+    checkpoints = load_checkpoints(runId, int(run['totalSegments']))
+    pending = [checkpoint for checkpoint in checkpoints if not checkpoint['completed']]
+
+    # Each segment is an independent Scan, so they run side by side
+    if pending:
+        with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+            list(executor.map(lambda checkpoint: reindex_segment(run, checkpoint, deadline), pending))
+
+    summary = {
+        'runId': runId,
+        'targetIndex': run['targetIndex'],
+        'completed': all(checkpoint['completed'] for checkpoint in checkpoints),
+        'completedSegments': sum(1 for checkpoint in checkpoints if checkpoint['completed']),
+        'indexed': int(sum(checkpoint['indexed'] for checkpoint in checkpoints)),
+        'failed': int(sum(checkpoint['failed'] for checkpoint in checkpoints)),
+        'chunkSize': CHUNK_SIZE.chunkSize
+    }
+    logger.info({'message': 'Reindex progress', **summary})
+    return summary
+
+@tracer.capture_method
+def load_run(runId, targetIndex, totalSegments):
+    # A resumed run keeps the target index and segment count it started with,
+    # the saved segment positions are only valid for that split
+    run = CHECKPOINT_DDB_TABLE.get_item(Key={'checkpointId': runId}).get('Item')
+    if run:
+        return run
+
+    run = {
+        'checkpointId': runId,
+        'targetIndex': targetIndex,
+        'totalSegments': totalSegments,
+        'createdAt': datetime.now().strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+    }
+    CHECKPOINT_DDB_TABLE.put_item(Item=run)
+    return run
+
+@tracer.capture_method
+def load_checkpoints(runId, totalSegments):
+    checkpoints = []
+    for segment in range(totalSegments):
+        checkpointId = f'{runId}#{segment}'
+        checkpoint = CHECKPOINT_DDB_TABLE.get_item(Key={'checkpointId': checkpointId}).get('Item')
+        checkpoints.append(checkpoint or {
+            'checkpointId': checkpointId,
+            'runId': runId,
+            'segment': segment,
+            'indexed': 0,
+            'failed': 0,
+            'completed': False
+        })
+    return checkpoints
+
+def save_checkpoint(checkpoint):
+    checkpoint['updatedAt'] = datetime.now().strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+    CHECKPOINT_DDB_TABLE.put_item(Item={key: value for key, value in checkpoint.items() if value is not None})
+
+@tracer.capture_method
+def reindex_segment(run, checkpoint, deadline=None):
+    scanKwargs = {'Segment': int(checkpoint['segment']), 'TotalSegments': int(run['totalSegments'])}
+    if SCAN_PAGE_LIMIT:
+        scanKwargs['Limit'] = SCAN_PAGE_LIMIT
+
+    try:
+        while not checkpoint['completed']:
+            if deadline and time.monotonic() > deadline:
+                break
+            if checkpoint.get('lastEvaluatedKey'):
+                scanKwargs['ExclusiveStartKey'] = checkpoint['lastEvaluatedKey']
+
+            response = EVENT_DDB_TABLE.scan(**scanKwargs)
+            indexed, failed = index_documents(run['targetIndex'], response.get('Items', []))
+
+            # Saved only after the page is acknowledged, so a crash repeats at
+            # most one page per segment
+            checkpoint['indexed'] += indexed
+            checkpoint['failed'] += failed
+            checkpoint['lastEvaluatedKey'] = response.get('LastEvaluatedKey')
+            checkpoint['completed'] = 'LastEvaluatedKey' not in response
+            save_checkpoint(checkpoint)
+    except Exception as ex:
+        logger.exception({'message': str(ex), 'segment': checkpoint['segment']})
+
+    return checkpoint
+
+@tracer.capture_method
+def index_documents(targetIndex, items):
+    documents = {item['eventId']: item for item in items if item.get('eventId') and not IsSeoUrlGuard(item['eventId'])}
+    indexed, failed, attempt = 0, 0, 0
+
+    while documents:
+        throttled = dict()
+        actions = ({'_op_type': 'index', '_index': targetIndex, '_id': eventId, '_source': document} for eventId, document in documents.items())
+        results = parallel_bulk(
+            BULK_CLIENT,
+            actions,
+            thread_count=BULK_THREAD_COUNT,
+            chunk_size=CHUNK_SIZE.chunkSize,
+            raise_on_error=False,
+            raise_on_exception=False
+        )
+
+        roundFailed = 0
+        for ok, item in results:
+            if ok:
+                continue
+            _, info = next(iter(item.items()))
+            if info.get('status') == 429 and attempt < BULK_MAX_RETRIES:
+                throttled[info.get('_id')] = documents[info.get('_id')]
+            else:
+                logger.warning({'message': 'Failed to index event', 'eventId': info.get('_id'), 'status': info.get('status'), 'error': info.get('error')})
+                roundFailed += 1
+
+        indexed += len(documents) - len(throttled) - roundFailed
+        failed += roundFailed
+
+        # Throttled documents are sent again, in the smaller chunks the 429s caused
+        documents = throttled
+        if documents:
+            attempt += 1
+            time.sleep(min(BULK_MAX_BACKOFF, BULK_INITIAL_BACKOFF * 2 ** (attempt - 1)))
+
+    return indexed, failed
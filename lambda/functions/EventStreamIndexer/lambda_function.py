@@ -0,0 +1,124 @@
+import os
+import time
+from boto3.dynamodb.types import TypeDeserializer
+from elasticsearch.helpers import streaming_bulk
+from requests_aws4auth import AWS4Auth
+from aws_lambda_powertools import Logger, Tracer
+from aws_lambda_powertools.utilities.data_classes import DynamoDBStreamEvent
+from aws_lambda_powertools.utilities.data_classes.dynamo_db_stream_event import DynamoDBRecordEventName
+
+# Custom Libraries
+from credentials_helper import GetCredentials
+from opensearch_helper import OpenSearchTransport
+from opensearch_bulk_helper import OpenSearchBulkClient
+from event_index_helper import EVENT_INDEX_ALIAS
+from seourl_guard_helper import IsSeoUrlGuard
+from cache_helper import GetRedisClient
+from event_cache_helper import InvalidateEventCache
+
+# Environment Variables
+ES_DOMAIN_ENDPOINT = os.environ.get('ES_DOMAIN_ENDPOINT')
+BULK_CHUNK_SIZE = int(os.environ.get('BULK_CHUNK_SIZE', '500'))
+BULK_MAX_RETRIES = int(os.environ.get('BULK_MAX_RETRIES', '2'))
+BULK_INITIAL_BACKOFF = float(os.environ.get('BULK_INITIAL_BACKOFF', '0.5'))
+
+# Get AWS Credentials
+AWSAUTH = AWS4Auth(region='ap-southeast-1', service='es', refreshable_credentials=GetCredentials())
+
+# Pooled keep-alive connections reused across warm invocations
+OS_TRANSPORT = OpenSearchTransport(ES_DOMAIN_ENDPOINT, AWSAUTH)
+REDIS_CLIENT = GetRedisClient()
+BULK_CLIENT = OpenSearchBulkClient(OS_TRANSPORT)
+
+DESERIALIZER = TypeDeserializer()
+
+logger = Logger()
+tracer = Tracer()
+
+@tracer.capture_lambda_handler
+def lambda_handler(event, context):
+    start = time.perf_counter()
+    streamEvent = DynamoDBStreamEvent(event)
+
+    changes = coalesce_records(streamEvent.records)
+    failedSequenceNumbers = index_changes(changes)
+
+    # Listings are served from OpenSearch, so cached ones only go stale once
+    # the change is indexed. Event keys are dropped again for writes made
+    # outside the admin functions.
+    if changes:
+        InvalidateEventCache(REDIS_CLIENT, list(changes))
+
+    duration = time.perf_counter() - start
+    logger.info({
+        'message': 'Indexed stream batch',
+        'records': len(event.get('Records', [])),
+        'documents': len(changes),
+        'failed': len(failedSequenceNumbers),
+        'documentsPerSecond': round(len(changes) / duration, 1) if duration else None
+    })
+
+    # Lambda retries the batch from the lowest failed sequence number
+    return {'batchItemFailures': [{'itemIdentifier': sequenceNumber} for sequenceNumber in failedSequenceNumbers]}
+
+def deserialize_image(image):
+    return {key: DESERIALIZER.deserialize(value) for key, value in (image or {}).items()}
+
+@tracer.capture_method
+def coalesce_records(records):
+    # Only the last image of each event in the batch is indexed, the earlier
+    # sequence numbers are kept so a failure retries from the first of them
+    changes = dict()
+    for record in records:
+        streamRecord = record.dynamodb
+        keys = deserialize_image(streamRecord.raw_event.get('Keys'))
+        eventId = keys.get('eventId')
+        # seoUrl guard items live in the Event table but are not indexed
+        if not eventId or IsSeoUrlGuard(eventId):
+            continue
+
+        change = changes.pop(eventId, {'sequenceNumbers': []})
+        change['sequenceNumbers'].append(streamRecord.sequence_number)
+        if record.event_name == DynamoDBRecordEventName.REMOVE:
+            change['document'] = None
+        else:
+            change['document'] = deserialize_image(streamRecord.raw_event.get('NewImage'))
+
+        # Re-inserted so the bulk request follows the order of the last change
+        changes[eventId] = change
+
+    return changes
+
+def bulk_actions(changes):
+    for eventId, change in changes.items():
+        if change['document'] is None:
+            yield {'_op_type': 'delete', '_index': EVENT_INDEX_ALIAS, '_id': eventId}
+        else:
+            yield {'_op_type': 'index', '_index': EVENT_INDEX_ALIAS, '_id': eventId, '_source': change['document']}
+
+@tracer.capture_method
+def index_changes(changes):
+    failedEventIds = []
+    try:
+        results = streaming_bulk(
+            BULK_CLIENT,
+            bulk_actions(changes),
+            chunk_size=BULK_CHUNK_SIZE,
+            max_retries=BULK_MAX_RETRIES,
+            initial_backoff=BULK_INITIAL_BACKOFF,
+            raise_on_error=False,
+            raise_on_exception=False
+        )
+        # Retried items come back out of order, so results are matched on _id
+        for ok, item in results:
+            operation, info = next(iter(item.items()))
+            # Deleting a document that was never indexed is not a failure
+            if not ok and not (operation == 'delete' and info.get('status') == 404):
+                logger.warning({'message': 'Failed to index event', 'eventId': info.get('_id'), 'status': info.get('status'), 'error': info.get('error')})
+                failedEventIds.append(info.get('_id'))
+    except Exception as ex:
+        # Connection level failures leave nothing indexed for certain
+        logger.exception({'message': str(ex)})
+        failedEventIds = list(changes)
+
+    return sorted((min(changes[eventId]['sequenceNumbers'], key=int) for eventId in failedEventIds), key=int)
@@ -0,0 +1,33 @@
+import os
+from aws_lambda_powertools import Logger, Tracer
+
+# Custom Libraries
+from aws_client_helper import GetTable
+from codepipeline_helper import flushPublicWebRegeneration
+from enum_helper import RegenerationStatus
+
+# Environment Variables
+PUBLIC_WEB_PIPELINE_NAME = os.environ.get('PUBLIC_WEB_PIPELINE_NAME')
+REGENERATION_TABLE = os.environ.get('REGENERATION_TABLE')
+
+# AWS Client or Resource
+REGENERATION_DDB_TABLE = GetTable(REGENERATION_TABLE)
+
+logger = Logger()
+tracer = Tracer()
+
+# Runs on a schedule and publishes the changes the write handlers left
+# pending, e.g. the tail of a burst of edits that fell inside the debounce window
+@tracer.capture_lambda_handler
+def lambda_handler(event, context):
+    try:
+        status = flushPublicWebRegeneration(PUBLIC_WEB_PIPELINE_NAME, REGENERATION_DDB_TABLE)
+    except Exception as ex:
+        tracer.put_annotation('lambda_error', 'true')
+        tracer.put_annotation('lambda_name', context.function_name)
+        tracer.put_metadata('message', str(ex))
+        logger.exception({'message': str(ex)})
+        status = RegenerationStatus.FAILED
+
+    logger.info({'message': 'Public web regeneration flushed', 'pipelineName': PUBLIC_WEB_PIPELINE_NAME, 'status': status.value})
+    return {'pipelineName': PUBLIC_WEB_PIPELINE_NAME, 'status': status.value}
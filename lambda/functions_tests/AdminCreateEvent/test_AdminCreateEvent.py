@@ -1,14 +1,19 @@
 import os
 import json
 import importlib
+from custom_exceptions import BadRequestError
 from mock_services_setup.dynamodb_mock import DynamoDB_Table_Mock, DynamoDB_Get_Item
 from test_data_AdminCreateEvent import (
     InitialEventData,
+    InitialSeoUrlGuardData,
     SampleEvent1,
     SampleEvent2,
     SampleEvent3,
+    SampleBatchEvents1,
     SampleLambdaEvent1,
-    SampleLambdaEvent2
+    SampleLambdaEvent2,
+    SampleLambdaEvent3,
+    SampleLambdaEvent4
 )
 
 # Environment Variables
@@ -24,28 +29,10 @@ EVENT_TABLE_PK = 'eventId'
 class TestAdminCreateEvent():
     def test_create_dynamodb_tables(self, dynamodb_resource):
         globalSecondaryIndexes = ['gsi-seoUrl']
-        EventTable = DynamoDB_Table_Mock(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, globalSecondaryIndexes, InitialEventData)
+        EventTable = DynamoDB_Table_Mock(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, globalSecondaryIndexes, InitialEventData + InitialSeoUrlGuardData)
         assert EventTable.name == EVENT_TABLE
         assert EventTable.global_secondary_indexes[0]['IndexName'] == globalSecondaryIndexes[0]
 
-    def test_check_seourl_existence(self, dynamodb_resource):
-        lambda_function = importlib.import_module("lambda.functions.AdminCreateEvent.lambda_function")
-
-        """ SeoUrl Not Exists """
-        response = lambda_function.check_seourl_existence('test')
-        assert response == []
-
-        """ SeoUrl Exists """
-        response = lambda_function.check_seourl_existence('test1')
-        data = DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, 'test1')
-        assert response != []
-        assert response == [data]
-
-        response = lambda_function.check_seourl_existence('test2')
-        data = DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, 'test2')
-        assert response != []
-        assert response == [data]
-    
     def test_createEvent(self, dynamodb_resource):
         lambda_function = importlib.import_module("lambda.functions.AdminCreateEvent.lambda_function")
 
@@ -54,6 +41,16 @@ class TestAdminCreateEvent():
         data = DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, 'test3')
         assert response == None
         assert data == SampleEvent1
+        data = DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, 'seoUrl#test3')
+        assert data == {'eventId': 'seoUrl#test3', 'ownerEventId': 'test3'}
+
+        """ Create Event (Failed - seoUrl Reserved By Another Event) """
+        try:
+            lambda_function.create_event({**SampleEvent1, 'eventId': 'test4'})
+            assert False
+        except BadRequestError as ex:
+            assert str(ex) == 'SeoUrl already exists.'
+        assert DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, 'test4') is None
 
         """ Create Event (Failed - eventId is None) """
         try:
@@ -69,33 +66,91 @@ class TestAdminCreateEvent():
         except:
             assert True
 
+    def test_create_events_batch(self, dynamodb_resource, mocker):
+        lambda_function = importlib.import_module("lambda.functions.AdminCreateEvent.lambda_function")
+        # moto rolls a cancelled transaction back by restoring a copy of every
+        # table, which drops writes made meanwhile by other threads
+        mocker.patch('lambda.functions.AdminCreateEvent.lambda_function.BATCH_WRITE_CONCURRENCY', 1)
+
+        """ Mixed Batch - Per Item Results """
+        results = lambda_function.create_events_batch(SampleBatchEvents1, 'test@test.com', 'now')
+        assert [result['status'] for result in results] == ['CREATED', 'CREATED', 'DUPLICATE', 'DUPLICATE', 'INVALID', 'INVALID', 'INVALID']
+        assert [result['index'] for result in results] == list(range(len(SampleBatchEvents1)))
+        assert results[2]['message'] == 'SeoUrl duplicated in batch.'
+        assert results[3]['message'] == 'SeoUrl already exists.'
+        for result, requestBody in zip(results[:2], SampleBatchEvents1):
+            data = DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, result['eventId'])
+            assert data['seoUrl'] == requestBody['seoUrl']
+            assert data['createdBy'] == 'test@test.com'
+
+        """ Cancelled Transaction - Reported As Failed """
+        client = lambda_function.EVENT_DDB_TABLE.meta.client
+        transactWriteItems = client.transact_write_items
+        def conflicting_transact_write_items(TransactItems):
+            if TransactItems[0]['Put']['Item']['seoUrl'] == 'stuck':
+                raise client.exceptions.TransactionCanceledException({
+                    'Error': {'Code': 'TransactionCanceledException', 'Message': 'Transaction cancelled'},
+                    'CancellationReasons': [{'Code': 'TransactionConflict'}, {'Code': 'None'}]
+                }, 'TransactWriteItems')
+            return transactWriteItems(TransactItems=TransactItems)
+
+        mocker.patch.object(client, 'transact_write_items', side_effect=conflicting_transact_write_items)
+        results = lambda_function.create_events_batch([
+            {"title": "written", "seoUrl": "written", "status": "ACTIVE"},
+            {"title": "stuck", "seoUrl": "stuck", "status": "ACTIVE"}
+        ], 'test@test.com', 'now')
+        assert [result['status'] for result in results] == ['CREATED', 'FAILED']
+        assert DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, results[0]['eventId'])['seoUrl'] == 'written'
+        assert DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, 'seoUrl#stuck') is None
+        assert results[1]['eventId'] == None
+
+        """ Empty Or Oversized Batch """
+        for events in [[], None, [SampleBatchEvents1[0]] * (lambda_function.BATCH_MAX_EVENTS + 1)]:
+            try:
+                lambda_function.create_events_batch(events, 'test@test.com', 'now')
+                assert False
+            except BadRequestError as ex:
+                assert str(ex) == 'Invalid Parameters'
+
     def test_lambda_handler(self, lambda_context, mocker):
         lambda_function = importlib.import_module("lambda.functions.AdminCreateEvent.lambda_function")
 
         """ All OK """
-        mocker.patch('lambda.functions.AdminCreateEvent.lambda_function.check_seourl_existence', return_value=[])
         mocker.patch('lambda.functions.AdminCreateEvent.lambda_function.create_event', return_value=None)
         response = lambda_function.lambda_handler(SampleLambdaEvent1, lambda_context)
         assert response['statusCode'] == 200
         assert isinstance(json.loads(response['body'])['eventId'], str)
+        assert json.loads(response['body'])['version'] == 1
+        assert response['headers']['ETag'] == '"1"'
 
         """ Event Status not ACTIVE or INACTIVE """
-        mocker.patch('lambda.functions.AdminCreateEvent.lambda_function.check_seourl_existence', return_value=[])
         mocker.patch('lambda.functions.AdminCreateEvent.lambda_function.create_event', return_value=None)
         response = lambda_function.lambda_handler(SampleLambdaEvent2, lambda_context)
         assert response['statusCode'] == 400
         assert json.loads(response['body'])['message'] == 'Invalid Parameters'
 
         """ SeoUrl Already Exists """
-        mocker.patch('lambda.functions.AdminCreateEvent.lambda_function.check_seourl_existence', return_value=InitialEventData)
-        mocker.patch('lambda.functions.AdminCreateEvent.lambda_function.create_event', return_value=None)
+        mocker.patch('lambda.functions.AdminCreateEvent.lambda_function.create_event', side_effect=BadRequestError('SeoUrl already exists.'))
         response = lambda_function.lambda_handler(SampleLambdaEvent1, lambda_context)
         assert response['statusCode'] == 400
         assert json.loads(response['body'])['message'] == 'SeoUrl already exists.'
 
         """ Create Event Throws Exception """
-        mocker.patch('lambda.functions.AdminCreateEvent.lambda_function.check_seourl_existence', return_value=[])
         mocker.patch('lambda.functions.AdminCreateEvent.lambda_function.create_event', side_effect=Exception())
         response = lambda_function.lambda_handler(SampleLambdaEvent1, lambda_context)
         assert response['statusCode'] == 500
         assert json.loads(response['body'])['message'] == 'Something went wrong. Please try again later.'
+
+        """ Batch Create """
+        mocker.patch('lambda.functions.AdminCreateEvent.lambda_function.create_events', return_value=[None, None, BadRequestError('SeoUrl already exists.')])
+        response = lambda_function.lambda_handler(SampleLambdaEvent3, lambda_context)
+        body = json.loads(response['body'])
+        assert response['statusCode'] == 200
+        assert body['created'] == 2
+        assert body['failed'] == len(SampleBatchEvents1) - 2
+        assert len(body['results']) == len(SampleBatchEvents1)
+
+        """ Batch Create - Empty Batch """
+        response = lambda_function.lambda_handler(SampleLambdaEvent4, lambda_context)
+        assert response['statusCode'] == 400
+        assert json.loads(response['body'])['message'] == 'Invalid Parameters'
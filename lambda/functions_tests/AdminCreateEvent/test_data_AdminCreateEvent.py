@@ -59,6 +59,11 @@ InitialEventData = [
     }
 ]
 
+InitialSeoUrlGuardData = [
+    {"eventId": "seoUrl#test1", "ownerEventId": "test1"},
+    {"eventId": "seoUrl#test2", "ownerEventId": "test2"}
+]
+
 SampleEvent1 = {
     "eventId": "test3",
     "title": "test3",
@@ -149,4 +154,36 @@ SampleLambdaEvent2 = {
             }
         }
     }
-}
\ No newline at end of file
+}
+
+SampleBatchEvents1 = [
+    {"title": "batch1", "seoUrl": "batch1", "status": "ACTIVE"},
+    {"title": "batch2", "seoUrl": "batch2", "status": "INACTIVE"},
+    {"title": "batch1 again", "seoUrl": "batch1", "status": "ACTIVE"},
+    {"title": "existing", "seoUrl": "test1", "status": "ACTIVE"},
+    {"title": "invalid status", "seoUrl": "batch3", "status": "test"},
+    {"title": "no seoUrl", "status": "ACTIVE"},
+    "not an event"
+]
+
+SampleLambdaEvent3 = {
+    'body': json.dumps({'events': SampleBatchEvents1}),
+    'requestContext': {
+        'authorizer': {
+            'claims': {
+                'email': 'test@test.com'
+            }
+        }
+    }
+}
+
+SampleLambdaEvent4 = {
+    'body': json.dumps({'events': []}),
+    'requestContext': {
+        'authorizer': {
+            'claims': {
+                'email': 'test@test.com'
+            }
+        }
+    }
+}
@@ -1,13 +1,20 @@
 import os
 import json
+import time
 import importlib
+from custom_exceptions import ConflictError, NotFoundError
 from mock_services_setup.dynamodb_mock import DynamoDB_Table_Mock, DynamoDB_Get_Item
+from mock_services_setup.redis_mock import Redis_Mock
 from test_data_AdminDeleteEvent import (
     InitialEventData,
+    InitialSeoUrlGuardData,
     SampleDeleteEvent1,
     SampleLambdaEvent1,
     SampleLambdaEvent2,
-    SampleLambdaEvent3
+    SampleLambdaEvent3,
+    SampleBulkLambdaEvent1,
+    SampleBulkLambdaEvent2,
+    SampleCheckpointEvent1
 )
 
 # Environment Variables
@@ -19,11 +26,12 @@ os.environ['EVENT_TABLE'] = EVENT_TABLE
 
 # Required Values
 EVENT_TABLE_PK = 'eventId'
+BULK_DELETE_QUEUE_URL = 'https://sqs.ap-southeast-1.amazonaws.com/123456789012/EventBulkDelete'
 
 class TestAdminDeleteEvent():
     def test_create_dynamodb_tables(self, dynamodb_resource):
         globalSecondaryIndexes = ['gsi-seoUrl']
-        EventTable = DynamoDB_Table_Mock(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, globalSecondaryIndexes, InitialEventData)
+        EventTable = DynamoDB_Table_Mock(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, globalSecondaryIndexes, InitialEventData + InitialSeoUrlGuardData)
         assert EventTable.name == EVENT_TABLE
         assert EventTable.global_secondary_indexes[0]['IndexName'] == globalSecondaryIndexes[0]
 
@@ -38,6 +46,33 @@ class TestAdminDeleteEvent():
         assert data['updatedBy'] == SampleDeleteEvent1['requesterEmail']
         assert data['updatedAt'] == SampleDeleteEvent1['now']
         assert data['isDeleted'] == True
+        assert data['version'] == 1
+
+        """ Delete Event - Failed (Stale Version) """
+        try:
+            lambda_function.delete_event(SampleDeleteEvent1['eventId'], SampleDeleteEvent1['requesterEmail'], SampleDeleteEvent1['now'], 0)
+            assert False
+        except ConflictError:
+            assert DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, SampleDeleteEvent1['eventId'])['version'] == 1
+
+        """ Delete Event - Current Version """
+        lambda_function.delete_event(SampleDeleteEvent1['eventId'], SampleDeleteEvent1['requesterEmail'], SampleDeleteEvent1['now'], 1)
+        assert DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, SampleDeleteEvent1['eventId'])['version'] == 2
+
+        """ Delete Event - Failed (Event Not Exists, With And Without If-Match) """
+        for expectedVersion in [None, 0, 1]:
+            try:
+                lambda_function.delete_event('missing', SampleDeleteEvent1['requesterEmail'], SampleDeleteEvent1['now'], expectedVersion)
+                assert False
+            except NotFoundError:
+                assert DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, 'missing') is None
+
+        """ Delete Event - Failed (seoUrl Guard Is Not An Event) """
+        try:
+            lambda_function.delete_event('seoUrl#test1', SampleDeleteEvent1['requesterEmail'], SampleDeleteEvent1['now'])
+            assert False
+        except NotFoundError:
+            assert DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, 'seoUrl#test1') == {'eventId': 'seoUrl#test1', 'ownerEventId': 'test1'}
 
         """ Delete Event - Failed (eventId is None) """
         try:
@@ -46,6 +81,68 @@ class TestAdminDeleteEvent():
         except:
             assert True
 
+    def test_delete_events_bulk(self, dynamodb_resource, mocker):
+        lambda_function = importlib.import_module("lambda.functions.AdminDeleteEvent.lambda_function")
+
+        """ Bulk Delete - Deadline Margin Covers One Update Timing Out On Every Attempt """
+        assert lambda_function.DEADLINE_MARGIN_SECONDS == 3 * (1 + 2) + 1 + 2
+        assert lambda_function.DEADLINE_MARGIN_SECONDS < 30
+
+        """ Bulk Delete - Per Event Outcome, Repeated eventIds Deleted Once """
+        results = lambda_function.delete_events_bulk(['test2', 'missing', 'seoUrl#test2', 'test2'], 'test@test.com', 'now')
+        assert results == [
+            {'eventId': 'test2', 'status': 'DELETED'},
+            {'eventId': 'missing', 'status': 'NOT_FOUND'},
+            {'eventId': 'seoUrl#test2', 'status': 'NOT_FOUND'}
+        ]
+        data = DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, 'test2')
+        assert data['isDeleted'] == True
+        assert data['updatedBy'] == 'test@test.com'
+        assert DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, 'missing') is None
+
+        """ Bulk Delete - Deadline Passed, Checkpointed To The Queue """
+        # moto 4.0 only speaks the query protocol, current boto3 sends SQS requests as JSON
+        sqsClient = mocker.patch('lambda.functions.AdminDeleteEvent.lambda_function.SQS_CLIENT')
+        sqsClient.send_message_batch.side_effect = lambda QueueUrl, Entries: {'Successful': [{'Id': entry['Id']} for entry in Entries[1:]]}
+        mocker.patch('lambda.functions.AdminDeleteEvent.lambda_function.BULK_DELETE_QUEUE_URL', BULK_DELETE_QUEUE_URL)
+        mocker.patch('lambda.functions.AdminDeleteEvent.lambda_function.CHECKPOINT_CHUNK_SIZE', 2)
+        eventIds = [f'late{index}' for index in range(5)]
+        results = lambda_function.delete_events_bulk(eventIds, 'test@test.com', 'now', deadline=time.monotonic() - 1)
+        assert [result['status'] for result in results] == ['FAILED'] * 2 + ['QUEUED'] * 3
+        entries = sqsClient.send_message_batch.call_args.kwargs['Entries']
+        assert sqsClient.send_message_batch.call_args.kwargs['QueueUrl'] == BULK_DELETE_QUEUE_URL
+        assert [json.loads(entry['MessageBody'])['eventIds'] for entry in entries] == [eventIds[0:2], eventIds[2:4], eventIds[4:]]
+        assert json.loads(entries[0]['MessageBody'])['requesterEmail'] == 'test@test.com'
+
+        """ Bulk Delete - Deadline Passed Without A Queue """
+        mocker.patch('lambda.functions.AdminDeleteEvent.lambda_function.BULK_DELETE_QUEUE_URL', None)
+        results = lambda_function.delete_events_bulk(['late0'], 'test@test.com', 'now', deadline=time.monotonic() - 1)
+        assert results == [{'eventId': 'late0', 'status': 'FAILED'}]
+
+        """ Bulk Delete - Update Failed """
+        mocker.patch.object(lambda_function.BULK_EVENT_DDB_TABLE._resolve(), 'update_item', side_effect=Exception('Throttled'))
+        results = lambda_function.delete_events_bulk(['test1'], 'test@test.com', 'now')
+        assert results == [{'eventId': 'test1', 'status': 'FAILED'}]
+
+    def test_delete_invalidates_cache(self, dynamodb_resource, mocker):
+        lambda_function = importlib.import_module("lambda.functions.AdminDeleteEvent.lambda_function")
+        redisClient = Redis_Mock()
+        mocker.patch('lambda.functions.AdminDeleteEvent.lambda_function.REDIS_CLIENT', redisClient)
+
+        """ Delete Drops The Cached Event """
+        redisClient.set('v1:event:test1', '{}')
+        lambda_function.delete_event('test1', 'test@test.com', 'now')
+        assert redisClient.exists('v1:event:test1') == 0
+        assert redisClient.get('v1:generation:eventList') == b'1'
+
+        """ Bulk Delete Drops Every Deleted Event In One Call """
+        redisClient.set('v1:event:test1', '{}')
+        redisClient.set('v1:event:test2', '{}')
+        lambda_function.delete_events_bulk(['test1', 'test2', 'missing'], 'test@test.com', 'now')
+        assert redisClient.exists('v1:event:test1', 'v1:event:test2') == 0
+        assert [command for command in redisClient.commands if command[0] == 'unlink'][-1] == ('unlink', 'v1:event:test1', 'v1:event:test2')
+        assert redisClient.get('v1:generation:eventList') == b'2'
+
     def test_lambda_handler(self, lambda_context, mocker):
         lambda_function = importlib.import_module("lambda.functions.AdminDeleteEvent.lambda_function")
 
@@ -67,8 +164,42 @@ class TestAdminDeleteEvent():
         assert response['statusCode'] == 400
         assert json.loads(response['body'])['message'] == 'Invalid Parameters'
 
+        """ Stale Version """
+        deleteEvent = mocker.patch('lambda.functions.AdminDeleteEvent.lambda_function.delete_event', side_effect=ConflictError('Event has been modified, please reload it.'))
+        response = lambda_function.lambda_handler({**SampleLambdaEvent1, 'headers': {'If-Match': 'W/"3"'}}, lambda_context)
+        assert response['statusCode'] == 409
+        assert deleteEvent.call_args.args[-1] == 3
+
+        """ eventId Is A seoUrl Guard """
+        mocker.patch('lambda.functions.AdminDeleteEvent.lambda_function.delete_event', side_effect=NotFoundError('Event Not Found.'))
+        response = lambda_function.lambda_handler(SampleLambdaEvent1, lambda_context)
+        assert response['statusCode'] == 404
+        assert json.loads(response['body'])['message'] == 'Event Not Found.'
+
         """ Delete Event Throws Exception """
         mocker.patch('lambda.functions.AdminDeleteEvent.lambda_function.delete_event', side_effect=Exception())
         response = lambda_function.lambda_handler(SampleLambdaEvent1, lambda_context)
         assert response['statusCode'] == 500
         assert json.loads(response['body'])['message'] == 'Something went wrong. Please try again later.'
+
+        """ Bulk Delete """
+        deleteEventsBulk = mocker.patch('lambda.functions.AdminDeleteEvent.lambda_function.delete_events_bulk', return_value=[
+            {'eventId': 'test1', 'status': 'DELETED'},
+            {'eventId': 'test2', 'status': 'QUEUED'},
+            {'eventId': 'missing', 'status': 'NOT_FOUND'}
+        ])
+        response = lambda_function.lambda_handler(SampleBulkLambdaEvent1, lambda_context)
+        body = json.loads(response['body'])
+        assert response['statusCode'] == 200
+        assert (body['deleted'], body['queued'], body['not_found'], body['failed']) == (1, 1, 1, 0)
+        assert deleteEventsBulk.call_args.args[:2] == (['test1', 'test2', 'missing'], 'test@test.com')
+
+        """ Bulk Delete - Invalid eventId """
+        response = lambda_function.lambda_handler(SampleBulkLambdaEvent2, lambda_context)
+        assert response['statusCode'] == 400
+        assert json.loads(response['body'])['message'] == 'Invalid Parameters'
+
+        """ Checkpoint Resumed From The Queue """
+        response = lambda_function.lambda_handler(SampleCheckpointEvent1, lambda_context)
+        assert response == {'batchItemFailures': [{'itemIdentifier': 'message2'}]}
+        assert deleteEventsBulk.call_args.args[:3] == (['test1', 'test2'], 'test@test.com', 'now')
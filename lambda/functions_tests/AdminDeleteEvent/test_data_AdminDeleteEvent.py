@@ -60,6 +60,10 @@ InitialEventData = [
     }
 ]
 
+InitialSeoUrlGuardData = [
+    {"eventId": "seoUrl#test1", "ownerEventId": "test1"}
+]
+
 SampleDeleteEvent1 = {
     "eventId": "test1",
     "requesterEmail": "test@test.com",
@@ -103,4 +107,44 @@ SampleLambdaEvent3 = {
             }
         }
     }
-}
\ No newline at end of file
+}
+SampleBulkLambdaEvent1 = {
+    'body': json.dumps({
+        "eventIds": ["test1", "test2", "missing"]
+    }),
+    'requestContext': {
+        'authorizer': {
+            'claims': {
+                'email': 'test@test.com'
+            }
+        }
+    }
+}
+
+SampleBulkLambdaEvent2 = {
+    'body': json.dumps({
+        "eventIds": ["test1", None]
+    }),
+    'requestContext': {
+        'authorizer': {
+            'claims': {
+                'email': 'test@test.com'
+            }
+        }
+    }
+}
+
+SampleCheckpointEvent1 = {
+    'Records': [
+        {
+            'messageId': 'message1',
+            'eventSource': 'aws:sqs',
+            'body': json.dumps({"eventIds": ["test1", "test2"], "requesterEmail": "test@test.com", "now": "now"})
+        },
+        {
+            'messageId': 'message2',
+            'eventSource': 'aws:sqs',
+            'body': 'not a checkpoint'
+        }
+    ]
+}
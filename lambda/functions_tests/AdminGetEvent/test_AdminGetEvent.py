@@ -1,13 +1,19 @@
 import os
 import json
+import time
 import importlib
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
 from custom_exceptions import NotFoundError
 from mock_services_setup.dynamodb_mock import DynamoDB_Table_Mock, DynamoDB_Get_Item
+from mock_services_setup.redis_mock import Redis_Mock
 from test_data_AdminGetEvent import (
     InitialEventData,
     SampleLambdaEvent1,
     SampleLambdaEvent2,
-    SampleLambdaEvent3
+    SampleLambdaEvent3,
+    SampleLambdaEvent4,
+    SampleLambdaEvent5
 )
 
 # Environment Variables
@@ -42,6 +48,14 @@ class TestAdminGetEvent():
         except:
             assert True
 
+        """ Get Event - Failed (seoUrl Guard Item) """
+        dynamodb_resource.Table(EVENT_TABLE).put_item(Item={'eventId': 'seoUrl#test1', 'ownerEventId': 'test1'})
+        try:
+            response = lambda_function.get_event('seoUrl#test1')
+            assert False
+        except NotFoundError:
+            assert True
+
         """ Get Event - Failed (eventId is None) """
         try:
             response = lambda_function.get_event(None)
@@ -56,6 +70,190 @@ class TestAdminGetEvent():
         except:
             assert True
 
+    def test_getEvent_cache(self, dynamodb_resource, mocker):
+        lambda_function = importlib.import_module("lambda.functions.AdminGetEvent.lambda_function")
+        from event_cache_helper import InvalidateEventCache
+        redisClient = Redis_Mock()
+        mocker.patch('lambda.functions.AdminGetEvent.lambda_function.REDIS_CLIENT', redisClient)
+        table = dynamodb_resource.Table(EVENT_TABLE)
+
+        """ Get Event - Miss Loads And Caches With TTL """
+        response = lambda_function.get_event('test2')
+        assert response == DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, 'test2')
+        assert 0 < redisClient.ttl('v1:event:test2') <= lambda_function.EVENT_CACHE_TTL
+
+        """ Get Event - Hit Skips DynamoDB """
+        table.update_item(Key={'eventId': 'test2'}, UpdateExpression='SET title=:title', ExpressionAttributeValues={':title': 'changed'})
+        assert lambda_function.get_event('test2')['title'] == 'test2'
+
+        """ Get Event - Invalidated After A Write """
+        InvalidateEventCache(redisClient, ['test2'])
+        assert lambda_function.get_event('test2')['title'] == 'changed'
+        assert redisClient.get('v1:generation:eventList') == b'1'
+
+        """ Get Event - Missing Event Not Cached """
+        try:
+            lambda_function.get_event('test3')
+            assert False
+        except NotFoundError:
+            assert redisClient.exists('v1:event:test3') == 0
+
+        """ Get Event - Redis Unavailable Falls Back To DynamoDB """
+        mocker.patch.object(redisClient, 'get', side_effect=ConnectionError('Connection refused'))
+        mocker.patch.object(redisClient, 'set', side_effect=ConnectionError('Connection refused'))
+        assert lambda_function.get_event('test1') == DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, 'test1')
+
+    def test_getEvent_stampede(self, dynamodb_resource, mocker):
+        lambda_function = importlib.import_module("lambda.functions.AdminGetEvent.lambda_function")
+        from cache_helper import SetCacheValue
+        redisClient = Redis_Mock()
+        mocker.patch('lambda.functions.AdminGetEvent.lambda_function.REDIS_CLIENT', redisClient)
+        loadEvent = lambda_function.load_event
+        def slow_load_event(eventId):
+            time.sleep(0.1)
+            return loadEvent(eventId)
+        loadEventMock = mocker.patch('lambda.functions.AdminGetEvent.lambda_function.load_event', side_effect=slow_load_event)
+
+        """ Cold Key - Only The Lock Holder Loads It """
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            responses = list(executor.map(lambda_function.get_event, ['test1'] * 10))
+        assert loadEventMock.call_count == 1
+        assert all(response == responses[0] for response in responses)
+        assert redisClient.exists('v1:event:test1:lock') == 0
+
+        """ Warm Key - Slow To Compute And Close To Expiry, Recomputed Early """
+        mocker.patch('cache_helper.random.random', return_value=0.5)
+        SetCacheValue(redisClient, 'v1:event:test1', {'eventId': 'test1', 'title': 'old'}, 300, computeSeconds=1000)
+        assert lambda_function.get_event('test1')['title'] == 'test1'
+        assert loadEventMock.call_count == 2
+
+        """ Warm Key - Fresh, Served From Cache """
+        assert lambda_function.get_event('test1')['title'] == 'test1'
+        assert loadEventMock.call_count == 2
+
+        """ Lock Held Elsewhere - Loaded After The Wait """
+        mocker.patch('cache_helper.CACHE_LOCK_WAIT_SECONDS', 0.05)
+        redisClient.set('v1:event:test2:lock', 'other', px=60000)
+        assert lambda_function.get_event('test2')['eventId'] == 'test2'
+        assert loadEventMock.call_count == 3
+        assert redisClient.get('v1:event:test2:lock') == b'other'
+
+        """ Large Event - Compressed, Decimal Kept """
+        dynamodb_resource.Table(EVENT_TABLE).put_item(Item={'eventId': 'large', 'longDescription': 'x' * 5000, 'price': Decimal('10.50')})
+        response = lambda_function.get_event('large')
+        rawValue = redisClient.get('v1:event:large')
+        assert rawValue[0] == 2 and len(rawValue) < 1000
+        assert lambda_function.get_event('large') == response
+        assert response['price'] == Decimal('10.50')
+
+    def test_getEvent_local_cache(self, dynamodb_resource, mocker):
+        lambda_function = importlib.import_module("lambda.functions.AdminGetEvent.lambda_function")
+        from cache_helper import LocalCache, BumpCacheGeneration
+        redisClient = Redis_Mock()
+        localCache = LocalCache(maxBytes=2000, ttlSeconds=60, generationName='eventList', checkSeconds=0)
+        mocker.patch('lambda.functions.AdminGetEvent.lambda_function.REDIS_CLIENT', redisClient)
+        mocker.patch('lambda.functions.AdminGetEvent.lambda_function.EVENT_LOCAL_CACHE', localCache)
+
+        """ Local Hit - No Event Read From Redis """
+        response = lambda_function.get_event('test1')
+        redisClient.commands.clear()
+        assert lambda_function.get_event('test1') == response
+        assert redisClient.commands == [('get', 'v1:generation:eventList')]
+
+        """ Local Hit - Caller Gets Its Own Copy """
+        lambda_function.get_event('test1')['title'] = 'mutated'
+        assert lambda_function.get_event('test1') == response
+
+        """ Generation Moved - Local Cache Dropped """
+        BumpCacheGeneration(redisClient, 'eventList')
+        redisClient.commands.clear()
+        lambda_function.get_event('test1')
+        assert ('get', 'v1:event:test1') in redisClient.commands
+
+        """ Generation Checked At Most Once Per Window """
+        localCache.checkSeconds = 60
+        redisClient.commands.clear()
+        lambda_function.get_event('test1')
+        lambda_function.get_event('test1')
+        assert redisClient.commands == []
+
+        """ Bounded In Bytes - Least Recently Used Evicted """
+        localCache.set('a', b'x' * 900)
+        localCache.set('b', b'x' * 900)
+        localCache.get('a')
+        localCache.set('c', b'x' * 900)
+        assert localCache.get('b') is None and localCache.get('a') is not None
+        assert localCache.currentBytes <= localCache.maxBytes
+        localCache.set('d', b'x' * 3000)
+        assert localCache.get('d') is None
+
+        """ Expired Entries Not Served """
+        localCache.ttlSeconds = 0
+        localCache.set('e', b'x')
+        assert localCache.get('e') is None
+
+    def test_getEvents_cache(self, dynamodb_resource, mocker):
+        lambda_function = importlib.import_module("lambda.functions.AdminGetEvent.lambda_function")
+        redisClient = Redis_Mock()
+        mocker.patch('lambda.functions.AdminGetEvent.lambda_function.REDIS_CLIENT', redisClient)
+        batchGetItems = mocker.spy(lambda_function, 'BatchGetItems')
+
+        """ Get Events - Misses Fetched Once And Cached In One Pipeline """
+        response = lambda_function.get_events(['test2', 'test3', 'test1'])
+        assert [item['eventId'] for item in response['items']] == ['test2', 'test1']
+        assert response['notFound'] == ['test3']
+        assert batchGetItems.call_count == 1
+        assert ('pipeline', 3) in redisClient.commands
+        assert 0 < redisClient.ttl('v1:event:test1') <= lambda_function.EVENT_CACHE_TTL
+
+        """ Get Events - Cached Events Read With One MGET, Projection Applied """
+        response = lambda_function.get_events(['test1', 'test2'], ['title', 'status'])
+        assert response['items'] == [
+            {field: DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, eventId)[field] for field in ['eventId', 'title', 'status']}
+            for eventId in ['test1', 'test2']
+        ]
+        assert batchGetItems.call_count == 1
+        assert redisClient.commands[-1] == ('mget', 'v1:event:test1', 'v1:event:test2')
+
+    def test_getEvents(self, dynamodb_resource, mocker):
+        lambda_function = importlib.import_module("lambda.functions.AdminGetEvent.lambda_function")
+        mocker.patch('dynamodb_helper.BackoffDelay', return_value=0)
+
+        """ Get Events - Request Order Kept, Missing Reported """
+        response = lambda_function.get_events(['test2', 'test3', 'test1', 'test2'])
+        assert response['items'] == [DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, eventId) for eventId in ['test2', 'test1']]
+        assert response['notFound'] == ['test3']
+
+        """ Get Events - seoUrl Guard Items Not Returned """
+        response = lambda_function.get_events(['seoUrl#test1', 'test1'])
+        assert [item['eventId'] for item in response['items']] == ['test1']
+        assert response['notFound'] == ['seoUrl#test1']
+
+        """ Get Events - Projected Fields """
+        response = lambda_function.get_events(['test1'], ['title', 'status'])
+        assert response['items'] == [{'eventId': 'test1', 'title': 'test1', 'status': 'ACTIVE'}]
+
+        """ Get Events - More Than 100 Keys, Unprocessed Keys Retried """
+        client = lambda_function.EVENT_DDB_TABLE.meta.client
+        batchGetItem = client.batch_get_item
+        requestSizes = []
+        def throttled_batch_get_item(RequestItems):
+            keys = RequestItems[EVENT_TABLE]['Keys']
+            requestSizes.append(len(keys))
+            # Every request leaves its last key unprocessed the first time round
+            if len(keys) > 1 and len(requestSizes) % 2 == 1:
+                response = batchGetItem(RequestItems={EVENT_TABLE: {**RequestItems[EVENT_TABLE], 'Keys': keys[:-1]}})
+                response['UnprocessedKeys'] = {EVENT_TABLE: {'Keys': keys[-1:]}}
+                return response
+            return batchGetItem(RequestItems=RequestItems)
+
+        mocker.patch.object(client, 'batch_get_item', side_effect=throttled_batch_get_item)
+        eventIds = ['test1', 'test2'] + [f'missing{index}' for index in range(150)]
+        response = lambda_function.get_events(eventIds)
+        assert [item['eventId'] for item in response['items']] == ['test1', 'test2']
+        assert len(response['notFound']) == 150
+        assert requestSizes == [100, 1, 52, 1]
+
     def test_lambda_handler(self, lambda_context, mocker):
         lambda_function = importlib.import_module("lambda.functions.AdminGetEvent.lambda_function")
 
@@ -63,6 +261,7 @@ class TestAdminGetEvent():
         mocker.patch('lambda.functions.AdminGetEvent.lambda_function.get_event', return_value=InitialEventData[0])
         response = lambda_function.lambda_handler(SampleLambdaEvent1, lambda_context)
         assert response['statusCode'] == 200
+        assert response['headers']['ETag'] == '"0"'
         assert json.loads(response['body']) == InitialEventData[0]
 
         """ eventId is Empty String """
@@ -88,3 +287,15 @@ class TestAdminGetEvent():
         response = lambda_function.lambda_handler(SampleLambdaEvent1, lambda_context)
         assert response['statusCode'] == 500
         assert json.loads(response['body'])['message'] == 'Something went wrong. Please try again later.'
+
+        """ Batch Get """
+        getEventsMock = mocker.patch('lambda.functions.AdminGetEvent.lambda_function.get_events', return_value={'items': InitialEventData, 'notFound': ['test9']})
+        response = lambda_function.lambda_handler(SampleLambdaEvent4, lambda_context)
+        assert response['statusCode'] == 200
+        assert json.loads(response['body'])['notFound'] == ['test9']
+        getEventsMock.assert_called_once_with(['test2', 'test1', 'test9', 'test1'], ['title', 'status'])
+
+        """ Batch Get - Invalid Field Name """
+        response = lambda_function.lambda_handler(SampleLambdaEvent5, lambda_context)
+        assert response['statusCode'] == 400
+        assert json.loads(response['body'])['message'] == 'Invalid Parameters'
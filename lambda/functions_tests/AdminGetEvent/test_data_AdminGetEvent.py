@@ -96,4 +96,32 @@ SampleLambdaEvent3 = {
             }
         }
     }
-}
\ No newline at end of file
+}
+
+SampleLambdaEvent4 = {
+    'queryStringParameters': {
+        "eventIds": "test2, test1,test9,test1",
+        "fields": "title,status"
+    },
+    'requestContext': {
+        'authorizer': {
+            'claims': {
+                'email': 'test@test.com'
+            }
+        }
+    }
+}
+
+SampleLambdaEvent5 = {
+    'queryStringParameters': {
+        "eventIds": "test1",
+        "fields": "title,#status"
+    },
+    'requestContext': {
+        'authorizer': {
+            'claims': {
+                'email': 'test@test.com'
+            }
+        }
+    }
+}
@@ -1,13 +1,26 @@
 import os
 import json
+import pytest
 import importlib
 import requests_mock
+from custom_exceptions import BadRequestError, OpenSearchError
+from mock_services_setup.redis_mock import Redis_Mock
 from test_data_AdminListEvents import (
+    ESResponseError,
     ESResponseWithHits,
     ESResponseWithoutHits,
+    ESResponseWithSortedHits,
+    ESResponseWithCappedTotal,
+    ESResponseWithFacets,
+    EventFilters,
     EventWithData,
     EventWithoutData,
-    SampleLambdaEvent1
+    SampleLambdaEvent1,
+    SampleLambdaEvent2,
+    SampleLambdaEvent3,
+    SampleLambdaEvent4,
+    SampleLambdaEvent5,
+    SampleLambdaEvent6
 )
 
 # Environment Variables
@@ -20,31 +33,223 @@ os.environ['ES_DOMAIN_ENDPOINT'] = ES_DOMAIN_ENDPOINT
 # Required Values
 EVENT_TABLE_PK = 'eventId'
 
+@pytest.mark.usefixtures('aws_credentials')
 class TestAdminGetEvent():
+    def test_aws_credentials(self):
+        lambda_function = importlib.import_module("lambda.functions.AdminListEvents.lambda_function")
+
+        """ Credentials Read From Lambda Environment """
+        credentials = lambda_function.AWSAUTH.refreshable_credentials
+        assert credentials.method == 'lambda-env'
+        assert credentials.get_frozen_credentials().access_key == os.environ['AWS_ACCESS_KEY_ID']
+
     @requests_mock.Mocker(kw='mock')
     def test_get_events_from_os(self, **kwargs):
         lambda_function = importlib.import_module("lambda.functions.AdminListEvents.lambda_function")
 
         """ List Event - With Hits """
-        kwargs['mock'].get(f'https://{ES_DOMAIN_ENDPOINT}/event/_doc/_search', json=ESResponseWithHits)
+        kwargs['mock'].get(f'https://{ES_DOMAIN_ENDPOINT}/event/_search', json=ESResponseWithHits)
         response = lambda_function.get_events_from_os(None, None, 1000, 0)
         assert response['items'] == [hits['_source'] for hits in ESResponseWithHits['hits']['hits']]
         assert response['total'] == len(ESResponseWithHits['hits']['hits'])
         assert response['nextToken'] == len(ESResponseWithHits['hits']['hits'])
 
         """ List Event - Without Hits """
-        kwargs['mock'].get(f'https://{ES_DOMAIN_ENDPOINT}/event/_doc/_search', json=ESResponseWithoutHits)
+        kwargs['mock'].get(f'https://{ES_DOMAIN_ENDPOINT}/event/_search', json=ESResponseWithoutHits)
         response = lambda_function.get_events_from_os(None, None, 1000, 0)
         assert response['items'] == [hits['_source'] for hits in ESResponseWithoutHits['hits']['hits']]
         assert response['total'] == len(ESResponseWithoutHits['hits']['hits'])
         assert response['nextToken'] == len(ESResponseWithoutHits['hits']['hits'])
 
         """ List Event - With Hits """
-        kwargs['mock'].get(f'https://{ES_DOMAIN_ENDPOINT}/event/_doc/_search', json=ESResponseWithHits)
+        kwargs['mock'].get(f'https://{ES_DOMAIN_ENDPOINT}/event/_search', json=ESResponseWithHits)
         response = lambda_function.get_events_from_os(None, None, 1000, 0)
         assert response['items'] == [hits['_source'] for hits in ESResponseWithHits['hits']['hits']]
         assert response['total'] == len(ESResponseWithHits['hits']['hits'])
         assert response['nextToken'] == len(ESResponseWithHits['hits']['hits'])
+        assert set(lambda_function.OS_TRANSPORT.lastTimings) >= {'connectMs', 'tlsMs', 'requestMs', 'parseMs'}
+        assert kwargs['mock'].last_request.qs['filter_path'] == ['hits.hits._source,hits.total']
+        assert 'track_total_hits' not in kwargs['mock'].last_request.json()
+        assert 'totalRelation' not in response
+        assert 'facets' not in response
+        assert kwargs['mock'].last_request.json()['query'] == {'bool': {'filter': [{'term': {'isDeleted': False}}]}}
+
+        """ List Event - Normalized Sort Keyword """
+        lambda_function.get_events_from_os('venue', 'desc', 1000, 0)
+        assert kwargs['mock'].last_request.json()['sort'][0] == {'venue.sort': {'order': 'desc'}}
+
+        """ List Event - Filtered """
+        filters = lambda_function.compile_filters(EventFilters)
+        lambda_function.get_events_from_os(None, None, 1000, 0, filters=filters)
+        assert kwargs['mock'].last_request.json()['query']['bool']['filter'] == [{'term': {'isDeleted': False}}] + filters
+
+        """ List Event - With Facets """
+        kwargs['mock'].get(f'https://{ES_DOMAIN_ENDPOINT}/event/_search', json=ESResponseWithFacets)
+        facets = lambda_function.compile_facets(['status', 'region'])
+        response = lambda_function.get_events_from_os(None, None, 1000, 0, facets=facets)
+        assert kwargs['mock'].last_request.json()['aggs'] == facets
+        assert 'aggregations.*.buckets.key' in kwargs['mock'].last_request.qs['filter_path'][0]
+        assert response['facets'] == {'region': [['north', 2], ['central', 1]], 'status': []}
+        assert len(response['items']) == len(ESResponseWithFacets['hits']['hits'])
+
+        """ List Event - Capped Total Count """
+        kwargs['mock'].get(f'https://{ES_DOMAIN_ENDPOINT}/event/_search', json=ESResponseWithCappedTotal)
+        response = lambda_function.get_events_from_os(None, None, 1000, 0, trackTotalHits=10000)
+        assert kwargs['mock'].last_request.json()['track_total_hits'] == 10000
+        assert response['total'] == 10000
+        assert response['totalRelation'] == 'gte'
+
+        """ List Event - Total Count Disabled """
+        kwargs['mock'].get(f'https://{ES_DOMAIN_ENDPOINT}/event/_search', json={'hits': {'hits': ESResponseWithHits['hits']['hits']}})
+        response = lambda_function.get_events_from_os(None, None, 1000, 0, trackTotalHits=False)
+        assert kwargs['mock'].last_request.json()['track_total_hits'] == False
+        assert response['total'] == None
+        assert len(response['items']) == len(ESResponseWithHits['hits']['hits'])
+
+        """ List Event - OpenSearch Error """
+        kwargs['mock'].get(f'https://{ES_DOMAIN_ENDPOINT}/event/_search', status_code=500, json=ESResponseError)
+        try:
+            lambda_function.get_events_from_os(None, None, 1000, 0)
+            assert False
+        except OpenSearchError as ex:
+            assert ex.statusCode == 500
+
+        """ List Event - OpenSearch Error Page Is Not JSON """
+        for statusCode, text, contentType in [(502, '<html><body>502 Bad Gateway</body></html>', 'text/html'), (429, '429 Too Many Requests', 'text/plain')]:
+            kwargs['mock'].get(f'https://{ES_DOMAIN_ENDPOINT}/event/_search', status_code=statusCode, text=text, headers={'Content-Type': contentType})
+            try:
+                lambda_function.get_events_from_os(None, None, 1000, 0)
+                assert False
+            except OpenSearchError as ex:
+                assert ex.statusCode == statusCode
+                assert ex.body == text
+
+    def test_compile_filters(self):
+        lambda_function = importlib.import_module("lambda.functions.AdminListEvents.lambda_function")
+
+        """ Valid Filters """
+        clauses = lambda_function.compile_filters(EventFilters)
+        assert clauses == [
+            {'range': {'eventDate': {'gte': '2022-01-01', 'lt': '2023-01-01'}}},
+            {'term': {'isHighlighted': True}},
+            {'terms': {'region': ['central', 'north']}},
+            {'term': {'status': 'ACTIVE'}}
+        ]
+
+        """ No Filters """
+        assert lambda_function.compile_filters({}) == []
+
+        """ Invalid Filters """
+        for filters, message in [
+            ({'organizer': 'test'}, 'Invalid filter: organizer'),
+            ({'status': 1}, 'Invalid filter value: status'),
+            ({'region': []}, 'Invalid filter value: region'),
+            ({'isHighlighted': 'true'}, 'Invalid filter value: isHighlighted'),
+            ({'eventDate': {'after': '2022-01-01'}}, 'Invalid filter value: eventDate'),
+            (['status'], 'Invalid filters')
+        ]:
+            try:
+                lambda_function.compile_filters(filters)
+                assert False
+            except BadRequestError as ex:
+                assert str(ex) == message
+
+    def test_compile_facets(self):
+        lambda_function = importlib.import_module("lambda.functions.AdminListEvents.lambda_function")
+
+        """ Field List And Field Sizes """
+        assert lambda_function.compile_facets(['status', 'region']) == {
+            'region': {'terms': {'field': 'region', 'size': lambda_function.FACET_DEFAULT_SIZE}},
+            'status': {'terms': {'field': 'status', 'size': lambda_function.FACET_DEFAULT_SIZE}}
+        }
+        assert lambda_function.compile_facets({'category': 5}) == {'category': {'terms': {'field': 'category', 'size': 5}}}
+
+        """ Invalid Facets """
+        for facets, message in [
+            (['venue'], 'Invalid facet: venue'),
+            ({'topic': 0}, 'Invalid facet size: topic'),
+            ({'topic': lambda_function.FACET_MAX_SIZE + 1}, 'Invalid facet size: topic'),
+            ('status', 'Invalid facets')
+        ]:
+            try:
+                lambda_function.compile_facets(facets)
+                assert False
+            except BadRequestError as ex:
+                assert str(ex) == message
+
+    @requests_mock.Mocker(kw='mock')
+    def test_get_events_from_os_cursor(self, **kwargs):
+        lambda_function = importlib.import_module("lambda.functions.AdminListEvents.lambda_function")
+        sortedHits = ESResponseWithSortedHits['hits']['hits']
+
+        """ First Page - Opaque Cursor Returned """
+        kwargs['mock'].get(f'https://{ES_DOMAIN_ENDPOINT}/event/_search', json=ESResponseWithSortedHits)
+        response = lambda_function.get_events_from_os('title', 'asc', 2, 0, True)
+        payload = kwargs['mock'].last_request.json()
+        assert 'from' not in payload and 'search_after' not in payload
+        assert kwargs['mock'].last_request.qs['filter_path'] == ['hits.hits._source,hits.total,hits.hits.sort,pit_id']
+        assert payload['sort'] == [{'title.sort': {'order': 'asc'}}, {'eventId': {'order': 'asc'}}]
+        assert response['items'] == [hits['_source'] for hits in sortedHits]
+        assert lambda_function.decode_cursor(response['nextToken']) == (sortedHits[-1]['sort'], None)
+
+        """ Next Page - search_after From Cursor, Last Page Has No Cursor """
+        response = lambda_function.get_events_from_os('title', 'asc', 3, response['nextToken'], True)
+        payload = kwargs['mock'].last_request.json()
+        assert payload['search_after'] == sortedHits[-1]['sort']
+        assert 'from' not in payload
+        assert response['nextToken'] == None
+
+        """ Point In Time - Opened On First Page, Closed On Last Page """
+        kwargs['mock'].post(f'https://{ES_DOMAIN_ENDPOINT}/event/_search/point_in_time', json={'pit_id': 'pit1'})
+        kwargs['mock'].get(f'https://{ES_DOMAIN_ENDPOINT}/_search', json={**ESResponseWithSortedHits, 'pit_id': 'pit2'})
+        closeMock = kwargs['mock'].delete(f'https://{ES_DOMAIN_ENDPOINT}/_search/point_in_time', json={})
+        response = lambda_function.get_events_from_os('title', 'asc', 2, 0, True, True)
+        payload = kwargs['mock'].last_request.json()
+        assert payload['pit'] == {'id': 'pit1', 'keep_alive': lambda_function.PIT_KEEP_ALIVE}
+        assert lambda_function.decode_cursor(response['nextToken']) == (sortedHits[-1]['sort'], 'pit2')
+
+        response = lambda_function.get_events_from_os('title', 'asc', 3, response['nextToken'], True)
+        assert kwargs['mock'].request_history[-2].json()['pit']['id'] == 'pit2'
+        assert response['nextToken'] == None
+        assert closeMock.last_request.json() == {'pit_id': ['pit2']}
+
+        """ Invalid Cursor """
+        try:
+            lambda_function.get_events_from_os('title', 'asc', 2, 'not-a-cursor', True)
+            assert False
+        except BadRequestError as ex:
+            assert str(ex) == 'Invalid nextToken'
+
+    def test_list_events_cache(self, mocker):
+        lambda_function = importlib.import_module("lambda.functions.AdminListEvents.lambda_function")
+        from cache_helper import BumpCacheGeneration
+        redisClient = Redis_Mock()
+        mocker.patch('lambda.functions.AdminListEvents.lambda_function.REDIS_CLIENT', redisClient)
+        getEventsMock = mocker.patch('lambda.functions.AdminListEvents.lambda_function.get_events_from_os', return_value=EventWithData)
+
+        """ Same Listing Served From Cache """
+        assert lambda_function.list_events('title', 'asc', 10, 0) == EventWithData
+        assert lambda_function.list_events('title', 'asc', 10, 0) == EventWithData
+        assert getEventsMock.call_count == 1
+
+        """ Different Listing Cached Separately """
+        lambda_function.list_events('title', 'asc', 10, 0, filters=[{'term': {'region': 'north'}}])
+        assert getEventsMock.call_count == 2
+
+        """ Generation Bump Retires Every Listing """
+        BumpCacheGeneration(redisClient, 'eventList')
+        lambda_function.list_events('title', 'asc', 10, 0)
+        assert getEventsMock.call_count == 3
+
+        """ Point In Time Never Cached """
+        lambda_function.list_events('title', 'asc', 10, 0, True, True)
+        lambda_function.list_events('title', 'asc', 10, 0, True, True)
+        assert getEventsMock.call_count == 5
+
+        """ No Redis Configured """
+        mocker.patch('lambda.functions.AdminListEvents.lambda_function.REDIS_CLIENT', None)
+        lambda_function.list_events('title', 'asc', 10, 0)
+        assert getEventsMock.call_count == 6
 
     def test_lambda_handler(self, lambda_context, mocker):
         lambda_function = importlib.import_module("lambda.functions.AdminListEvents.lambda_function")
@@ -61,6 +266,33 @@ class TestAdminGetEvent():
         assert response['statusCode'] == 200
         assert json.loads(response['body']) == EventWithoutData
 
+        """ Cursor Pagination With Point In Time """
+        getEventsMock = mocker.patch('lambda.functions.AdminListEvents.lambda_function.get_events_from_os', return_value=EventWithoutData)
+        response = lambda_function.lambda_handler(SampleLambdaEvent3, lambda_context)
+        assert response['statusCode'] == 200
+        getEventsMock.assert_called_once_with('title', 'asc', 2, 0, True, True, 10000, [{'term': {'status': 'ACTIVE'}}], {})
+
+        """ Invalid Cursor """
+        mocker.stopall()
+        response = lambda_function.lambda_handler(SampleLambdaEvent2, lambda_context)
+        assert response['statusCode'] == 400
+        assert json.loads(response['body'])['message'] == 'Invalid nextToken'
+
+        """ Invalid Total Hits Tracking """
+        response = lambda_function.lambda_handler(SampleLambdaEvent4, lambda_context)
+        assert response['statusCode'] == 400
+        assert json.loads(response['body'])['message'] == 'Invalid trackTotalHits'
+
+        """ Invalid Filter """
+        response = lambda_function.lambda_handler(SampleLambdaEvent5, lambda_context)
+        assert response['statusCode'] == 400
+        assert json.loads(response['body'])['message'] == 'Invalid filter: organizer'
+
+        """ Invalid Sort Field """
+        response = lambda_function.lambda_handler(SampleLambdaEvent6, lambda_context)
+        assert response['statusCode'] == 400
+        assert json.loads(response['body'])['message'] == 'Invalid sort field: longDescription'
+
         """ Get Event From OS Throws Error """
         mocker.patch('lambda.functions.AdminListEvents.lambda_function.get_events_from_os', side_effect=Exception())
         response = lambda_function.lambda_handler(SampleLambdaEvent1, lambda_context)
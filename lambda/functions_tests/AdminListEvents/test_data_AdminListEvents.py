@@ -67,6 +67,11 @@ ESResponseWithHits = {
     }
 }
 
+ESResponseError = {
+    'error': {'type': 'search_phase_execution_exception', 'reason': 'all shards failed'},
+    'status': 500
+}
+
 ESResponseWithoutHits = {
     'hits': {
         'hits': [],
@@ -74,6 +79,45 @@ ESResponseWithoutHits = {
     }
 }
 
+ESResponseWithSortedHits = {
+    'hits': {
+        'hits': [
+            {'_source': {'eventId': 'test1', 'title': 'test1'}, 'sort': ['test1', 'test1']},
+            {'_source': {'eventId': 'test2', 'title': 'test2'}, 'sort': ['test2', 'test2']}
+        ],
+        'total': {'value': 2}
+    }
+}
+
+ESResponseWithCappedTotal = {
+    'hits': {
+        'hits': [
+            {'_source': {'eventId': 'test1', 'title': 'test1'}}
+        ],
+        'total': {'value': 10000, 'relation': 'gte'}
+    }
+}
+
+ESResponseWithFacets = {
+    'hits': {
+        'hits': [
+            {'_source': {'eventId': 'test1', 'title': 'test1'}},
+            {'_source': {'eventId': 'test2', 'title': 'test2'}}
+        ],
+        'total': {'value': 3}
+    },
+    'aggregations': {
+        'region': {'buckets': [{'key': 'north', 'doc_count': 2}, {'key': 'central', 'doc_count': 1}]}
+    }
+}
+
+EventFilters = {
+    'status': 'ACTIVE',
+    'region': ['north', 'central', 'north'],
+    'isHighlighted': True,
+    'eventDate': {'lt': '2023-01-01', 'gte': '2022-01-01'}
+}
+
 EventWithData = {
     'items': [
         {
@@ -153,4 +197,59 @@ SampleLambdaEvent1 = {
             }
         }
     }
-}
\ No newline at end of file
+}
+
+SampleLambdaEvent2 = {
+    'body': json.dumps({'nextToken': 'not-a-cursor'}),
+    'requestContext': {
+        'authorizer': {
+            'claims': {
+                'email': 'test@test.com'
+            }
+        }
+    }
+}
+
+SampleLambdaEvent3 = {
+    'body': json.dumps({'limit': 2, 'pagination': 'cursor', 'pointInTime': True, 'trackTotalHits': 10000, 'filters': {'status': 'ACTIVE'}}),
+    'requestContext': {
+        'authorizer': {
+            'claims': {
+                'email': 'test@test.com'
+            }
+        }
+    }
+}
+
+SampleLambdaEvent4 = {
+    'body': json.dumps({'trackTotalHits': 'all'}),
+    'requestContext': {
+        'authorizer': {
+            'claims': {
+                'email': 'test@test.com'
+            }
+        }
+    }
+}
+
+SampleLambdaEvent5 = {
+    'body': json.dumps({'filters': {'organizer': 'test'}}),
+    'requestContext': {
+        'authorizer': {
+            'claims': {
+                'email': 'test@test.com'
+            }
+        }
+    }
+}
+
+SampleLambdaEvent6 = {
+    'body': json.dumps({'sort': {'field': 'longDescription', 'direction': 'asc'}}),
+    'requestContext': {
+        'authorizer': {
+            'claims': {
+                'email': 'test@test.com'
+            }
+        }
+    }
+}
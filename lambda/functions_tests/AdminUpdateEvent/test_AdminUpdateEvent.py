@@ -1,13 +1,18 @@
 import os
 import json
 import importlib
+from custom_exceptions import BadRequestError, ConflictError, NotFoundError
 from mock_services_setup.dynamodb_mock import DynamoDB_Table_Mock, DynamoDB_Get_Item
+from mock_services_setup.redis_mock import Redis_Mock
 from test_data_AdminUpdateEvent import (
     InitialEventData,
+    InitialSeoUrlGuardData,
     SampleUpdatedEvent1,
     SampleLambdaEvent1,
     SampleLambdaEvent2,
-    SampleLambdaEvent3
+    SampleLambdaEvent3,
+    SampleSparseLambdaEvent1,
+    SampleSparseLambdaEvent2
 )
 
 # Environment Variables
@@ -23,28 +28,10 @@ EVENT_TABLE_PK = 'eventId'
 class TestAdminDeleteEvent():
     def test_create_dynamodb_tables(self, dynamodb_resource):
         globalSecondaryIndexes = ['gsi-seoUrl']
-        EventTable = DynamoDB_Table_Mock(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, globalSecondaryIndexes, InitialEventData)
+        EventTable = DynamoDB_Table_Mock(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, globalSecondaryIndexes, InitialEventData + InitialSeoUrlGuardData)
         assert EventTable.name == EVENT_TABLE
         assert EventTable.global_secondary_indexes[0]['IndexName'] == globalSecondaryIndexes[0]
     
-    def test_check_seourl_existence(self, dynamodb_resource):
-        lambda_function = importlib.import_module("lambda.functions.AdminUpdateEvent.lambda_function")
-
-        """ SeoUrl Not Exists """
-        response = lambda_function.check_seourl_existence('test', 'test')
-        assert response == []
-
-        """ SeoUrl Exists """
-        response = lambda_function.check_seourl_existence('test1', 'test2')
-        data = DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, 'test2')
-        assert response != []
-        assert response == [data]
-
-        response = lambda_function.check_seourl_existence('test2', 'test1')
-        data = DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, 'test1')
-        assert response != []
-        assert response == [data]
-
     def test_update_event(self, dynamodb_resource):
         lambda_function = importlib.import_module("lambda.functions.AdminUpdateEvent.lambda_function")
 
@@ -85,6 +72,57 @@ class TestAdminDeleteEvent():
         assert data['updatedAt'] == SampleUpdatedEvent1['now']
         assert data['updatedBy'] == SampleUpdatedEvent1['requesterEmail']
 
+        assert data['version'] == 1
+
+        """ Update Event - Failed (Stale Version) """
+        updateArgs = [SampleUpdatedEvent1[field] for field in [
+            'eventId', 'title', 'shortDescription', 'longDescription', 'media', 'status', 'displayVenue',
+            'isHighlighted', 'venue', 'region', 'eventDate', 'displayDate', 'openingHours', 'admission',
+            'category', 'topic', 'seoUrl', 'ticketUrl', 'websiteUrl', 'displayAdmission', 'organizer',
+            'facebookUrl', 'instagramUrl', 'requesterEmail', 'now'
+        ]]
+        try:
+            lambda_function.update_event(*updateArgs, expectedVersion=0)
+            assert False
+        except ConflictError:
+            assert DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, 'test1')['version'] == 1
+
+        """ Update Event - Current Version """
+        response = lambda_function.update_event(*updateArgs, expectedVersion=1)
+        assert response['version'] == 2
+        assert response == DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, 'test1')
+
+        """ Update Event - seoUrl Guard Moved With The Event """
+        assert DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, 'seoUrl#test') == {'eventId': 'seoUrl#test', 'ownerEventId': 'test1'}
+        assert DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, 'seoUrl#test1') is None
+
+        """ Update Event - Failed (seoUrl Reserved By Another Event) """
+        try:
+            lambda_function.update_event(
+                'test1', 'test', 'test', 'test', 'test', 'ACTIVE', 'test',
+                'test', 'test', 'test', 'test', 'test', 'test', 'test',
+                'test', 'test', 'test2', 'test', 'test', 'test', 'test',
+                'test', 'test', 'test', 'test'
+            )
+            assert False
+        except BadRequestError as ex:
+            assert str(ex) == 'SeoUrl already exists.'
+        assert DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, 'test1')['seoUrl'] == 'test'
+        assert DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, 'seoUrl#test2')['ownerEventId'] == 'test2'
+
+        """ Update Event - Failed (seoUrl Guard Is Not An Event) """
+        try:
+            lambda_function.update_event(
+                'seoUrl#test2', 'test', 'test', 'test', 'test', 'ACTIVE', 'test',
+                'test', 'test', 'test', 'test', 'test', 'test', 'test',
+                'test', 'test', 'guard', 'test', 'test', 'test', 'test',
+                'test', 'test', 'test', 'test'
+            )
+            assert False
+        except NotFoundError:
+            assert DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, 'seoUrl#test2') == {'eventId': 'seoUrl#test2', 'ownerEventId': 'test2'}
+            assert DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, 'seoUrl#guard') is None
+
         """ Update Event - Failed (eventId is None) """
         try:
             lambda_function.update_event(
@@ -109,40 +147,213 @@ class TestAdminDeleteEvent():
         except:
             assert True
 
+    def test_update_event_fields(self, dynamodb_resource, mocker):
+        lambda_function = importlib.import_module("lambda.functions.AdminUpdateEvent.lambda_function")
+        before = DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, 'test2')
+
+        """ Update Event Fields - Only Changed Fields Written And Returned """
+        response = lambda_function.update_event_fields('test2', {'title': 'sparse', 'status': 'INACTIVE'}, 'test@test.com', 'now')
+        data = DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, 'test2')
+        assert response == {'eventId': 'test2', 'title': 'sparse', 'status': 'INACTIVE', 'updatedAt': 'now', 'updatedBy': 'test@test.com', 'version': 1}
+        assert data == {**before, 'title': 'sparse', 'status': 'INACTIVE', 'updatedAt': 'now', 'updatedBy': 'test@test.com', 'version': 1}
+
+        """ Update Event Fields - Template Reused For The Same Fields """
+        lambda_function.sparse_update_template.cache_clear()
+        lambda_function.update_event_fields('test2', {'status': 'ACTIVE', 'title': 'again'}, 'test@test.com', 'now')
+        lambda_function.update_event_fields('test2', {'title': 'sparse', 'status': 'INACTIVE'}, 'test@test.com', 'now')
+        cacheInfo = lambda_function.sparse_update_template.cache_info()
+        assert cacheInfo.misses == 1
+        assert cacheInfo.hits == 1
+
+        """ Update Event Fields - seoUrl Changed Together With Its Guard """
+        response = lambda_function.update_event_fields('test2', {'seoUrl': 'sparse'}, 'test@test.com', 'now')
+        assert response == {'eventId': 'test2', 'seoUrl': 'sparse', 'updatedAt': 'now', 'updatedBy': 'test@test.com', 'version': 4}
+        assert DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, 'test2')['seoUrl'] == 'sparse'
+        assert DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, 'seoUrl#sparse')['ownerEventId'] == 'test2'
+        assert DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, 'seoUrl#test2') is None
+
+        """ Update Event Fields - Failed (Stale Version) """
+        for changes in [{'title': 'stale'}, {'seoUrl': 'stale'}]:
+            try:
+                lambda_function.update_event_fields('test2', changes, 'test@test.com', 'now', expectedVersion=3)
+                assert False
+            except ConflictError:
+                assert DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, 'test2')['version'] == 4
+
+        """ Update Event Fields - Current Version """
+        response = lambda_function.update_event_fields('test2', {'title': 'current'}, 'test@test.com', 'now', expectedVersion=4)
+        assert response['version'] == 5
+
+        """ Update Event Fields - Unchanged seoUrl Written In One Update """
+        getItem = mocker.spy(lambda_function.EVENT_DDB_TABLE, 'get_item')
+        transactWriteItems = mocker.spy(lambda_function.EVENT_DDB_TABLE.meta.client, 'transact_write_items')
+        response = lambda_function.update_event_fields('test2', {'seoUrl': 'sparse', 'title': 'kept'}, 'test@test.com', 'now', expectedVersion=5)
+        assert response['version'] == 6
+        assert DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, 'test2')['title'] == 'kept'
+        assert getItem.call_count == 0
+        assert transactWriteItems.call_count == 0
+
+        """ Update Event Fields - Failed (Stale Version Cancels The seoUrl Move) """
+        try:
+            lambda_function.update_event_fields('test2', {'seoUrl': 'stale'}, 'test@test.com', 'now', expectedVersion=5)
+            assert False
+        except ConflictError:
+            assert getItem.call_count == 1
+            assert transactWriteItems.call_count == 1
+            assert DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, 'seoUrl#stale') is None
+
+        """ Update Event Fields - Failed (seoUrl Guard Is Not An Event) """
+        for changes in [{'title': 'guard'}, {'seoUrl': 'guard'}]:
+            try:
+                lambda_function.update_event_fields('seoUrl#sparse', changes, 'test@test.com', 'now')
+                assert False
+            except NotFoundError:
+                assert DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, 'seoUrl#sparse') == {'eventId': 'seoUrl#sparse', 'ownerEventId': 'test2'}
+
+        """ Update Event Fields - Failed (Event Not Exists) """
+        for changes in [{'title': 'sparse'}, {'seoUrl': 'missing'}]:
+            try:
+                lambda_function.update_event_fields('missing', changes, 'test@test.com', 'now', expectedVersion=None)
+                assert False
+            except BadRequestError as ex:
+                assert str(ex) == 'Event not found.'
+        assert DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, 'missing') is None
+
+    def test_update_invalidates_cache(self, dynamodb_resource, lambda_context, mocker):
+        lambda_function = importlib.import_module("lambda.functions.AdminUpdateEvent.lambda_function")
+        redisClient = Redis_Mock()
+        mocker.patch('lambda.functions.AdminUpdateEvent.lambda_function.REDIS_CLIENT', redisClient)
+
+        """ Sparse Update Drops The Cached Event """
+        redisClient.set('v1:event:test2', '{}')
+        lambda_function.update_event_fields('test2', {'title': 'cached'}, 'test@test.com', 'now')
+        assert redisClient.exists('v1:event:test2') == 0
+        assert redisClient.get('v1:generation:eventList') == b'1'
+
+        """ seoUrl Update Drops The Cached Event """
+        redisClient.set('v1:event:test2', '{}')
+        lambda_function.update_event_fields('test2', {'seoUrl': 'cached'}, 'test@test.com', 'now')
+        assert redisClient.exists('v1:event:test2') == 0
+
+        """ Failed Update Leaves The Cache Alone """
+        redisClient.set('v1:event:test2', '{}')
+        try:
+            lambda_function.update_event_fields('test2', {'title': 'stale'}, 'test@test.com', 'now', expectedVersion=0)
+            assert False
+        except ConflictError:
+            assert redisClient.exists('v1:event:test2') == 1
+
+        """ Redis Unavailable Does Not Fail The Update """
+        unlink = mocker.patch.object(redisClient, 'unlink', side_effect=ConnectionError('Connection refused'))
+        warning = mocker.patch('event_cache_helper.logger.warning')
+        response = lambda_function.lambda_handler(SampleSparseLambdaEvent1, lambda_context)
+        assert response['statusCode'] == 200
+        assert json.loads(response['body'])['title'] == 'sparse'
+        unlink.assert_called_once_with('v1:event:test2')
+        warning.assert_called_once()
+        assert warning.call_args.args[0]['message'] == 'Cache invalidation failed'
+        assert warning.call_args.args[0]['error'] == 'Connection refused'
+
+    def test_update_regenerates_public_web(self, dynamodb_resource, mocker):
+        lambda_function = importlib.import_module("lambda.functions.AdminUpdateEvent.lambda_function")
+        mocker.patch('lambda.functions.AdminUpdateEvent.lambda_function.PUBLIC_WEB_PIPELINE_NAME', 'PublicWeb')
+        triggerMock = mocker.patch('lambda.functions.AdminUpdateEvent.lambda_function.triggerPublicWebRegeneration')
+
+        """ Sparse Update - Touched Fields In The Manifest Entry """
+        lambda_function.update_event_fields('test2', {'title': 'manifest', 'status': 'ACTIVE'}, 'test@test.com', 'now')
+        triggerMock.assert_called_once_with('PublicWeb', lambda_function.REGENERATION_DDB_TABLE, changes=[{'eventId': 'test2', 'fields': ['status', 'title']}])
+
+        """ Sparse Update - Only Changed Fields In The Manifest Entry """
+        lambda_function.update_event_fields('test2', {'title': 'manifest', 'status': 'INACTIVE'}, 'test@test.com', 'now')
+        assert triggerMock.call_args.kwargs['changes'] == [{'eventId': 'test2', 'fields': ['status']}]
+
+        """ Sparse Update - Nothing Changed, Not Requested """
+        lambda_function.update_event_fields('test2', {'title': 'manifest', 'status': 'INACTIVE'}, 'test@test.com', 'now')
+        assert triggerMock.call_count == 2
+
+        """ seoUrl Update - Old And New seoUrl In The Manifest Entry """
+        previousSeoUrl = DynamoDB_Get_Item(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, 'test2')['seoUrl']
+        lambda_function.update_event_fields('test2', {'seoUrl': 'manifest', 'title': 'manifest'}, 'test@test.com', 'now')
+        assert triggerMock.call_args.kwargs['changes'] == [{'eventId': 'test2', 'fields': ['seoUrl'], 'oldSeoUrl': previousSeoUrl, 'newSeoUrl': 'manifest'}]
+
+        """ Nothing Changed - Not Requested """
+        lambda_function.update_event_fields('test2', {'seoUrl': 'manifest'}, 'test@test.com', 'now')
+        assert triggerMock.call_count == 3
+
+        """ Failed Update - Not Requested """
+        try:
+            lambda_function.update_event_fields('test2', {'title': 'stale'}, 'test@test.com', 'now', expectedVersion=0)
+            assert False
+        except ConflictError:
+            assert triggerMock.call_count == 3
+
     def test_lambda_handler(self, lambda_context, mocker):
         lambda_function = importlib.import_module("lambda.functions.AdminUpdateEvent.lambda_function")
 
         """ All OK """
-        mocker.patch('lambda.functions.AdminUpdateEvent.lambda_function.check_seourl_existence', return_value=[])
-        mocker.patch('lambda.functions.AdminUpdateEvent.lambda_function.update_event', return_value=json.loads(SampleLambdaEvent1['body']))
+        updatedEvent = {**json.loads(SampleLambdaEvent1['body']), 'version': 2}
+        mocker.patch('lambda.functions.AdminUpdateEvent.lambda_function.update_event', return_value=updatedEvent)
         response = lambda_function.lambda_handler(SampleLambdaEvent1, lambda_context)
         assert response['statusCode'] == 200
-        assert json.loads(response['body']) == json.loads(SampleLambdaEvent1['body'])
+        assert json.loads(response['body']) == updatedEvent
+        assert response['headers']['ETag'] == '"2"'
+
+        """ If-Match Passed On As The Expected Version """
+        updateEvent = mocker.patch('lambda.functions.AdminUpdateEvent.lambda_function.update_event', return_value=updatedEvent)
+        response = lambda_function.lambda_handler({**SampleLambdaEvent1, 'headers': {'if-match': '"1"'}}, lambda_context)
+        assert response['statusCode'] == 200
+        assert updateEvent.call_args.args[-1] == 1
+
+        """ If-Match Invalid """
+        response = lambda_function.lambda_handler({**SampleLambdaEvent1, 'headers': {'If-Match': 'abc'}}, lambda_context)
+        assert response['statusCode'] == 400
+        assert json.loads(response['body'])['message'] == 'Invalid If-Match header.'
+
+        """ Stale Version """
+        mocker.patch('lambda.functions.AdminUpdateEvent.lambda_function.update_event', side_effect=ConflictError('Event has been modified, please reload it.'))
+        response = lambda_function.lambda_handler({**SampleLambdaEvent1, 'headers': {'If-Match': '"1"'}}, lambda_context)
+        assert response['statusCode'] == 409
+        assert json.loads(response['body'])['message'] == 'Event has been modified, please reload it.'
+
+        """ eventId Is A seoUrl Guard """
+        mocker.patch('lambda.functions.AdminUpdateEvent.lambda_function.update_event', side_effect=NotFoundError('Event Not Found.'))
+        response = lambda_function.lambda_handler(SampleLambdaEvent1, lambda_context)
+        assert response['statusCode'] == 404
+        assert json.loads(response['body'])['message'] == 'Event Not Found.'
 
         """ eventId is Empty String """
-        mocker.patch('lambda.functions.AdminUpdateEvent.lambda_function.check_seourl_existence', return_value=[])
         mocker.patch('lambda.functions.AdminUpdateEvent.lambda_function.update_event', return_value=json.loads(SampleLambdaEvent1['body']))
         response = lambda_function.lambda_handler(SampleLambdaEvent2, lambda_context)
         assert response['statusCode'] == 400
         assert json.loads(response['body'])['message'] == 'Invalid Parameters'
 
         """ eventId is None """
-        mocker.patch('lambda.functions.AdminUpdateEvent.lambda_function.check_seourl_existence', return_value=[])
         mocker.patch('lambda.functions.AdminUpdateEvent.lambda_function.update_event', return_value=json.loads(SampleLambdaEvent1['body']))
         response = lambda_function.lambda_handler(SampleLambdaEvent3, lambda_context)
         assert response['statusCode'] == 400
         assert json.loads(response['body'])['message'] == 'Invalid Parameters'
 
         """ SeoUrl Exists """
-        mocker.patch('lambda.functions.AdminUpdateEvent.lambda_function.check_seourl_existence', return_value=InitialEventData)
-        mocker.patch('lambda.functions.AdminUpdateEvent.lambda_function.update_event', return_value=json.loads(SampleLambdaEvent1['body']))
+        mocker.patch('lambda.functions.AdminUpdateEvent.lambda_function.update_event', side_effect=BadRequestError('SeoUrl already exists.'))
         response = lambda_function.lambda_handler(SampleLambdaEvent1, lambda_context)
         assert response['statusCode'] == 400
         assert json.loads(response['body'])['message'] == 'SeoUrl already exists.'
 
         """ Update Event Throws Exception """
-        mocker.patch('lambda.functions.AdminUpdateEvent.lambda_function.check_seourl_existence', return_value=[])
         mocker.patch('lambda.functions.AdminUpdateEvent.lambda_function.update_event', side_effect=Exception())
         response = lambda_function.lambda_handler(SampleLambdaEvent1, lambda_context)
         assert response['statusCode'] == 500
         assert json.loads(response['body'])['message'] == 'Something went wrong. Please try again later.'
+
+        """ Sparse Update - Only Fields In The Body Passed On """
+        updateEventFields = mocker.patch('lambda.functions.AdminUpdateEvent.lambda_function.update_event_fields', return_value={'eventId': 'test2', 'title': 'sparse', 'version': 3})
+        response = lambda_function.lambda_handler(SampleSparseLambdaEvent1, lambda_context)
+        assert response['statusCode'] == 200
+        assert json.loads(response['body']) == {'eventId': 'test2', 'title': 'sparse', 'version': 3}
+        assert response['headers']['ETag'] == '"3"'
+        assert updateEventFields.call_args.args[:3] == ('test2', {'title': 'sparse', 'status': 'INACTIVE'}, 'test@test.com')
+
+        """ Sparse Update - No Updatable Fields """
+        response = lambda_function.lambda_handler(SampleSparseLambdaEvent2, lambda_context)
+        assert response['statusCode'] == 400
+        assert json.loads(response['body'])['message'] == 'Invalid Parameters'
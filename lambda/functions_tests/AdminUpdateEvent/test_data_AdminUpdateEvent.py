@@ -60,6 +60,11 @@ InitialEventData = [
     }
 ]
 
+InitialSeoUrlGuardData = [
+    {"eventId": "seoUrl#test1", "ownerEventId": "test1"},
+    {"eventId": "seoUrl#test2", "ownerEventId": "test2"}
+]
+
 SampleUpdatedEvent1 = {
     "eventId": "test1",
     "admission": "test",
@@ -201,4 +206,39 @@ SampleLambdaEvent3 = {
             }
         }
     }
-}
\ No newline at end of file
+}
+SampleSparseLambdaEvent1 = {
+    'queryStringParameters': {
+        'mode': 'sparse'
+    },
+    'body': json.dumps({
+        "eventId": "test2",
+        "title": "sparse",
+        "status": "INACTIVE",
+        "createdBy": "test"
+    }),
+    'requestContext': {
+        'authorizer': {
+            'claims': {
+                'email': 'test@test.com'
+            }
+        }
+    }
+}
+
+SampleSparseLambdaEvent2 = {
+    'queryStringParameters': {
+        'mode': 'sparse'
+    },
+    'body': json.dumps({
+        "eventId": "test2",
+        "createdBy": "test"
+    }),
+    'requestContext': {
+        'authorizer': {
+            'claims': {
+                'email': 'test@test.com'
+            }
+        }
+    }
+}
@@ -0,0 +1,130 @@
+import os
+import pytest
+import importlib
+from mock_services_setup.dynamodb_mock import DynamoDB_Table_Mock, DynamoDB_Get_Item, DynamoDB_Segmented_Scan
+from mock_services_setup.opensearch_mock import OpenSearch_Bulk_Stub
+from opensearch_helper import OpenSearchTransport
+from opensearch_bulk_helper import OpenSearchBulkClient
+from test_data_EventReindex import (
+    InitialEventData,
+    SampleLambdaContext
+)
+
+# Environment Variables
+EVENT_TABLE = 'Event'
+CHECKPOINT_TABLE = 'ReindexCheckpoint'
+ES_DOMAIN_ENDPOINT = 'search.test.com'
+
+os.environ['EVENT_TABLE'] = EVENT_TABLE
+os.environ['CHECKPOINT_TABLE'] = CHECKPOINT_TABLE
+os.environ['ES_DOMAIN_ENDPOINT'] = ES_DOMAIN_ENDPOINT
+
+# Required Values
+EVENT_TABLE_PK = 'eventId'
+CHECKPOINT_TABLE_PK = 'checkpointId'
+
+def stub_bulk_client(lambda_function, url, chunkSizes=None):
+    def on_response(*args):
+        lambda_function.CHUNK_SIZE.record(*args)
+        if chunkSizes is not None:
+            chunkSizes.append(lambda_function.CHUNK_SIZE.chunkSize)
+    return OpenSearchBulkClient(OpenSearchTransport(url, None), onResponse=on_response)
+
+@pytest.mark.usefixtures('aws_credentials')
+class TestEventReindex():
+    def test_create_dynamodb_tables(self, dynamodb_resource):
+        EventTable = DynamoDB_Table_Mock(dynamodb_resource, EVENT_TABLE, EVENT_TABLE_PK, [], InitialEventData)
+        CheckpointTable = DynamoDB_Table_Mock(dynamodb_resource, CHECKPOINT_TABLE, CHECKPOINT_TABLE_PK)
+        assert EventTable.name == EVENT_TABLE
+        assert CheckpointTable.name == CHECKPOINT_TABLE
+
+    def test_adaptive_chunk_size(self):
+        lambda_function = importlib.import_module("lambda.functions.EventReindex.lambda_function")
+        chunkSize = lambda_function.AdaptiveChunkSize(chunkSize=400, minimum=50, maximum=500, targetLatency=1)
+
+        """ Throttled - Halved """
+        chunkSize.record(800, 0.1, 200, 3)
+        assert chunkSize.chunkSize == 200
+        chunkSize.record(400, 0.1, 429, 0)
+        assert chunkSize.chunkSize == 100
+
+        """ Slow - Shrunk, Never Below Minimum """
+        chunkSize.record(200, 2, 200, 0)
+        assert chunkSize.chunkSize == 80
+        for _ in range(10):
+            chunkSize.record(160, 2, 200, 0)
+        assert chunkSize.chunkSize == 50
+
+        """ Fast - Grown, Never Above Maximum """
+        chunkSize.record(100, 0.1, 200, 0)
+        assert chunkSize.chunkSize == 100
+        chunkSize.record(200, 0.6, 200, 0)
+        assert chunkSize.chunkSize == 100
+        for _ in range(20):
+            chunkSize.record(200, 0.1, 200, 0)
+        assert chunkSize.chunkSize == 500
+
+    def test_index_documents(self, mocker):
+        lambda_function = importlib.import_module("lambda.functions.EventReindex.lambda_function")
+        mocker.patch('lambda.functions.EventReindex.lambda_function.BULK_INITIAL_BACKOFF', 0)
+        mocker.patch('lambda.functions.EventReindex.lambda_function.CHUNK_SIZE', lambda_function.AdaptiveChunkSize(chunkSize=40, minimum=10))
+        # One bulk thread, so chunks are sent and sized in a fixed order
+        mocker.patch('lambda.functions.EventReindex.lambda_function.BULK_THREAD_COUNT', 1)
+
+        with OpenSearch_Bulk_Stub() as stub:
+            chunkSizes = []
+            mocker.patch('lambda.functions.EventReindex.lambda_function.BULK_CLIENT', stub_bulk_client(lambda_function, stub.url, chunkSizes))
+
+            """ Throttled Documents Retried In Smaller Chunks """
+            stub.throttledRequests = 2
+            stub.failures = {'test5': 400}
+            indexed, failed = lambda_function.index_documents('event-v2', InitialEventData)
+            assert (indexed, failed) == (len(InitialEventData) - 1, 1)
+            assert len(stub.documents) == len(InitialEventData) - 1
+            assert chunkSizes[:2] == [20, 10]
+            assert stub.bulkRequests > len(InitialEventData) // 40
+
+    def test_lambda_handler(self, dynamodb_resource, mocker):
+        lambda_function = importlib.import_module("lambda.functions.EventReindex.lambda_function")
+        segmentedScan = DynamoDB_Segmented_Scan(dynamodb_resource.Table(EVENT_TABLE), EVENT_TABLE_PK)
+        mocker.patch('lambda.functions.EventReindex.lambda_function.SCAN_PAGE_LIMIT', 10)
+        mocker.patch.object(lambda_function.EVENT_DDB_TABLE, 'scan', side_effect=segmentedScan, create=True)
+
+        with OpenSearch_Bulk_Stub() as stub:
+            mocker.patch('lambda.functions.EventReindex.lambda_function.BULK_CLIENT', stub_bulk_client(lambda_function, stub.url))
+
+            """ Interrupted Run - Segment Progress Checkpointed """
+            indexDocuments = lambda_function.index_documents
+            calls = []
+            def interrupted_index_documents(targetIndex, items):
+                calls.append(targetIndex)
+                if len(calls) > 4:
+                    raise Exception('Interrupted')
+                return indexDocuments(targetIndex, items)
+
+            mocker.patch('lambda.functions.EventReindex.lambda_function.index_documents', side_effect=interrupted_index_documents)
+            response = lambda_function.lambda_handler({'runId': 'run1', 'targetIndex': 'event-v2', 'totalSegments': 4}, SampleLambdaContext(900000))
+            assert response['completed'] == False
+            assert response['indexed'] == len(stub.documents)
+            assert 0 < response['indexed'] < len(InitialEventData)
+
+            checkpoints = [DynamoDB_Get_Item(dynamodb_resource, CHECKPOINT_TABLE, CHECKPOINT_TABLE_PK, f'run1#{segment}') for segment in range(4)]
+            assert sum(checkpoint['indexed'] for checkpoint in checkpoints if checkpoint) == response['indexed']
+
+            """ Resumed Run - Only Remaining Pages Indexed """
+            mocker.stopall()
+            mocker.patch('lambda.functions.EventReindex.lambda_function.SCAN_PAGE_LIMIT', 10)
+            mocker.patch.object(lambda_function.EVENT_DDB_TABLE, 'scan', side_effect=segmentedScan, create=True)
+            mocker.patch('lambda.functions.EventReindex.lambda_function.BULK_CLIENT', stub_bulk_client(lambda_function, stub.url))
+            response = lambda_function.lambda_handler({'runId': 'run1', 'totalSegments': 8}, SampleLambdaContext(900000))
+            assert response['completed'] == True
+            assert response['completedSegments'] == 4
+            assert response['targetIndex'] == 'event-v2'
+            assert response['indexed'] == len(InitialEventData)
+            assert len(stub.documents) == len(InitialEventData)
+            assert stub.indexedDocuments == len(InitialEventData)
+
+            """ Near The Lambda Timeout - No Page Started """
+            response = lambda_function.lambda_handler({'runId': 'run2', 'totalSegments': 2}, SampleLambdaContext(1000))
+            assert response['completed'] == False
+            assert response['indexed'] == 0
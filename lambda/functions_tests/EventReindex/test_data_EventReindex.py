@@ -0,0 +1,26 @@
+from decimal import Decimal
+
+InitialEventData = [
+    {
+        "eventId": f"test{index}",
+        "category": "test",
+        "isDeleted": False,
+        "isHighlighted": index % 2 == 0,
+        "region": "test",
+        "seoUrl": f"test{index}",
+        "status": "ACTIVE",
+        "title": f"test{index}",
+        "venue": "test",
+        "priority": Decimal(index)
+    }
+    for index in range(120)
+]
+
+class SampleLambdaContext(object):
+    function_name = 'test'
+
+    def __init__(self, remainingMillis):
+        self.remainingMillis = remainingMillis
+
+    def get_remaining_time_in_millis(self):
+        return self.remainingMillis
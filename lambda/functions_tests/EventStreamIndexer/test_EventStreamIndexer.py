@@ -0,0 +1,110 @@
+import os
+import time
+import boto3
+import pytest
+import importlib
+from decimal import Decimal
+from moto import mock_dynamodbstreams
+from mock_services_setup.opensearch_mock import OpenSearch_Bulk_Stub
+from opensearch_helper import OpenSearchTransport
+from opensearch_bulk_helper import OpenSearchBulkClient
+from test_data_EventStreamIndexer import (
+    InitialEventData,
+    SampleStreamEvent1,
+    BulkStreamEvent
+)
+
+# Environment Variables
+EVENT_TABLE = 'Event'
+ES_DOMAIN_ENDPOINT = 'search.test.com'
+
+os.environ['EVENT_TABLE'] = EVENT_TABLE
+os.environ['ES_DOMAIN_ENDPOINT'] = ES_DOMAIN_ENDPOINT
+
+# Required Values
+EVENT_TABLE_PK = 'eventId'
+BULK_DOCUMENTS = 2000
+
+def stub_bulk_client(url):
+    return OpenSearchBulkClient(OpenSearchTransport(url, None))
+
+@pytest.mark.usefixtures('aws_credentials')
+class TestEventStreamIndexer():
+    def test_coalesce_records(self):
+        lambda_function = importlib.import_module("lambda.functions.EventStreamIndexer.lambda_function")
+        from aws_lambda_powertools.utilities.data_classes import DynamoDBStreamEvent
+
+        """ Multiple Images Of The Same Event Coalesced, seoUrl Guards Skipped """
+        changes = lambda_function.coalesce_records(DynamoDBStreamEvent(SampleStreamEvent1).records)
+        assert list(changes) == ['test2', 'test1', 'test3', 'test4']
+        assert changes['test1'] == {'sequenceNumbers': ['100', '102'], 'document': {'eventId': 'test1', 'title': 'second'}}
+        assert changes['test2']['document']['priority'] == Decimal('2.5')
+        assert changes['test3'] == {'sequenceNumbers': ['103'], 'document': None}
+
+    def test_index_changes(self, mocker):
+        lambda_function = importlib.import_module("lambda.functions.EventStreamIndexer.lambda_function")
+        from aws_lambda_powertools.utilities.data_classes import DynamoDBStreamEvent
+        mocker.patch('lambda.functions.EventStreamIndexer.lambda_function.BULK_INITIAL_BACKOFF', 0)
+
+        with OpenSearch_Bulk_Stub() as stub:
+            mocker.patch('lambda.functions.EventStreamIndexer.lambda_function.BULK_CLIENT', stub_bulk_client(stub.url))
+
+            """ All Indexed, Missing Document Delete Ignored """
+            changes = lambda_function.coalesce_records(DynamoDBStreamEvent(SampleStreamEvent1).records)
+            assert lambda_function.index_changes(changes) == []
+            assert stub.documents['test1'] == {'eventId': 'test1', 'title': 'second'}
+            assert stub.documents['test2']['priority'] == 2.5
+            assert 'test3' not in stub.documents
+
+            """ Rejected Documents Reported From Their First Sequence Number """
+            stub.failures = {'test1': 400, 'test4': 429}
+            assert lambda_function.index_changes(changes) == ['100', '104']
+            assert stub.bulkRequests == 2 + lambda_function.BULK_MAX_RETRIES
+
+        """ OpenSearch Unreachable - Whole Batch Failed """
+        mocker.patch('lambda.functions.EventStreamIndexer.lambda_function.BULK_CLIENT', stub_bulk_client(stub.url))
+        assert lambda_function.index_changes(changes) == ['100', '101', '103', '104']
+
+    def test_lambda_handler(self, lambda_context, dynamodb_resource, mocker):
+        lambda_function = importlib.import_module("lambda.functions.EventStreamIndexer.lambda_function")
+
+        with mock_dynamodbstreams():
+            """ Stream Records From The Event Table """
+            table = dynamodb_resource.create_table(
+                TableName=EVENT_TABLE,
+                KeySchema=[{'AttributeName': EVENT_TABLE_PK, 'KeyType': 'HASH'}],
+                AttributeDefinitions=[{'AttributeName': EVENT_TABLE_PK, 'AttributeType': 'S'}],
+                BillingMode='PAY_PER_REQUEST',
+                StreamSpecification={'StreamEnabled': True, 'StreamViewType': 'NEW_AND_OLD_IMAGES'}
+            )
+            for item in InitialEventData:
+                table.put_item(Item=item)
+            table.update_item(Key={EVENT_TABLE_PK: 'test1'}, UpdateExpression='SET title=:title', ExpressionAttributeValues={':title': 'updated'})
+            table.delete_item(Key={EVENT_TABLE_PK: 'test2'})
+
+            streams = boto3.client('dynamodbstreams', region_name='ap-southeast-1')
+            streamArn = table.latest_stream_arn
+            shardId = streams.describe_stream(StreamArn=streamArn)['StreamDescription']['Shards'][0]['ShardId']
+            shardIterator = streams.get_shard_iterator(StreamArn=streamArn, ShardId=shardId, ShardIteratorType='TRIM_HORIZON')['ShardIterator']
+            records = streams.get_records(ShardIterator=shardIterator)['Records']
+            assert len(records) == 4
+
+        with OpenSearch_Bulk_Stub() as stub:
+            mocker.patch('lambda.functions.EventStreamIndexer.lambda_function.BULK_CLIENT', stub_bulk_client(stub.url))
+
+            """ Last Image Of Each Event Indexed """
+            stub.documents['test2'] = InitialEventData[1]
+            response = lambda_function.lambda_handler({'Records': records}, lambda_context)
+            assert response == {'batchItemFailures': []}
+            assert stub.documents == {'test1': {**InitialEventData[0], 'title': 'updated', 'priority': 1.5}}
+            assert stub.bulkRequests == 1
+
+            """ Throughput """
+            stub.bulkRequests = 0
+            start = time.perf_counter()
+            response = lambda_function.lambda_handler(BulkStreamEvent(BULK_DOCUMENTS), lambda_context)
+            duration = time.perf_counter() - start
+            print(f'EventStreamIndexer: {BULK_DOCUMENTS / duration:.0f} documents/s over {stub.bulkRequests} bulk requests')
+            assert response == {'batchItemFailures': []}
+            assert len(stub.documents) == BULK_DOCUMENTS + 1
+            assert stub.bulkRequests == -(-BULK_DOCUMENTS // lambda_function.BULK_CHUNK_SIZE)
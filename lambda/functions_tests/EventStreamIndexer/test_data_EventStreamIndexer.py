@@ -0,0 +1,70 @@
+from decimal import Decimal
+
+InitialEventData = [
+    {
+        "eventId": "test1",
+        "category": "test1",
+        "isDeleted": False,
+        "isHighlighted": False,
+        "region": "test1",
+        "seoUrl": "test1",
+        "status": "ACTIVE",
+        "title": "test1",
+        "venue": "test1",
+        "priority": Decimal('1.5')
+    },
+    {
+        "eventId": "test2",
+        "category": "test2",
+        "isDeleted": False,
+        "isHighlighted": True,
+        "region": "test2",
+        "seoUrl": "test2",
+        "status": "ACTIVE",
+        "title": "test2",
+        "venue": "test2",
+        "priority": Decimal('2')
+    }
+]
+
+def StreamRecord(eventName, eventId, sequenceNumber, newImage=None):
+    dynamodb = {
+        'Keys': {'eventId': {'S': eventId}},
+        'SequenceNumber': sequenceNumber,
+        'StreamViewType': 'NEW_AND_OLD_IMAGES'
+    }
+    if newImage is not None:
+        dynamodb['NewImage'] = newImage
+
+    return {
+        'eventID': sequenceNumber,
+        'eventName': eventName,
+        'eventSource': 'aws:dynamodb',
+        'eventSourceARN': 'arn:aws:dynamodb:ap-southeast-1:123456789012:table/Event/stream/2022-01-01T00:00:00.000',
+        'dynamodb': dynamodb
+    }
+
+SampleStreamEvent1 = {
+    'Records': [
+        StreamRecord('INSERT', 'test1', '100', {'eventId': {'S': 'test1'}, 'title': {'S': 'first'}}),
+        StreamRecord('INSERT', 'test2', '101', {'eventId': {'S': 'test2'}, 'title': {'S': 'test2'}, 'priority': {'N': '2.5'}}),
+        StreamRecord('MODIFY', 'test1', '102', {'eventId': {'S': 'test1'}, 'title': {'S': 'second'}}),
+        StreamRecord('REMOVE', 'test3', '103'),
+        StreamRecord('MODIFY', 'test4', '104', {'eventId': {'S': 'test4'}, 'title': {'S': 'test4'}}),
+        StreamRecord('INSERT', 'seoUrl#test4', '105', {'eventId': {'S': 'seoUrl#test4'}, 'ownerEventId': {'S': 'test4'}})
+    ]
+}
+
+def BulkStreamEvent(documents):
+    return {
+        'Records': [
+            StreamRecord('INSERT', f'bulk{index}', str(1000 + index), {
+                'eventId': {'S': f'bulk{index}'},
+                'title': {'S': f'Event {index}'},
+                'status': {'S': 'ACTIVE'},
+                'isDeleted': {'BOOL': False},
+                'media': {'L': [{'S': f'bulk{index}.jpg'}]}
+            })
+            for index in range(documents)
+        ]
+    }
@@ -0,0 +1,169 @@
+import os
+import json
+import importlib
+from mock_services_setup.dynamodb_mock import DynamoDB_Table_Mock, DynamoDB_Get_Item
+from test_data_PublicWebRegeneration import (
+    SampleScheduledEvent1,
+    InProgressExecutions,
+    FinishedExecutions,
+    StartedExecution,
+    SampleCreatedChange1,
+    SampleUpdatedChange1,
+    SampleUpdatedChange2
+)
+
+# Environment Variables
+PUBLIC_WEB_PIPELINE_NAME = 'PublicWeb'
+REGENERATION_TABLE = 'PublicWebRegeneration'
+
+os.environ['PUBLIC_WEB_PIPELINE_NAME'] = PUBLIC_WEB_PIPELINE_NAME
+os.environ['REGENERATION_TABLE'] = REGENERATION_TABLE
+
+# Required Values
+REGENERATION_TABLE_PK = 'pipelineName'
+
+class TestPublicWebRegeneration():
+    def test_create_dynamodb_tables(self, dynamodb_resource):
+        RegenerationTable = DynamoDB_Table_Mock(dynamodb_resource, REGENERATION_TABLE, REGENERATION_TABLE_PK)
+        assert RegenerationTable.name == REGENERATION_TABLE
+
+    def test_trigger_debounce(self, dynamodb_resource, mocker):
+        from codepipeline_helper import triggerPublicWebRegeneration, flushPublicWebRegeneration
+        table = dynamodb_resource.Table(REGENERATION_TABLE)
+        pipelineClient = mocker.patch('codepipeline_helper.CODE_PIPELINE_CLIENT')
+        pipelineClient.list_pipeline_executions.return_value = FinishedExecutions
+
+        """ Burst Of Edits - One Execution Per Window """
+        statuses = [triggerPublicWebRegeneration('burst', table, now=1000 + second, debounceSeconds=60) for second in range(50)]
+        assert statuses == ['STARTED'] + ['DEBOUNCED'] * 49
+        assert pipelineClient.start_pipeline_execution.call_count == 1
+        assert DynamoDB_Get_Item(dynamodb_resource, REGENERATION_TABLE, REGENERATION_TABLE_PK, 'burst')['pendingChanges'] == 49
+
+        """ Flush - Still Inside The Window """
+        assert flushPublicWebRegeneration('burst', table, now=1059, debounceSeconds=60) == 'DEBOUNCED'
+
+        """ Flush - Execution Still Running """
+        pipelineClient.list_pipeline_executions.return_value = InProgressExecutions
+        assert flushPublicWebRegeneration('burst', table, now=1060, debounceSeconds=60) == 'IN_PROGRESS'
+        assert pipelineClient.start_pipeline_execution.call_count == 1
+
+        """ Flush - Tail Of The Burst Published Once """
+        pipelineClient.list_pipeline_executions.return_value = FinishedExecutions
+        assert flushPublicWebRegeneration('burst', table, now=1070, debounceSeconds=60) == 'STARTED'
+        assert pipelineClient.start_pipeline_execution.call_count == 2
+        pipelineClient.start_pipeline_execution.assert_called_with(name='burst')
+        assert DynamoDB_Get_Item(dynamodb_resource, REGENERATION_TABLE, REGENERATION_TABLE_PK, 'burst')['pendingChanges'] == 0
+
+        """ Flush - Nothing Pending """
+        assert flushPublicWebRegeneration('burst', table, now=2000, debounceSeconds=60) == 'CLEAN'
+        assert pipelineClient.start_pipeline_execution.call_count == 2
+
+    def test_trigger_coalesced(self, dynamodb_resource, mocker):
+        from codepipeline_helper import triggerPublicWebRegeneration
+        table = dynamodb_resource.Table(REGENERATION_TABLE)
+        pipelineClient = mocker.patch('codepipeline_helper.CODE_PIPELINE_CLIENT')
+
+        """ Window Claimed By Another Caller Meanwhile """
+        def claimed_elsewhere(pipelineName):
+            table.update_item(Key={'pipelineName': pipelineName}, UpdateExpression='SET lastStartedAt=:now', ExpressionAttributeValues={':now': 1000})
+            return False
+        mocker.patch('codepipeline_helper.isPipelineExecutionInProgress', side_effect=claimed_elsewhere)
+        assert triggerPublicWebRegeneration('race', table, now=1000) == 'COALESCED'
+        assert pipelineClient.start_pipeline_execution.call_count == 0
+        assert DynamoDB_Get_Item(dynamodb_resource, REGENERATION_TABLE, REGENERATION_TABLE_PK, 'race')['pendingChanges'] == 1
+
+    def test_trigger_failed(self, dynamodb_resource, mocker):
+        from codepipeline_helper import triggerPublicWebRegeneration
+        table = dynamodb_resource.Table(REGENERATION_TABLE)
+        pipelineClient = mocker.patch('codepipeline_helper.CODE_PIPELINE_CLIENT')
+        pipelineClient.list_pipeline_executions.return_value = FinishedExecutions
+
+        """ Start Failed - Changes Kept Pending, Write Not Failed """
+        pipelineClient.start_pipeline_execution.side_effect = Exception('Throttled')
+        assert triggerPublicWebRegeneration('failing', table, now=1000, changes=[SampleCreatedChange1]) == 'FAILED'
+        state = DynamoDB_Get_Item(dynamodb_resource, REGENERATION_TABLE, REGENERATION_TABLE_PK, 'failing')
+        assert state['pendingChanges'] == 1
+        assert len(state['changeEntries']) == 1
+
+        """ No State Table - Every Call Starts An Execution """
+        pipelineClient.start_pipeline_execution.side_effect = None
+        assert [triggerPublicWebRegeneration('stateless') for _ in range(3)] == ['STARTED'] * 3
+        assert pipelineClient.start_pipeline_execution.call_count == 4
+
+    def test_trigger_manifest(self, dynamodb_resource, mocker):
+        from codepipeline_helper import triggerPublicWebRegeneration, flushPublicWebRegeneration
+        table = dynamodb_resource.Table(REGENERATION_TABLE)
+        pipelineClient = mocker.patch('codepipeline_helper.CODE_PIPELINE_CLIENT')
+        pipelineClient.list_pipeline_executions.return_value = FinishedExecutions
+        s3Client = mocker.patch('codepipeline_helper.S3_CLIENT')
+        mocker.patch('codepipeline_helper.REGENERATION_MANIFEST_BUCKET', 'manifest-bucket')
+        updateItem = mocker.spy(table.meta.client, 'update_item')
+
+        # The manifest must already be in place when the execution starts
+        def start_after_manifest(name):
+            assert s3Client.put_object.call_args.kwargs['Key'] == f'{name}/pending.json'
+            return StartedExecution
+        pipelineClient.start_pipeline_execution.side_effect = start_after_manifest
+
+        def last_manifest():
+            putKwargs = s3Client.put_object.call_args.kwargs
+            assert putKwargs['Bucket'] == 'manifest-bucket'
+            return json.loads(putKwargs['Body'])
+
+        """ Started - Manifest Written First And Lists The Change """
+        assert triggerPublicWebRegeneration('manifest', table, now=1000, changes=[SampleCreatedChange1]) == 'STARTED'
+        manifest = last_manifest()
+        assert manifest['fullRebuild'] is False
+        assert manifest['changes'] == [SampleCreatedChange1]
+        assert 'changeEntries' not in DynamoDB_Get_Item(dynamodb_resource, REGENERATION_TABLE, REGENERATION_TABLE_PK, 'manifest')
+
+        """ Debounced - One Write Per Change, Changes To One Event Fold Into One Entry """
+        updateItem.reset_mock()
+        assert triggerPublicWebRegeneration('manifest', table, now=1010, changes=[SampleUpdatedChange1]) == 'DEBOUNCED'
+        assert triggerPublicWebRegeneration('manifest', table, now=1020, changes=[SampleUpdatedChange2]) == 'DEBOUNCED'
+        assert updateItem.call_count == 2
+        assert flushPublicWebRegeneration('manifest', table, now=1070) == 'STARTED'
+        assert last_manifest()['changes'] == [{'eventId': 'updated', 'fields': ['media', 'seoUrl', 'title'], 'oldSeoUrl': 'updated-1', 'newSeoUrl': 'updated-3'}]
+        assert 'changeEntries' not in DynamoDB_Get_Item(dynamodb_resource, REGENERATION_TABLE, REGENERATION_TABLE_PK, 'manifest')
+
+        """ No Changes Given - Full Rebuild """
+        assert triggerPublicWebRegeneration('manifest', table, now=2000) == 'STARTED'
+        assert last_manifest()['fullRebuild'] is True
+        assert 'fullRebuild' not in DynamoDB_Get_Item(dynamodb_resource, REGENERATION_TABLE, REGENERATION_TABLE_PK, 'manifest')
+
+        """ Too Many Changes Pending - Full Rebuild """
+        mocker.patch('codepipeline_helper.REGENERATION_MANIFEST_MAX_CHANGES', 1)
+        assert triggerPublicWebRegeneration('manifest', table, now=3000, changes=[SampleCreatedChange1]) == 'STARTED'
+        assert triggerPublicWebRegeneration('manifest', table, now=3010, changes=[SampleUpdatedChange1]) == 'DEBOUNCED'
+        assert triggerPublicWebRegeneration('manifest', table, now=3020, changes=[SampleUpdatedChange2]) == 'DEBOUNCED'
+        assert flushPublicWebRegeneration('manifest', table, now=3070) == 'STARTED'
+        assert last_manifest()['fullRebuild'] is True
+        assert last_manifest()['changes'] == []
+
+        """ Manifest Write Failed - Nothing Started, Changes Kept Pending """
+        s3Client.put_object.side_effect = Exception('Access Denied')
+        startCount = pipelineClient.start_pipeline_execution.call_count
+        assert triggerPublicWebRegeneration('manifest', table, now=4000, changes=[SampleCreatedChange1]) == 'FAILED'
+        assert pipelineClient.start_pipeline_execution.call_count == startCount
+        state = DynamoDB_Get_Item(dynamodb_resource, REGENERATION_TABLE, REGENERATION_TABLE_PK, 'manifest')
+        assert state['pendingChanges'] == 1
+        assert len(state['changeEntries']) == 1
+
+        """ No State Table - Full Rebuild Manifest Written """
+        s3Client.put_object.side_effect = None
+        assert triggerPublicWebRegeneration('manifest', changes=[SampleCreatedChange1]) == 'STARTED'
+        assert last_manifest()['fullRebuild'] is True
+
+    def test_lambda_handler(self, lambda_context, mocker):
+        lambda_function = importlib.import_module("lambda.functions.PublicWebRegeneration.lambda_function")
+
+        """ Flushed """
+        flushMock = mocker.patch('lambda.functions.PublicWebRegeneration.lambda_function.flushPublicWebRegeneration', return_value=lambda_function.RegenerationStatus.STARTED)
+        response = lambda_function.lambda_handler(SampleScheduledEvent1, lambda_context)
+        assert response == {'pipelineName': PUBLIC_WEB_PIPELINE_NAME, 'status': 'STARTED'}
+        flushMock.assert_called_once_with(PUBLIC_WEB_PIPELINE_NAME, lambda_function.REGENERATION_DDB_TABLE)
+
+        """ Flush Throws Error """
+        mocker.patch('lambda.functions.PublicWebRegeneration.lambda_function.flushPublicWebRegeneration', side_effect=Exception('Throttled'))
+        response = lambda_function.lambda_handler(SampleScheduledEvent1, lambda_context)
+        assert response['status'] == 'FAILED'
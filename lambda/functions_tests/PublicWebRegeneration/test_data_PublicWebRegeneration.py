@@ -0,0 +1,35 @@
+SampleScheduledEvent1 = {
+    "version": "0",
+    "id": "53dc4d37-cffa-4f76-80c9-8b7d4a4d2eaa",
+    "detail-type": "Scheduled Event",
+    "source": "aws.events",
+    "account": "123456789012",
+    "time": "2022-01-01T00:00:00Z",
+    "region": "ap-southeast-1",
+    "resources": ["arn:aws:events:ap-southeast-1:123456789012:rule/PublicWebRegenerationSchedule"],
+    "detail": {}
+}
+
+InProgressExecutions = {
+    "pipelineExecutionSummaries": [
+        {"pipelineExecutionId": "execution2", "status": "InProgress"},
+        {"pipelineExecutionId": "execution1", "status": "Succeeded"}
+    ]
+}
+
+FinishedExecutions = {
+    "pipelineExecutionSummaries": [
+        {"pipelineExecutionId": "execution2", "status": "Succeeded"},
+        {"pipelineExecutionId": "execution1", "status": "Succeeded"}
+    ]
+}
+
+StartedExecution = {
+    "pipelineExecutionId": "execution3"
+}
+
+SampleCreatedChange1 = {"eventId": "created", "fields": ["seoUrl", "status", "title"], "newSeoUrl": "created"}
+
+SampleUpdatedChange1 = {"eventId": "updated", "fields": ["seoUrl", "title"], "oldSeoUrl": "updated-1", "newSeoUrl": "updated-2"}
+
+SampleUpdatedChange2 = {"eventId": "updated", "fields": ["media", "seoUrl"], "oldSeoUrl": "updated-2", "newSeoUrl": "updated-3"}
@@ -0,0 +1,103 @@
+import os
+import json
+import threading
+import boto3
+from botocore.config import Config
+from aws_lambda_powertools import Logger
+
+# Custom Libraries
+from credentials_helper import GetCredentials, LambdaEnvironmentSession
+from model_cache_helper import InstallModelCache
+
+# Environment Variables
+AWS_MAX_POOL_CONNECTIONS = int(os.environ.get('AWS_MAX_POOL_CONNECTIONS', '10'))
+AWS_CONNECT_TIMEOUT = float(os.environ.get('AWS_CONNECT_TIMEOUT', '2'))
+AWS_READ_TIMEOUT = float(os.environ.get('AWS_READ_TIMEOUT', '10'))
+AWS_TCP_KEEPALIVE = os.environ.get('AWS_TCP_KEEPALIVE', 'true').lower() == 'true'
+PREWARM_AWS_SERVICES = [service.strip() for service in os.environ.get('PREWARM_AWS_SERVICES', '').split(',') if service.strip()]
+
+logger = Logger()
+
+_LOCK = threading.RLock()
+_SESSION = None
+_CLIENTS = {}
+_RESOURCES = {}
+
+def BaseClientConfig():
+    configOptions = {
+        'max_pool_connections': AWS_MAX_POOL_CONNECTIONS,
+        'connect_timeout': AWS_CONNECT_TIMEOUT,
+        'read_timeout': AWS_READ_TIMEOUT,
+        'retries': {'mode': 'standard'}
+    }
+
+    # tcp_keepalive is only understood by botocore >= 1.27
+    if 'tcp_keepalive' in Config.OPTION_DEFAULTS:
+        configOptions['tcp_keepalive'] = AWS_TCP_KEEPALIVE
+
+    return Config(**configOptions)
+
+def GetSession():
+    # One session per container, so every client shares the same credentials
+    # and loaded service models
+    global _SESSION
+    with _LOCK:
+        if _SESSION is None:
+            session = InstallModelCache(boto3.session.Session(botocore_session=LambdaEnvironmentSession()))
+            # Resolved once here so the cost shows up in the init log
+            GetCredentials(session)
+            _SESSION = session
+        return _SESSION
+
+def _cache_key(serviceName, configOptions):
+    return serviceName, json.dumps(configOptions, sort_keys=True)
+
+def GetClient(serviceName, **configOptions):
+    key = _cache_key(serviceName, configOptions)
+    with _LOCK:
+        if key not in _CLIENTS:
+            config = BaseClientConfig().merge(Config(**configOptions))
+            _CLIENTS[key] = GetSession().client(serviceName, config=config)
+        return _CLIENTS[key]
+
+def GetResource(serviceName, **configOptions):
+    key = _cache_key(serviceName, configOptions)
+    with _LOCK:
+        if key not in _RESOURCES:
+            config = BaseClientConfig().merge(Config(**configOptions))
+            _RESOURCES[key] = GetSession().resource(serviceName, config=config)
+        return _RESOURCES[key]
+
+class LazyProxy(object):
+    """Defers building a client, resource or table until an attribute is first used."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._target = None
+
+    def _resolve(self):
+        if self._target is None:
+            with _LOCK:
+                if self._target is None:
+                    self._target = self._factory()
+        return self._target
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+
+def LazyClient(serviceName, **configOptions):
+    return LazyProxy(lambda: GetClient(serviceName, **configOptions))
+
+def GetTable(tableName, **configOptions):
+    return LazyProxy(lambda: GetResource('dynamodb', **configOptions).Table(tableName))
+
+def PrewarmClients(services=None):
+    # Optional init-phase hook: builds the listed clients while Lambda's init
+    # phase still runs at full CPU, instead of on the first invocation
+    for serviceName in services or PREWARM_AWS_SERVICES:
+        GetClient(serviceName)
+        if serviceName == 'dynamodb':
+            GetResource(serviceName)
+
+    if services or PREWARM_AWS_SERVICES:
+        GetSession().get_credentials()
@@ -1,25 +1,349 @@
 import os
-import boto3
+import math
+import time
+import uuid
+import zlib
+import random
+import struct
+import threading
 import simplejson as json
-from decimal import Decimal
-from aws_lambda_powertools import Logger, Tracer
+from collections import OrderedDict
+from aws_lambda_powertools import Logger, Tracer, single_metric
+from aws_lambda_powertools.metrics import MetricUnit
+
+# Environment Variables
+REDIS_HOST = os.environ.get('REDIS_HOST')
+REDIS_PORT = int(os.environ.get('REDIS_PORT', '6379'))
+REDIS_SSL = os.environ.get('REDIS_SSL', 'false').lower() == 'true'
+REDIS_SOCKET_TIMEOUT = float(os.environ.get('REDIS_SOCKET_TIMEOUT', '0.2'))
+CACHE_KEY_VERSION = os.environ.get('CACHE_KEY_VERSION', 'v1')
+CACHE_METRICS_NAMESPACE = os.environ.get('CACHE_METRICS_NAMESPACE', 'EventCache')
+CACHE_COMPRESS_MIN_BYTES = int(os.environ.get('CACHE_COMPRESS_MIN_BYTES', '1024'))
+CACHE_XFETCH_BETA = float(os.environ.get('CACHE_XFETCH_BETA', '1'))
+CACHE_LOCK_TTL_MS = int(os.environ.get('CACHE_LOCK_TTL_MS', '3000'))
+CACHE_LOCK_WAIT_SECONDS = float(os.environ.get('CACHE_LOCK_WAIT_SECONDS', '0.5'))
+CACHE_LOCK_POLL_SECONDS = float(os.environ.get('CACHE_LOCK_POLL_SECONDS', '0.02'))
+
+# Cached values are a fixed header followed by compact JSON (simplejson keeps
+# Decimal exact), zlib compressed once it reaches CACHE_COMPRESS_MIN_BYTES.
+# The header holds the encoding, when the value expires and how long it took
+# to compute, which is what the early recompute below needs.
+VALUE_HEADER = struct.Struct('>Bdf')
+VALUE_FORMAT_JSON = 1
+VALUE_FORMAT_ZLIB_JSON = 2
+
+_LOCK = threading.Lock()
+_REDIS_CLIENT = None
+
+class LocalCache(object):
+    """Per-container L1 in front of Redis, an LRU of encoded values bounded
+    by their total size in bytes rather than by count.
+
+    Entries expire after `ttlSeconds`. The whole cache is dropped when the
+    Redis generation `generationName` moves, which is read at most once every
+    `checkSeconds`, so a write elsewhere is seen here within that window.
+    Values are kept encoded and decoded on every hit, callers never share a
+    mutable object.
+    """
+
+    def __init__(self, maxBytes, ttlSeconds, generationName=None, checkSeconds=1):
+        self.maxBytes = maxBytes
+        self.ttlSeconds = ttlSeconds
+        self.generationName = generationName
+        self.checkSeconds = checkSeconds
+        self.entries = OrderedDict()
+        self.currentBytes = 0
+        self.generation = None
+        self.checkedAt = None
+        self.lock = threading.Lock()
+
+    def validate(self, redisClient):
+        # Drops everything once the generation has moved. Without a reachable
+        # generation nothing is served from here.
+        if not self.generationName:
+            return True
+
+        now = time.monotonic()
+        if self.checkedAt is not None and now - self.checkedAt < self.checkSeconds:
+            return True
+
+        try:
+            generation = GetCacheGeneration(redisClient, self.generationName)
+        except Exception as ex:
+            logger.warning({'message': 'Cache generation read failed', 'error': str(ex)})
+            self.clear()
+            return False
+
+        with self.lock:
+            if generation != self.generation:
+                self.entries.clear()
+                self.currentBytes = 0
+                self.generation = generation
+            self.checkedAt = now
+        return True
+
+    def get(self, cacheKey):
+        with self.lock:
+            entry = self.entries.get(cacheKey)
+            if entry is None:
+                return None
+            rawValue, expiresAt = entry
+            if expiresAt <= time.monotonic():
+                self._remove(cacheKey)
+                return None
+            self.entries.move_to_end(cacheKey)
+            return rawValue
+
+    def set(self, cacheKey, rawValue):
+        # Values larger than the whole cache are not kept
+        if len(rawValue) > self.maxBytes:
+            return
+        with self.lock:
+            self._remove(cacheKey)
+            self.entries[cacheKey] = (rawValue, time.monotonic() + self.ttlSeconds)
+            self.currentBytes += len(rawValue)
+            while self.currentBytes > self.maxBytes:
+                self._remove(next(iter(self.entries)))
+
+    def delete(self, *cacheKeys):
+        with self.lock:
+            for cacheKey in cacheKeys:
+                self._remove(cacheKey)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.currentBytes = 0
+            self.generation = None
+            self.checkedAt = None
+
+    def _remove(self, cacheKey):
+        entry = self.entries.pop(cacheKey, None)
+        if entry is not None:
+            self.currentBytes -= len(entry[0])
 
 logger = Logger()
 tracer = Tracer()
 
+def GetRedisClient():
+    # None while no Redis is configured, the read path then goes straight to
+    # the source. redis is only imported once a host is set.
+    global _REDIS_CLIENT
+    if not REDIS_HOST:
+        return None
+
+    with _LOCK:
+        if _REDIS_CLIENT is None:
+            import redis
+            _REDIS_CLIENT = redis.Redis(
+                host=REDIS_HOST,
+                port=REDIS_PORT,
+                ssl=REDIS_SSL,
+                socket_timeout=REDIS_SOCKET_TIMEOUT,
+                socket_connect_timeout=REDIS_SOCKET_TIMEOUT
+            )
+        return _REDIS_CLIENT
+
+def CacheKey(*parts):
+    # Bumping CACHE_KEY_VERSION orphans every key written in an older format
+    return ':'.join([CACHE_KEY_VERSION] + [str(part) for part in parts])
+
+def EmitCacheMetric(cacheName, metricName, value, unit=MetricUnit.Count):
+    with single_metric(name=metricName, unit=unit, value=value, namespace=CACHE_METRICS_NAMESPACE) as metric:
+        metric.add_dimension(name='cache', value=cacheName)
+
+def EncodeCacheValue(cacheValue, expiresAt=0, computeSeconds=0):
+    payload = json.dumps(cacheValue, use_decimal=True, separators=(',', ':')).encode('utf-8')
+    valueFormat = VALUE_FORMAT_JSON
+    if len(payload) >= CACHE_COMPRESS_MIN_BYTES:
+        compressed = zlib.compress(payload, 6)
+        if len(compressed) < len(payload):
+            payload, valueFormat = compressed, VALUE_FORMAT_ZLIB_JSON
+    return VALUE_HEADER.pack(valueFormat, expiresAt, computeSeconds) + payload
+
+def DecodeCacheEntry(rawValue):
+    # Returns (value, expiresAt, computeSeconds), or None for a missing key.
+    # Plain JSON strings written before the header existed are still read.
+    if rawValue is None:
+        return None
+    if isinstance(rawValue, str):
+        rawValue = rawValue.encode('utf-8')
+
+    if rawValue[:1] not in (bytes([VALUE_FORMAT_JSON]), bytes([VALUE_FORMAT_ZLIB_JSON])):
+        return json.loads(rawValue, use_decimal=True), 0, 0
+
+    valueFormat, expiresAt, computeSeconds = VALUE_HEADER.unpack_from(rawValue)
+    payload = rawValue[VALUE_HEADER.size:]
+    if valueFormat == VALUE_FORMAT_ZLIB_JSON:
+        payload = zlib.decompress(payload)
+    return json.loads(payload, use_decimal=True), expiresAt, computeSeconds
+
+def DecodeCacheValue(rawValue):
+    entry = DecodeCacheEntry(rawValue)
+    return entry[0] if entry else None
+
 @tracer.capture_method
-def DeleteCacheValue(redisClient, cacheKey):
-    redisClient.delete(cacheKey)
+def DeleteCacheValue(redisClient, *cacheKeys):
+    # UNLINK frees large values off the Redis main thread
+    redisClient.unlink(*cacheKeys)
 
-@tracer.capture_method     
+@tracer.capture_method
 def GetCacheValue(redisClient, cacheKey):
-    cacheValue = redisClient.get(cacheKey)
-    if cacheValue:
-        return json.loads(cacheValue)
-    else:
-        return None
+    return DecodeCacheValue(redisClient.get(cacheKey))
 
 @tracer.capture_method
-def SetCacheValue(redisClient, cacheKey, cacheValue):
-    redisClient.set(cacheKey, json.dumps(cacheValue, use_decimal=True))
+def SetCacheValue(redisClient, cacheKey, cacheValue, ttlSeconds=None, computeSeconds=0):
+    expiresAt = time.time() + ttlSeconds if ttlSeconds else 0
+    redisClient.set(cacheKey, EncodeCacheValue(cacheValue, expiresAt, computeSeconds), ex=ttlSeconds)
     return cacheValue
+
+@tracer.capture_method
+def GetCacheValues(redisClient, cacheKeys):
+    # One MGET for every key, returns {cacheKey: value} for the keys found
+    if not cacheKeys:
+        return dict()
+    rawValues = redisClient.mget(cacheKeys)
+    return {cacheKey: DecodeCacheValue(rawValue) for cacheKey, rawValue in zip(cacheKeys, rawValues) if rawValue is not None}
+
+@tracer.capture_method
+def SetCacheValues(redisClient, cacheValues, ttlSeconds=None):
+    # MSET cannot set a TTL, so the keys are written with MSET and given their
+    # TTL with EXPIRE in the same non-transactional pipeline, one round trip
+    if not cacheValues:
+        return
+    expiresAt = time.time() + ttlSeconds if ttlSeconds else 0
+    pipeline = redisClient.pipeline(transaction=False)
+    pipeline.mset({cacheKey: EncodeCacheValue(cacheValue, expiresAt) for cacheKey, cacheValue in cacheValues.items()})
+    if ttlSeconds:
+        for cacheKey in cacheValues:
+            pipeline.expire(cacheKey, ttlSeconds)
+    pipeline.execute()
+
+@tracer.capture_method
+def DeleteCacheValues(redisClient, cacheKeys):
+    if cacheKeys:
+        redisClient.unlink(*cacheKeys)
+
+def GetCacheGeneration(redisClient, name):
+    # Keys of results that span many items embed a generation number, so a
+    # single INCR retires all of them instead of tracking every key
+    return int(redisClient.get(CacheKey('generation', name)) or 0)
+
+def BumpCacheGeneration(redisClient, name):
+    return redisClient.incr(CacheKey('generation', name))
+
+def ShouldRecomputeEarly(expiresAt, computeSeconds, beta=CACHE_XFETCH_BETA):
+    # Probabilistic early expiry (XFetch): the closer the entry is to expiring
+    # and the longer it took to compute, the likelier one reader refreshes it
+    # ahead of time, so concurrent readers rarely see it expire together
+    if not expiresAt or not computeSeconds:
+        return False
+    return time.time() - computeSeconds * beta * math.log(1 - random.random()) >= expiresAt
+
+def AcquireCacheLock(redisClient, cacheKey):
+    # Returns the lock token, or None when another caller holds the lock
+    token = uuid.uuid4().hex
+    if redisClient.set(f'{cacheKey}:lock', token, nx=True, px=CACHE_LOCK_TTL_MS):
+        return token
+    return None
+
+def ReleaseCacheLock(redisClient, cacheKey, token):
+    # Only the holder releases the lock. The lock expires by itself if the
+    # holder dies, and a lock that expired and was taken over is left alone.
+    lockKey = f'{cacheKey}:lock'
+    currentToken = redisClient.get(lockKey)
+    if currentToken is not None and (currentToken.decode('utf-8') if isinstance(currentToken, bytes) else currentToken) == token:
+        redisClient.unlink(lockKey)
+
+def RecomputeCacheValue(redisClient, cacheKey, loader, ttlSeconds, token):
+    # Returns the value and its encoded form, (None, None) when there is none
+    try:
+        start = time.perf_counter()
+        value = loader()
+        computeSeconds = time.perf_counter() - start
+        if value is None:
+            return None, None
+
+        rawValue = EncodeCacheValue(value, time.time() + ttlSeconds, computeSeconds)
+        try:
+            redisClient.set(cacheKey, rawValue, ex=ttlSeconds)
+        except Exception as ex:
+            logger.warning({'message': 'Cache write failed', 'cacheKey': cacheKey, 'error': str(ex)})
+        return value, rawValue
+    finally:
+        if token:
+            try:
+                ReleaseCacheLock(redisClient, cacheKey, token)
+            except Exception as ex:
+                logger.warning({'message': 'Cache unlock failed', 'cacheKey': cacheKey, 'error': str(ex)})
+
+def WaitForCacheValue(redisClient, cacheKey):
+    # Polls while another caller recomputes the value, returns its encoded
+    # form or None once the wait is over
+    deadline = time.monotonic() + CACHE_LOCK_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(CACHE_LOCK_POLL_SECONDS)
+        rawValue = redisClient.get(cacheKey)
+        if rawValue is not None:
+            return rawValue
+    return None
+
+@tracer.capture_method
+def GetOrLoadCacheValue(redisClient, cacheKey, loader, ttlSeconds, cacheName='default', localCache=None):
+    # Cache-aside read. Redis errors are logged and the value is loaded from the
+    # source, an unreachable cache must never fail the read. None is not cached.
+    # Only the caller holding the key's lock recomputes a missing value, the
+    # others wait for it briefly and load it themselves only after that.
+    if redisClient is None:
+        return loader()
+
+    if localCache is not None and localCache.validate(redisClient):
+        rawValue = localCache.get(cacheKey)
+        if rawValue is not None:
+            EmitCacheMetric(cacheName, 'LocalCacheHit', 1)
+            return DecodeCacheValue(rawValue)
+    else:
+        localCache = None
+
+    value, rawValue = LoadCacheValue(redisClient, cacheKey, loader, ttlSeconds, cacheName)
+    if localCache is not None and rawValue is not None:
+        localCache.set(cacheKey, rawValue)
+    return value
+
+def LoadCacheValue(redisClient, cacheKey, loader, ttlSeconds, cacheName):
+    # Redis part of GetOrLoadCacheValue, returns the value and its encoded form
+    start = time.perf_counter()
+    try:
+        rawValue = redisClient.get(cacheKey)
+        entry = DecodeCacheEntry(rawValue)
+    except Exception as ex:
+        logger.warning({'message': 'Cache read failed', 'cacheKey': cacheKey, 'error': str(ex)})
+        EmitCacheMetric(cacheName, 'CacheMiss', 1)
+        return loader(), None
+    EmitCacheMetric(cacheName, 'CacheLatency', (time.perf_counter() - start) * 1000, MetricUnit.Milliseconds)
+
+    try:
+        if entry is not None:
+            EmitCacheMetric(cacheName, 'CacheHit', 1)
+            value, expiresAt, computeSeconds = entry
+            if ShouldRecomputeEarly(expiresAt, computeSeconds):
+                token = AcquireCacheLock(redisClient, cacheKey)
+                if token:
+                    EmitCacheMetric(cacheName, 'CacheEarlyRecompute', 1)
+                    return RecomputeCacheValue(redisClient, cacheKey, loader, ttlSeconds, token)
+            return value, rawValue
+
+        EmitCacheMetric(cacheName, 'CacheMiss', 1)
+        token = AcquireCacheLock(redisClient, cacheKey)
+        if not token:
+            EmitCacheMetric(cacheName, 'CacheLockWait', 1)
+            rawValue = WaitForCacheValue(redisClient, cacheKey)
+            if rawValue is not None:
+                return DecodeCacheValue(rawValue), rawValue
+    except Exception as ex:
+        logger.warning({'message': 'Cache lock failed', 'cacheKey': cacheKey, 'error': str(ex)})
+        if entry is not None:
+            return entry[0], rawValue
+        token = None
+
+    return RecomputeCacheValue(redisClient, cacheKey, loader, ttlSeconds, token)
@@ -1,12 +1,192 @@
 import os
-import boto3
+import time
+import uuid
+import simplejson as json
 from aws_lambda_powertools import Logger, Tracer
+from aws_client_helper import LazyClient
+from enum_helper import RegenerationStatus
 
-CODE_PIPELINE_CLIENT = boto3.client('codepipeline')
+# Environment Variables
+REGENERATION_DEBOUNCE_SECONDS = int(os.environ.get('REGENERATION_DEBOUNCE_SECONDS', '60'))
+REGENERATION_MANIFEST_BUCKET = os.environ.get('REGENERATION_MANIFEST_BUCKET')
+# Entries held on the state item between runs, a few hundred bytes each, well
+# inside the 400 KB item limit. Past it the next run rebuilds the whole site.
+REGENERATION_MANIFEST_MAX_CHANGES = int(os.environ.get('REGENERATION_MANIFEST_MAX_CHANGES', '500'))
+
+# The build reads s3://<bucket>/<pipeline>/pending.json when it starts and
+# deletes it, no manifest there means a full rebuild
+CHANGE_MANIFEST_NAME = 'pending.json'
+
+CODE_PIPELINE_CLIENT = LazyClient('codepipeline')
+S3_CLIENT = LazyClient('s3')
 
 logger = Logger()
 tracer = Tracer()
 
 @tracer.capture_method
-def triggerPublicWebRegeneration(pipelineName):
-    CODE_PIPELINE_CLIENT.start_pipeline_execution(name=pipelineName)
+def triggerPublicWebRegeneration(pipelineName, table=None, now=None, debounceSeconds=REGENERATION_DEBOUNCE_SECONDS, changes=None):
+    # With a state table the change is recorded and at most one execution is
+    # started per debounce window, every other call only leaves the site dirty
+    # for flushPublicWebRegeneration to pick up. Without one every call starts
+    # a full rebuild. `changes` are changeManifestEntry dicts, leaving them out
+    # asks for a full rebuild. Never raises, the write that asked for it has
+    # already been committed.
+    try:
+        now = int(time.time() if now is None else now)
+        if table is None:
+            startPublicWebRegeneration(pipelineName, now, [], fullRebuild=True)
+            return RegenerationStatus.STARTED
+
+        markPublicWebDirty(pipelineName, table, now, changes)
+        return flushPublicWebRegeneration(pipelineName, table, now, debounceSeconds)
+    except Exception as ex:
+        logger.exception({'message': 'Failed to trigger public web regeneration', 'pipelineName': pipelineName, 'error': str(ex)})
+        return RegenerationStatus.FAILED
+
+def changeManifestEntry(eventId, fields, oldSeoUrl=None, newSeoUrl=None):
+    # One event in the change manifest: the fields a write touched and the
+    # seoUrl its page moved away from and to, where the write knew them
+    entry = {'eventId': eventId, 'fields': sorted(fields)}
+    if oldSeoUrl:
+        entry['oldSeoUrl'] = oldSeoUrl
+    if newSeoUrl:
+        entry['newSeoUrl'] = newSeoUrl
+    return entry
+
+def markPublicWebDirty(pipelineName, table, now, changes=None):
+    # One write per call, the changes are added to a string set on the state
+    # item and only folded per event when a run is started
+    if changes and len(changes) <= REGENERATION_MANIFEST_MAX_CHANGES:
+        changeEntries = set(json.dumps({**change, 'changedAt': time.time()}, sort_keys=True, separators=(',', ':')) for change in changes)
+        try:
+            table.update_item(
+                Key={'pipelineName': pipelineName},
+                UpdateExpression='SET lastDirtyAt=:now ADD pendingChanges :one, changeEntries :changeEntries',
+                ConditionExpression='attribute_not_exists(changeEntries) OR size(changeEntries) <= :room',
+                ExpressionAttributeValues={':now': now, ':one': 1, ':changeEntries': changeEntries, ':room': REGENERATION_MANIFEST_MAX_CHANGES - len(changeEntries)}
+            )
+            return
+        except table.meta.client.exceptions.ConditionalCheckFailedException:
+            pass
+
+    # Without changes, or past the manifest limit, the next run rebuilds everything
+    table.update_item(
+        Key={'pipelineName': pipelineName},
+        UpdateExpression='SET lastDirtyAt=:now, fullRebuild=:true ADD pendingChanges :one',
+        ExpressionAttributeValues={':now': now, ':one': 1, ':true': True}
+    )
+
+def foldChanges(changeEntries):
+    # Every change to an event since the last run folds into one manifest
+    # entry, which keeps the seoUrl the event had before the first of them
+    folded = dict()
+    for change in sorted((json.loads(changeEntry) for changeEntry in changeEntries), key=lambda change: change['changedAt']):
+        entry = folded.setdefault(change['eventId'], {'fields': set(), 'oldSeoUrl': change.get('oldSeoUrl')})
+        entry['fields'].update(change.get('fields') or [])
+        if change.get('newSeoUrl'):
+            entry['newSeoUrl'] = change['newSeoUrl']
+
+    return [changeManifestEntry(eventId, entry['fields'], entry['oldSeoUrl'], entry.get('newSeoUrl')) for eventId, entry in sorted(folded.items())]
+
+def isPipelineExecutionInProgress(pipelineName):
+    response = CODE_PIPELINE_CLIENT.list_pipeline_executions(pipelineName=pipelineName, maxResults=5)
+    return any(execution.get('status') == 'InProgress' for execution in response.get('pipelineExecutionSummaries', []))
+
+@tracer.capture_method
+def flushPublicWebRegeneration(pipelineName, table, now=None, debounceSeconds=REGENERATION_DEBOUNCE_SECONDS):
+    # Starts an execution when changes are pending, the last start is older
+    # than the debounce window and nothing is running. Also run on a schedule,
+    # so the changes left behind by the end of a burst are still published.
+    now = int(time.time() if now is None else now)
+    state = table.get_item(Key={'pipelineName': pipelineName}, ConsistentRead=True).get('Item') or {}
+
+    pendingChanges = int(state.get('pendingChanges', 0))
+    if pendingChanges <= 0:
+        return RegenerationStatus.CLEAN
+
+    lastStartedAt = state.get('lastStartedAt')
+    if lastStartedAt is not None and now - int(lastStartedAt) < debounceSeconds:
+        return RegenerationStatus.DEBOUNCED
+
+    if isPipelineExecutionInProgress(pipelineName):
+        return RegenerationStatus.IN_PROGRESS
+
+    # Claiming the window is conditional on the start time read above, so of
+    # the callers racing for the same window only one starts an execution.
+    # Only the changes seen here are taken, later ones stay pending.
+    changeEntries = set(state.get('changeEntries') or set())
+    fullRebuild = bool(state.get('fullRebuild'))
+    updateKwargs = dict()
+    updateExpression = 'SET lastStartedAt=:now ADD pendingChanges :taken'
+    expressionAttributeValues = {':now': now, ':taken': -pendingChanges}
+    if changeEntries:
+        updateExpression += ' DELETE changeEntries :changeEntries'
+        expressionAttributeValues[':changeEntries'] = changeEntries
+    if fullRebuild:
+        updateExpression += ' REMOVE fullRebuild'
+    if lastStartedAt is None:
+        updateKwargs['ConditionExpression'] = 'attribute_not_exists(lastStartedAt)'
+    else:
+        updateKwargs['ConditionExpression'] = 'lastStartedAt = :lastStartedAt'
+        expressionAttributeValues[':lastStartedAt'] = lastStartedAt
+
+    try:
+        table.update_item(
+            Key={'pipelineName': pipelineName},
+            UpdateExpression=updateExpression,
+            ExpressionAttributeValues=expressionAttributeValues,
+            **updateKwargs
+        )
+    except table.meta.client.exceptions.ConditionalCheckFailedException:
+        return RegenerationStatus.COALESCED
+
+    changes = foldChanges(changeEntries)
+    try:
+        startPublicWebRegeneration(pipelineName, now, changes, fullRebuild)
+    except Exception:
+        # The changes go back to pending for the next flush
+        restoreExpression = 'ADD pendingChanges :pending'
+        restoreValues = {':pending': pendingChanges}
+        if changeEntries:
+            restoreExpression += ', changeEntries :changeEntries'
+            restoreValues[':changeEntries'] = changeEntries
+        if fullRebuild:
+            restoreExpression += ' SET fullRebuild=:true'
+            restoreValues[':true'] = True
+        table.update_item(
+            Key={'pipelineName': pipelineName},
+            UpdateExpression=restoreExpression,
+            ExpressionAttributeValues=restoreValues
+        )
+        raise
+
+    logger.info({'message': 'Started public web regeneration', 'pipelineName': pipelineName, 'changes': pendingChanges, 'changedEvents': len(changes), 'fullRebuild': fullRebuild})
+    return RegenerationStatus.STARTED
+
+def startPublicWebRegeneration(pipelineName, now, changes, fullRebuild):
+    # The manifest is in place before the execution starts, so the build never
+    # sees a missing one or the one of the previous run. If it cannot be
+    # written nothing is started.
+    writeChangeManifest(pipelineName, now, changes, fullRebuild)
+    return CODE_PIPELINE_CLIENT.start_pipeline_execution(name=pipelineName)
+
+def changeManifestKey(pipelineName):
+    return f'{pipelineName}/{CHANGE_MANIFEST_NAME}'
+
+def writeChangeManifest(pipelineName, now, changes, fullRebuild):
+    if not REGENERATION_MANIFEST_BUCKET:
+        return
+
+    manifest = {
+        'manifestId': uuid.uuid4().hex,
+        'pipelineName': pipelineName,
+        'createdAt': now,
+        'fullRebuild': fullRebuild,
+        'changes': [] if fullRebuild else changes
+    }
+    S3_CLIENT.put_object(
+        Bucket=REGENERATION_MANIFEST_BUCKET,
+        Key=changeManifestKey(pipelineName),
+        Body=json.dumps(manifest, separators=(',', ':')),
+        ContentType='application/json'
+    )
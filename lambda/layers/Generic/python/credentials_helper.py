@@ -0,0 +1,77 @@
+import os
+import time
+import boto3
+import botocore.session
+from datetime import datetime, timedelta, timezone
+from botocore.credentials import CredentialProvider, RefreshableCredentials
+from botocore.exceptions import CredentialRetrievalError
+from aws_lambda_powertools import Logger
+
+# Lambda injects the execution role credentials as environment variables but
+# does not expose their expiry, so they are re-read on this interval
+ENVIRONMENT_CREDENTIALS_TTL = int(os.environ.get('ENVIRONMENT_CREDENTIALS_TTL', '3600'))
+
+# Last credential resolution, logged at init so cold start cost is visible
+CREDENTIAL_RESOLUTION = {'method': None, 'durationMs': None, 'resolutions': 0}
+
+logger = Logger()
+
+def _environment_credentials_metadata():
+    accessKey = os.environ.get('AWS_ACCESS_KEY_ID')
+    secretKey = os.environ.get('AWS_SECRET_ACCESS_KEY')
+    if not accessKey or not secretKey:
+        return None
+
+    expiryTime = datetime.now(timezone.utc) + timedelta(seconds=ENVIRONMENT_CREDENTIALS_TTL)
+    return {
+        'access_key': accessKey,
+        'secret_key': secretKey,
+        'token': os.environ.get('AWS_SESSION_TOKEN'),
+        'expiry_time': expiryTime.isoformat()
+    }
+
+def _refresh_environment_credentials():
+    metadata = _environment_credentials_metadata()
+    if not metadata:
+        raise CredentialRetrievalError(provider='lambda-env', error_msg='Lambda environment credentials are no longer available.')
+    return metadata
+
+def LambdaEnvironmentCredentials():
+    # Reads the runtime's credential variables directly instead of walking
+    # botocore's provider chain (config files, container and IMDS providers)
+    metadata = _environment_credentials_metadata()
+    if not metadata:
+        return None
+
+    return RefreshableCredentials.create_from_metadata(
+        metadata,
+        refresh_using=_refresh_environment_credentials,
+        method='lambda-env'
+    )
+
+class LambdaEnvironmentProvider(CredentialProvider):
+    METHOD = 'lambda-env'
+
+    def load(self):
+        return LambdaEnvironmentCredentials()
+
+def LambdaEnvironmentSession():
+    # A botocore session whose credential chain tries the Lambda environment
+    # first, the rest of the chain is only walked when it is not available
+    botocoreSession = botocore.session.get_session()
+    botocoreSession.get_component('credential_provider').insert_before('env', LambdaEnvironmentProvider())
+    return botocoreSession
+
+def GetCredentials(session=None):
+    start = time.perf_counter()
+    if session is not None:
+        credentials = session.get_credentials()
+    else:
+        credentials = LambdaEnvironmentCredentials() or boto3.session.Session().get_credentials()
+
+    CREDENTIAL_RESOLUTION['method'] = getattr(credentials, 'method', None)
+    CREDENTIAL_RESOLUTION['durationMs'] = round((time.perf_counter() - start) * 1000, 3)
+    CREDENTIAL_RESOLUTION['resolutions'] += 1
+    logger.info({'message': 'Resolved AWS credentials', **CREDENTIAL_RESOLUTION})
+
+    return credentials
@@ -1,3 +1,3 @@
-from .exceptions import BadRequestError, NotFoundError, UnauthorizedError
+from .exceptions import BadRequestError, ConflictError, NotFoundError, OpenSearchError, UnauthorizedError
 
-__all__ = ["BadRequestError", "NotFoundError", "UnauthorizedError"]
+__all__ = ["BadRequestError", "ConflictError", "NotFoundError", "OpenSearchError", "UnauthorizedError"]
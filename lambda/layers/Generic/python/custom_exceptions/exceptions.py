@@ -10,6 +10,17 @@ class NotFoundError(CustomError):
     # exception when a resource is not found in the database
     pass
 
+class ConflictError(CustomError):
+    # exception when a write was based on an outdated version of the resource
+    pass
+
 class UnauthorizedError(CustomError):
     # exception for unauthorized requests
-    pass
\ No newline at end of file
+    pass
+
+class OpenSearchError(CustomError):
+    # exception for failed requests to the OpenSearch domain
+    def __init__(self, message, statusCode=None, body=None):
+        super().__init__(message)
+        self.statusCode = statusCode
+        self.body = body
@@ -0,0 +1,64 @@
+import os
+import time
+import random
+from aws_lambda_powertools import Logger, Tracer
+
+# Environment Variables
+DYNAMODB_BATCH_MAX_ATTEMPTS = int(os.environ.get('DYNAMODB_BATCH_MAX_ATTEMPTS', '8'))
+DYNAMODB_BATCH_INITIAL_BACKOFF = float(os.environ.get('DYNAMODB_BATCH_INITIAL_BACKOFF', '0.05'))
+DYNAMODB_BATCH_MAX_BACKOFF = float(os.environ.get('DYNAMODB_BATCH_MAX_BACKOFF', '2'))
+
+logger = Logger()
+tracer = Tracer()
+
+def BackoffDelay(attempt, initialBackoff=DYNAMODB_BATCH_INITIAL_BACKOFF, maxBackoff=DYNAMODB_BATCH_MAX_BACKOFF):
+    # Full jitter, so concurrent callers that were throttled together do not retry together
+    return random.uniform(0, min(maxBackoff, initialBackoff * 2 ** attempt))
+
+@tracer.capture_method
+def BatchGetItems(table, keys, projectionFields=None, maxAttempts=DYNAMODB_BATCH_MAX_ATTEMPTS):
+    # BatchGetItem takes at most 100 keys per request and rejects repeated keys
+    uniqueKeys = []
+    for key in keys:
+        if key not in uniqueKeys:
+            uniqueKeys.append(key)
+
+    keysAndAttributes = dict()
+    if projectionFields:
+        # Attribute names are aliased so reserved words (status, region, ...) can be projected
+        attributeNames = {f'#p{index}': field for index, field in enumerate(projectionFields)}
+        keysAndAttributes['ProjectionExpression'] = ', '.join(attributeNames)
+        keysAndAttributes['ExpressionAttributeNames'] = attributeNames
+
+    items = []
+    for start in range(0, len(uniqueKeys), 100):
+        pendingKeys = uniqueKeys[start:start + 100]
+        attempt = 0
+        while pendingKeys:
+            response = table.meta.client.batch_get_item(RequestItems={table.name: {'Keys': pendingKeys, **keysAndAttributes}})
+            items.extend(response.get('Responses', {}).get(table.name, []))
+
+            pendingKeys = (response.get('UnprocessedKeys') or {}).get(table.name, {}).get('Keys', [])
+            if pendingKeys:
+                attempt += 1
+                if attempt >= maxAttempts:
+                    raise Exception(f'{len(pendingKeys)} keys still unprocessed after {attempt} attempts.')
+                time.sleep(BackoffDelay(attempt))
+
+    return items
+
+@tracer.capture_method
+def TransactWriteItems(table, actions):
+    # Actions are written with plain values like the Table resource's parameters,
+    # e.g. {'Put': {'Item': {...}, 'ConditionExpression': '...'}}, all against
+    # `table`. Returns the cancellation reason code of each action when the
+    # transaction is cancelled (None for the actions that were not the cause),
+    # [] once written.
+    transactItems = [{operation: {'TableName': table.name, **params}} for action in actions for operation, params in action.items()]
+    try:
+        table.meta.client.transact_write_items(TransactItems=transactItems)
+    except table.meta.client.exceptions.TransactionCanceledException as ex:
+        reasons = [reason.get('Code') for reason in ex.response.get('CancellationReasons', [])]
+        return [None if code == 'None' else code for code in reasons]
+
+    return []
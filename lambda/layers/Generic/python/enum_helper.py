@@ -44,3 +44,11 @@ class DynamoDBStreamEventName(str, Enum):
     MODIFY='MODIFY'
     MODIFY_OLD='MODIFY_OLD'
     MODIFY_NEW='MODIFY_NEW'
+
+class RegenerationStatus(str, Enum):
+    STARTED='STARTED'
+    CLEAN='CLEAN'
+    DEBOUNCED='DEBOUNCED'
+    IN_PROGRESS='IN_PROGRESS'
+    COALESCED='COALESCED'
+    FAILED='FAILED'
@@ -0,0 +1,47 @@
+import os
+import hashlib
+import simplejson as json
+from aws_lambda_powertools import Logger
+
+# Custom Libraries
+from cache_helper import CacheKey, DeleteCacheValue, BumpCacheGeneration, LocalCache
+
+# Environment Variables
+EVENT_CACHE_TTL = int(os.environ.get('EVENT_CACHE_TTL', '300'))
+EVENT_LIST_CACHE_TTL = int(os.environ.get('EVENT_LIST_CACHE_TTL', '30'))
+EVENT_LOCAL_CACHE_MAX_BYTES = int(os.environ.get('EVENT_LOCAL_CACHE_MAX_BYTES', '0'))
+EVENT_LOCAL_CACHE_TTL = float(os.environ.get('EVENT_LOCAL_CACHE_TTL', '5'))
+EVENT_LOCAL_CACHE_CHECK_SECONDS = float(os.environ.get('EVENT_LOCAL_CACHE_CHECK_SECONDS', '1'))
+
+# Listings depend on every event, they are retired together by bumping this generation
+EVENT_LIST_GENERATION = 'eventList'
+
+logger = Logger()
+
+def EventCacheKey(eventId):
+    return CacheKey('event', eventId)
+
+def EventListCacheKey(generation, query):
+    # The query is hashed so filters and facets of any size give a short key
+    digest = hashlib.sha1(json.dumps(query, sort_keys=True, use_decimal=True).encode('utf-8')).hexdigest()
+    return CacheKey('eventList', generation, digest)
+
+def GetEventLocalCache():
+    # Off unless EVENT_LOCAL_CACHE_MAX_BYTES is set. Every event write bumps
+    # the listing generation, so it also empties the local caches.
+    if EVENT_LOCAL_CACHE_MAX_BYTES <= 0:
+        return None
+    return LocalCache(EVENT_LOCAL_CACHE_MAX_BYTES, EVENT_LOCAL_CACHE_TTL, EVENT_LIST_GENERATION, EVENT_LOCAL_CACHE_CHECK_SECONDS)
+
+def InvalidateEventCache(redisClient, eventIds=()):
+    # Called after a write has succeeded. A failure only leaves entries to
+    # expire by their TTL, so it is logged instead of failing the write.
+    if redisClient is None:
+        return
+
+    try:
+        if eventIds:
+            DeleteCacheValue(redisClient, *[EventCacheKey(eventId) for eventId in eventIds])
+        BumpCacheGeneration(redisClient, EVENT_LIST_GENERATION)
+    except Exception as ex:
+        logger.warning({'message': 'Cache invalidation failed', 'eventIds': list(eventIds), 'error': str(ex)})
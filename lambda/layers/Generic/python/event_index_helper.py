@@ -0,0 +1,150 @@
+import time
+from aws_lambda_powertools import Logger, Tracer
+
+# Custom Libraries
+from custom_exceptions import OpenSearchError
+
+# Readers and writers always go through the alias, the versioned index behind
+# it is swapped atomically when the mapping changes
+EVENT_INDEX_ALIAS = 'event'
+EVENT_INDEX_VERSION = 1
+EVENT_INDEX_TEMPLATE = 'event-template'
+
+# Case and accent insensitive keyword used for sorting
+SORT_NORMALIZER = 'sort_normalizer'
+
+# Source field -> field the listing sorts on
+EVENT_SORT_FIELDS = {
+    'title': 'title.sort',
+    'venue': 'venue.sort',
+    'status': 'status',
+    'region': 'region',
+    'category': 'category',
+    'topic': 'topic',
+    'eventId': 'eventId',
+    'eventDate': 'eventDate',
+    'createdAt': 'createdAt',
+    'updatedAt': 'updatedAt'
+}
+
+# Exact-value fields that can be filtered and counted
+EVENT_KEYWORD_FIELDS = ['status', 'venue', 'region', 'category', 'topic']
+
+# Returned in _source but never searched, sorted or aggregated on
+EVENT_DISPLAY_FIELDS = [
+    'displayAdmission', 'displayDate', 'displayVenue', 'admission', 'openingHours',
+    'organizer', 'media', 'ticketUrl', 'websiteUrl', 'facebookUrl', 'instagramUrl'
+]
+
+logger = Logger()
+tracer = Tracer()
+
+def EventIndexName(version=EVENT_INDEX_VERSION):
+    return f'{EVENT_INDEX_ALIAS}-v{version}'
+
+def EventIndexSettings():
+    return {
+        'analysis': {
+            'normalizer': {
+                SORT_NORMALIZER: {'type': 'custom', 'filter': ['lowercase', 'asciifolding']}
+            }
+        }
+    }
+
+def EventIndexMappings():
+    sortKeyword = {'type': 'keyword', 'normalizer': SORT_NORMALIZER}
+    displayOnly = {'type': 'keyword', 'index': False, 'doc_values': False}
+
+    properties = {
+        'eventId': {'type': 'keyword'},
+        'title': {'type': 'text', 'fields': {'sort': sortKeyword}},
+        'shortDescription': {'type': 'text'},
+        'longDescription': {'type': 'text'},
+        'venue': {'type': 'keyword', 'fields': {'sort': sortKeyword}},
+        'status': {'type': 'keyword'},
+        'region': {'type': 'keyword'},
+        'category': {'type': 'keyword'},
+        'topic': {'type': 'keyword'},
+        'seoUrl': {'type': 'keyword', 'doc_values': False},
+        'isHighlighted': {'type': 'boolean'},
+        'isDeleted': {'type': 'boolean'},
+        'eventDate': {'type': 'date', 'ignore_malformed': True},
+        'createdAt': {'type': 'date'},
+        'createdBy': {'type': 'keyword', 'doc_values': False},
+        'updatedAt': {'type': 'date'},
+        'updatedBy': {'type': 'keyword', 'doc_values': False}
+    }
+    for field in EVENT_DISPLAY_FIELDS:
+        properties[field] = dict(displayOnly)
+
+    # Unmapped attributes stay in _source without growing the mapping
+    return {'dynamic': False, 'properties': properties}
+
+def EventIndexTemplate():
+    return {
+        'index_patterns': [f'{EVENT_INDEX_ALIAS}-v*'],
+        'template': {
+            'settings': EventIndexSettings(),
+            'mappings': EventIndexMappings()
+        }
+    }
+
+@tracer.capture_method
+def PutEventIndexTemplate(transport):
+    return transport.request('PUT', f'/_index_template/{EVENT_INDEX_TEMPLATE}', EventIndexTemplate())
+
+@tracer.capture_method
+def CreateEventIndex(transport, version=EVENT_INDEX_VERSION):
+    # Settings and mappings are passed explicitly as well, so the index is
+    # correct even when the template was not installed first
+    indexName = EventIndexName(version)
+    transport.request('PUT', f'/{indexName}', {'settings': EventIndexSettings(), 'mappings': EventIndexMappings()})
+    return indexName
+
+@tracer.capture_method
+def GetEventAliasIndices(transport):
+    # Returns the indices behind the alias, or None when the name is still a
+    # concrete (dynamically mapped) index rather than an alias
+    try:
+        response = transport.request('GET', f'/_alias/{EVENT_INDEX_ALIAS}')
+    except OpenSearchError as ex:
+        if ex.statusCode == 404:
+            return []
+        raise
+
+    if EVENT_INDEX_ALIAS in response:
+        return None
+    return sorted(response)
+
+@tracer.capture_method
+def ReindexEvents(transport, sourceIndex, destIndex, pollInterval=5):
+    # Runs as a task so a large copy is not bound by the HTTP read timeout
+    response = transport.request('POST', '/_reindex', {
+        'source': {'index': sourceIndex},
+        'dest': {'index': destIndex}
+    }, params={'wait_for_completion': 'false', 'slices': 'auto'})
+
+    taskId = response.get('task')
+    while True:
+        task = transport.request('GET', f'/_tasks/{taskId}')
+        if task.get('completed'):
+            break
+        logger.info({'message': 'Reindex in progress', 'task': taskId, 'status': task.get('task', {}).get('status')})
+        time.sleep(pollInterval)
+
+    result = task.get('response', {})
+    if task.get('error') or result.get('failures'):
+        raise OpenSearchError('Reindex into ' + destIndex + ' failed.', 500, task.get('error') or result.get('failures'))
+    return result
+
+@tracer.capture_method
+def SwapEventAlias(transport, destIndex, currentIndices, removeLegacyIndex=False):
+    # One _aliases call, so readers never see a missing or half-populated index
+    actions = [{'add': {'index': destIndex, 'alias': EVENT_INDEX_ALIAS, 'is_write_index': True}}]
+    if removeLegacyIndex:
+        actions.insert(0, {'remove_index': {'index': EVENT_INDEX_ALIAS}})
+    for indexName in currentIndices or []:
+        if indexName != destIndex:
+            actions.insert(0, {'remove': {'index': indexName, 'alias': EVENT_INDEX_ALIAS}})
+
+    return transport.request('POST', '/_aliases', {'actions': actions})
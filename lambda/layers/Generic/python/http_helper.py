@@ -1,12 +1,18 @@
+import re
 import simplejson as json
 from aws_lambda_powertools import Logger, Tracer
 
+# Custom Libraries
+from custom_exceptions import BadRequestError
+
+ETAG_VERSION_PATTERN = re.compile(r'^(?:W/)?"?(\d+)"?$')
+
 logger = Logger()
 tracer = Tracer()
 
 @tracer.capture_method
-def HttpResponse(statusCode, *, origin, data={}):
-    return {
+def HttpResponse(statusCode, *, origin, data={}, headers=None):
+    response = {
         'statusCode': statusCode,
         'headers': {
             'content-type': 'application/json',
@@ -20,4 +26,24 @@ def HttpResponse(statusCode, *, origin, data={}):
             'Access-Control-Allow-Methods': 'OPTIONS,POST,GET,PUT,DELETE'
         },
         'body': json.dumps(data, use_decimal=True)
-    }
\ No newline at end of file
+    }
+    if headers:
+        response['headers'].update(headers)
+        response['headers']['Access-Control-Expose-Headers'] = ', '.join(headers)
+    return response
+
+def VersionETag(version):
+    return f'"{int(version)}"'
+
+def GetIfMatchVersion(event):
+    # The version a write is based on, from an If-Match header holding an ETag
+    # returned earlier. None when the header is absent.
+    headers = {key.lower(): value for key, value in (event.get('headers') or {}).items()}
+    ifMatch = headers.get('if-match')
+    if ifMatch is None:
+        return None
+
+    match = ETAG_VERSION_PATTERN.match(ifMatch.strip())
+    if not match:
+        raise BadRequestError('Invalid If-Match header.')
+    return int(match.group(1))
\ No newline at end of file
@@ -0,0 +1,55 @@
+import os
+import mmap
+import marshal
+import boto3
+import botocore
+from botocore.loaders import JSONFileLoader
+from aws_lambda_powertools import Logger
+
+# Written next to each service model JSON by cdk_stacks/build_scripts/compile_service_models.py
+MODEL_CACHE_EXTENSION = '.marshal'
+MODEL_CACHE_FORMAT = 1
+
+MODEL_CACHE_ENABLED = os.environ.get('MODEL_CACHE_ENABLED', 'false').lower() == 'true'
+
+logger = Logger()
+
+def LoadModelCache(filePath):
+    # Returns None when the cache is missing, unreadable, built by another
+    # interpreter or built for another botocore version
+    try:
+        with open(filePath + MODEL_CACHE_EXTENSION, 'rb') as fp:
+            with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                cacheFormat, botocoreVersion, data = marshal.loads(buffer)
+    except (OSError, ValueError, EOFError, TypeError):
+        return None
+
+    if cacheFormat != MODEL_CACHE_FORMAT or botocoreVersion != botocore.__version__:
+        logger.debug({'message': 'Stale service model cache', 'path': filePath, 'botocoreVersion': botocoreVersion})
+        return None
+
+    return data
+
+class MarshalFileLoader(JSONFileLoader):
+    """JSONFileLoader that reads the precompiled marshal form of a model and
+    falls back to the JSON file when the cache is missing or stale."""
+
+    def exists(self, file_path):
+        return os.path.isfile(file_path + MODEL_CACHE_EXTENSION) or super().exists(file_path)
+
+    def load_file(self, file_path):
+        data = LoadModelCache(file_path)
+        if data is None:
+            return super().load_file(file_path)
+        return data
+
+def InstallModelCache(session=None):
+    # Must run before the session creates its first client or resource, the
+    # loader memoizes every model it has already parsed
+    if not MODEL_CACHE_ENABLED:
+        return session
+
+    session = session or boto3._get_default_session()
+    botocoreSession = getattr(session, '_session', session)
+    botocoreSession.get_component('data_loader').file_loader = MarshalFileLoader()
+    return session
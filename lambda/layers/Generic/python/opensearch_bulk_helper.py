@@ -0,0 +1,80 @@
+import time
+import simplejson as json
+from elastic_transport import ApiResponseMeta, HttpHeaders
+from elasticsearch.exceptions import ApiError
+from aws_lambda_powertools import Logger, Tracer
+
+# Custom Libraries
+from custom_exceptions import OpenSearchError
+
+logger = Logger()
+tracer = Tracer()
+
+class BulkSerializer(object):
+    mimetype = 'application/json'
+
+    def dumps(self, data):
+        # Stream images carry numbers as Decimal
+        if isinstance(data, (str, bytes)):
+            return data
+        return json.dumps(data, use_decimal=True, separators=(',', ':'))
+
+    def loads(self, data):
+        return json.loads(data, use_decimal=True)
+
+class BulkSerializers(object):
+    def __init__(self):
+        self.serializer = BulkSerializer()
+
+    def get_serializer(self, mimetype):
+        return self.serializer
+
+class BulkTransport(object):
+    def __init__(self):
+        self.serializers = BulkSerializers()
+
+class BulkResponse(object):
+    def __init__(self, body):
+        self.body = body
+
+class OpenSearchBulkClient(object):
+    """Just enough of the Elasticsearch client for `elasticsearch.helpers` bulk helpers.
+
+    The elasticsearch 8 client refuses to talk to OpenSearch (product check),
+    so the helpers' chunking, per-item results and 429 retries are driven over
+    the pooled, SigV4 signed OpenSearchTransport instead.
+    """
+
+    def __init__(self, transport, onResponse=None):
+        self.osTransport = transport
+        self.transport = BulkTransport()
+        self._client_meta = ()
+        # Called with (bulkLines, seconds, statusCode, throttledItems) after each bulk request
+        self.onResponse = onResponse
+
+    def options(self, **kwargs):
+        return self
+
+    @tracer.capture_method
+    def bulk(self, operations, **kwargs):
+        body = b'\n'.join(operation if isinstance(operation, bytes) else operation.encode('utf-8') for operation in operations) + b'\n'
+        start = time.perf_counter()
+        try:
+            response = self.osTransport.request('POST', '/_bulk', body, params=kwargs or None, headers={'Content-Type': 'application/x-ndjson'})
+        except OpenSearchError as ex:
+            self._notify(operations, start, ex.statusCode, 0)
+            # The helpers only turn ApiError into per-item failures and retries
+            meta = ApiResponseMeta(ex.statusCode, 'HTTP/1.1', HttpHeaders(), 0.0, None)
+            raise ApiError(str(ex), meta, ex.body)
+
+        throttledItems = 0
+        if response.get('errors'):
+            throttledItems = sum(1 for item in response.get('items', []) for info in item.values() if info.get('status') == 429)
+        self._notify(operations, start, 200, throttledItems)
+
+        logger.debug({'message': 'OpenSearch bulk', 'operations': len(operations), 'errors': response.get('errors'), **self.osTransport.lastTimings})
+        return BulkResponse(response)
+
+    def _notify(self, operations, start, statusCode, throttledItems):
+        if self.onResponse:
+            self.onResponse(len(operations), time.perf_counter() - start, statusCode, throttledItems)
@@ -0,0 +1,137 @@
+import os
+import time
+import threading
+import requests
+import simplejson as json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from aws_lambda_powertools import Logger, Tracer
+
+# Custom Libraries
+from custom_exceptions import OpenSearchError
+
+# Environment Variables
+OPENSEARCH_POOL_MAXSIZE = int(os.environ.get('OPENSEARCH_POOL_MAXSIZE', '10'))
+OPENSEARCH_CONNECT_TIMEOUT = float(os.environ.get('OPENSEARCH_CONNECT_TIMEOUT', '2'))
+OPENSEARCH_READ_TIMEOUT = float(os.environ.get('OPENSEARCH_READ_TIMEOUT', '10'))
+
+logger = Logger()
+tracer = Tracer()
+
+# Connection setup time of the request currently running on this thread
+_CONNECTION_TIMINGS = threading.local()
+
+def _add_connection_timing(name, seconds):
+    setattr(_CONNECTION_TIMINGS, name, getattr(_CONNECTION_TIMINGS, name, 0.0) + seconds)
+
+class TimedHTTPConnection(HTTPConnection):
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            _add_connection_timing('connect', time.perf_counter() - start)
+
+class TimedHTTPSConnection(HTTPSConnection):
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            _add_connection_timing('connect', time.perf_counter() - start)
+
+    def connect(self):
+        # connect() opens the socket through _new_conn() and then wraps it in
+        # TLS, so whatever is not TCP connect time is the handshake
+        start = time.perf_counter()
+        connectBefore = getattr(_CONNECTION_TIMINGS, 'connect', 0.0)
+        try:
+            super().connect()
+        finally:
+            tcpTime = getattr(_CONNECTION_TIMINGS, 'connect', 0.0) - connectBefore
+            _add_connection_timing('tls', time.perf_counter() - start - tcpTime)
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+class TimedHTTPAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool
+        }
+
+def _error_body(response):
+    # Errors from in front of the domain (a 502 or 504 page from its load
+    # balancer, a plain-text 429) are not JSON and are passed on as text
+    if 'json' in response.headers.get('Content-Type', ''):
+        try:
+            return json.loads(response.content)
+        except ValueError:
+            pass
+    return response.text
+
+class OpenSearchTransport(object):
+    """Keep-alive HTTP transport to an OpenSearch domain.
+
+    Created once per container so warm invocations reuse pooled connections
+    instead of paying a TCP and TLS handshake per request. Timings of the last
+    request are kept in `lastTimings`.
+    """
+
+    def __init__(self, endpoint, auth, poolMaxsize=OPENSEARCH_POOL_MAXSIZE, connectTimeout=OPENSEARCH_CONNECT_TIMEOUT, readTimeout=OPENSEARCH_READ_TIMEOUT):
+        self.baseUrl = endpoint if endpoint.startswith('http') else 'https://' + endpoint
+        self.timeout = (connectTimeout, readTimeout)
+        self.lastTimings = {}
+
+        # Only connection failures are retried, a dropped keep-alive connection
+        # surfaces as one and is transparently replaced
+        adapter = TimedHTTPAdapter(pool_connections=1, pool_maxsize=poolMaxsize, max_retries=Retry(total=2, connect=2, read=0, status=0))
+
+        self.session = requests.Session()
+        self.session.auth = auth
+        self.session.headers.update({'Content-Type': 'application/json'})
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @tracer.capture_method
+    def request(self, method, path, body=None, params=None, headers=None):
+        _CONNECTION_TIMINGS.connect = 0.0
+        _CONNECTION_TIMINGS.tls = 0.0
+
+        data = body if body is None or isinstance(body, (str, bytes)) else json.dumps(body, use_decimal=True)
+
+        start = time.perf_counter()
+        response = self.session.request(method, self.baseUrl + path, data=data, params=params, headers=headers, timeout=self.timeout)
+        received = time.perf_counter()
+
+        if response.status_code >= 400:
+            responseBody = _error_body(response)
+        else:
+            # Parse the raw bytes, response.text would run charset detection first
+            responseBody = json.loads(response.content) if response.content else {}
+        parsed = time.perf_counter()
+
+        connectTime = _CONNECTION_TIMINGS.connect
+        tlsTime = _CONNECTION_TIMINGS.tls
+        self.lastTimings = {
+            'connectMs': round(connectTime * 1000, 3),
+            'tlsMs': round(tlsTime * 1000, 3),
+            'requestMs': round((received - start - connectTime - tlsTime) * 1000, 3),
+            'parseMs': round((parsed - received) * 1000, 3),
+            'reusedConnection': connectTime == 0.0,
+            'responseBytes': len(response.content)
+        }
+        tracer.put_metadata('opensearch_timings', self.lastTimings)
+        logger.debug({'message': 'OpenSearch request', 'method': method, 'path': path, **self.lastTimings})
+
+        if response.status_code >= 400:
+            raise OpenSearchError(f'OpenSearch request failed with status {response.status_code}.', response.status_code, responseBody)
+
+        return responseBody
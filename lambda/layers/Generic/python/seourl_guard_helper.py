@@ -0,0 +1,30 @@
+# seoUrl uniqueness is reserved with a guard item in the Event table itself,
+# keyed `seoUrl#<value>` and written in the same transaction as the event, so
+# two writers can never both claim a seoUrl. Guard items carry only the owning
+# eventId and have no seoUrl attribute, which keeps them out of gsi-seoUrl.
+SEOURL_GUARD_PREFIX = 'seoUrl#'
+SEOURL_CONFLICT_REASON = 'ConditionalCheckFailed'
+
+def SeoUrlGuardId(seoUrl):
+    return f'{SEOURL_GUARD_PREFIX}{seoUrl}'
+
+def IsSeoUrlGuard(eventId):
+    return isinstance(eventId, str) and eventId.startswith(SEOURL_GUARD_PREFIX)
+
+def SeoUrlGuardPut(seoUrl, eventId):
+    # Succeeds when the seoUrl is free or already reserved by the same event
+    return {'Put': {
+        'Item': {'eventId': SeoUrlGuardId(seoUrl), 'ownerEventId': eventId},
+        'ConditionExpression': 'attribute_not_exists(#eventId) OR #ownerEventId = :ownerEventId',
+        'ExpressionAttributeNames': {'#eventId': 'eventId', '#ownerEventId': 'ownerEventId'},
+        'ExpressionAttributeValues': {':ownerEventId': eventId}
+    }}
+
+def SeoUrlGuardDelete(seoUrl, eventId):
+    # Events written before the guards existed have none to release
+    return {'Delete': {
+        'Key': {'eventId': SeoUrlGuardId(seoUrl)},
+        'ConditionExpression': 'attribute_not_exists(#eventId) OR #ownerEventId = :ownerEventId',
+        'ExpressionAttributeNames': {'#eventId': 'eventId', '#ownerEventId': 'ownerEventId'},
+        'ExpressionAttributeValues': {':ownerEventId': eventId}
+    }}
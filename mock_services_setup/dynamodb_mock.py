@@ -1,3 +1,4 @@
+import zlib
 from contextlib import contextmanager
 
 @contextmanager
@@ -51,4 +52,15 @@ def DynamoDB_Table_Mock(dynamodbResource, tableName, partitionKey, globalSeconda
 def DynamoDB_Get_Item(dynamodbResource, tableName, partitionKey, partitionKeyValue):
     table = dynamodbResource.Table(tableName)
     item = table.get_item(Key={partitionKey: partitionKeyValue}).get('Item')
-    return item
\ No newline at end of file
+    return item
+
+def DynamoDB_Segmented_Scan(table, partitionKey):
+    # moto ignores Segment/TotalSegments and returns the whole table to every
+    # segment, so items are split between segments by a hash of their key
+    def scan(Segment=None, TotalSegments=None, **kwargs):
+        response = table.scan(**kwargs)
+        if TotalSegments:
+            response['Items'] = [item for item in response['Items'] if zlib.crc32(item[partitionKey].encode()) % TotalSegments == Segment]
+        return response
+
+    return scan
@@ -0,0 +1,89 @@
+import json
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Minimal local OpenSearch that answers _bulk requests, so bulk indexing can
+# be exercised over a real HTTP connection instead of a patched session
+class OpenSearchBulkStub(object):
+    def __init__(self):
+        self.documents = {}
+        self.failures = {}
+        self.bulkRequests = 0
+        self.indexedDocuments = 0
+        # Number of upcoming bulk requests whose items are all rejected with 429
+        self.throttledRequests = 0
+        self.lock = threading.Lock()
+
+    def process_bulk(self, body):
+        lines = [json.loads(line) for line in body.decode('utf-8').splitlines() if line.strip()]
+        items = []
+        with self.lock:
+            throttled = self.throttledRequests > 0
+            self.throttledRequests = max(self.throttledRequests - 1, 0)
+
+        index = 0
+        while index < len(lines):
+            operation, metadata = next(iter(lines[index].items()))
+            documentId = metadata.get('_id')
+            index += 1
+
+            source = None
+            if operation != 'delete':
+                source = lines[index]
+                index += 1
+
+            with self.lock:
+                status = 429 if throttled else self.failures.get(documentId)
+                if status:
+                    item = {'_id': documentId, 'status': status, 'error': {'type': 'stub_failure'}}
+                elif operation == 'delete':
+                    status = 200 if self.documents.pop(documentId, None) is not None else 404
+                    item = {'_id': documentId, 'status': status, 'result': 'deleted' if status == 200 else 'not_found'}
+                else:
+                    self.documents[documentId] = source
+                    self.indexedDocuments += 1
+                    item = {'_id': documentId, 'status': 201, 'result': 'created'}
+            items.append({operation: item})
+
+        return {'took': 1, 'errors': any(next(iter(item.values()))['status'] >= 300 for item in items), 'items': items}
+
+def _handler_class(stub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if self.path.split('?')[0] == '/_bulk':
+                with stub.lock:
+                    stub.bulkRequests += 1
+                payload = json.dumps(stub.process_bulk(body)).encode('utf-8')
+                status = 200
+            else:
+                payload = b'{}'
+                status = 404
+
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+@contextmanager
+def OpenSearch_Bulk_Stub():
+    stub = OpenSearchBulkStub()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _handler_class(stub))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    stub.url = f'http://127.0.0.1:{server.server_address[1]}'
+    try:
+        yield stub
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,140 @@
+import time
+import threading
+
+class FakeRedis(object):
+    # In-process stand-in for the few redis.Redis commands the cache helpers
+    # use. Values are kept as bytes like Redis returns them, expiry is checked
+    # on access.
+
+    def __init__(self):
+        self.values = dict()
+        self.expiries = dict()
+        self.lock = threading.Lock()
+        self.commands = []
+
+    def _expire_key(self, key):
+        expiry = self.expiries.get(key)
+        if expiry is not None and expiry <= time.monotonic():
+            self.values.pop(key, None)
+            self.expiries.pop(key, None)
+
+    def _encode(self, value):
+        if isinstance(value, bytes):
+            return value
+        return str(value).encode('utf-8')
+
+    def get(self, key):
+        with self.lock:
+            self.commands.append(('get', key))
+            self._expire_key(key)
+            return self.values.get(key)
+
+    def set(self, key, value, ex=None, px=None, nx=False):
+        with self.lock:
+            self.commands.append(('set', key))
+            self._expire_key(key)
+            if nx and key in self.values:
+                return None
+            self.values[key] = self._encode(value)
+            self.expiries.pop(key, None)
+            if ex:
+                self.expiries[key] = time.monotonic() + ex
+            elif px:
+                self.expiries[key] = time.monotonic() + px / 1000
+            return True
+
+    def _delete_keys(self, command, keys):
+        with self.lock:
+            self.commands.append((command,) + keys)
+            deleted = 0
+            for key in keys:
+                self._expire_key(key)
+                if self.values.pop(key, None) is not None:
+                    deleted += 1
+                self.expiries.pop(key, None)
+            return deleted
+
+    def delete(self, *keys):
+        return self._delete_keys('delete', keys)
+
+    def unlink(self, *keys):
+        return self._delete_keys('unlink', keys)
+
+    def mget(self, keys):
+        with self.lock:
+            self.commands.append(('mget',) + tuple(keys))
+            for key in keys:
+                self._expire_key(key)
+            return [self.values.get(key) for key in keys]
+
+    def mset(self, mapping):
+        with self.lock:
+            self.commands.append(('mset',) + tuple(mapping))
+            for key, value in mapping.items():
+                self.values[key] = self._encode(value)
+                self.expiries.pop(key, None)
+            return True
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def incr(self, key, amount=1):
+        with self.lock:
+            self.commands.append(('incr', key))
+            self._expire_key(key)
+            value = int(self.values.get(key) or 0) + amount
+            self.values[key] = self._encode(value)
+            return value
+
+    def exists(self, *keys):
+        with self.lock:
+            for key in keys:
+                self._expire_key(key)
+            return sum(1 for key in keys if key in self.values)
+
+    def expire(self, key, seconds):
+        with self.lock:
+            self._expire_key(key)
+            if key not in self.values:
+                return False
+            self.expiries[key] = time.monotonic() + seconds
+            return True
+
+    def ttl(self, key):
+        with self.lock:
+            self._expire_key(key)
+            if key not in self.values:
+                return -2
+            if key not in self.expiries:
+                return -1
+            return int(round(self.expiries[key] - time.monotonic()))
+
+    def flushall(self):
+        with self.lock:
+            self.values.clear()
+            self.expiries.clear()
+            self.commands.clear()
+
+class FakePipeline(object):
+    # Queues commands and runs them in order on execute(), like a
+    # non-transactional redis-py pipeline
+
+    def __init__(self, redisClient):
+        self.redisClient = redisClient
+        self.queued = []
+
+    def __getattr__(self, name):
+        command = getattr(self.redisClient, name)
+        def queue(*args, **kwargs):
+            self.queued.append((command, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        self.redisClient.commands.append(('pipeline', len(self.queued)))
+        results = [command(*args, **kwargs) for command, args, kwargs in self.queued]
+        self.queued = []
+        return results
+
+def Redis_Mock():
+    return FakeRedis()
@@ -0,0 +1,66 @@
+"""Write the seoUrl guard item of every event created before the guards existed.
+
+AdminCreateEvent and AdminUpdateEvent reserve a seoUrl with a `seoUrl#<value>`
+guard item in the Event table. Events written before then have none, so until
+this has run a new event could still claim their seoUrl. Safe to rerun: a guard
+that is already owned by the same event is left as it is. seoUrls already
+shared by several events are reported and keep the guard of the first event
+scanned.
+
+    python3 scripts/backfill_seourl_guards.py --table Event
+    python3 scripts/backfill_seourl_guards.py --table Event --dry-run
+"""
+import argparse
+import os
+import sys
+
+MAIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAYERS_DIR = os.path.join(MAIN_DIR, 'lambda', 'layers')
+sys.path[:0] = [os.path.join(LAYERS_DIR, layer, 'python') for layer in sorted(os.listdir(LAYERS_DIR))]
+
+import boto3
+
+from seourl_guard_helper import IsSeoUrlGuard, SeoUrlGuardPut
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--table', default=os.environ.get('EVENT_TABLE'))
+    parser.add_argument('--region', default=os.environ.get('AWS_DEFAULT_REGION', 'ap-southeast-1'))
+    parser.add_argument('--dry-run', action='store_true', help='Only count the events that need a guard')
+    args = parser.parse_args()
+
+    if not args.table:
+        parser.error('--table or EVENT_TABLE is required')
+
+    table = boto3.resource('dynamodb', region_name=args.region).Table(args.table)
+    client = table.meta.client
+    scanKwargs = {'ProjectionExpression': '#eventId, #seoUrl', 'ExpressionAttributeNames': {'#eventId': 'eventId', '#seoUrl': 'seoUrl'}}
+
+    written, conflicts = 0, []
+    while True:
+        response = table.scan(**scanKwargs)
+        for item in response.get('Items', []):
+            if IsSeoUrlGuard(item['eventId']) or not item.get('seoUrl'):
+                continue
+            if args.dry_run:
+                written += 1
+                continue
+
+            guard = SeoUrlGuardPut(item['seoUrl'], item['eventId'])['Put']
+            try:
+                table.put_item(**guard)
+                written += 1
+            except client.exceptions.ConditionalCheckFailedException:
+                conflicts.append(item)
+
+        if 'LastEvaluatedKey' not in response:
+            break
+        scanKwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    print(f'{"Would write" if args.dry_run else "Wrote"} {written} guards')
+    for item in conflicts:
+        print(f'seoUrl `{item["seoUrl"]}` of {item["eventId"]} is already reserved by another event')
+    return 1 if conflicts else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""Install the event index template and move the `event` alias to a new versioned index.
+
+Creates event-v<version> with the explicit mapping from the Generic layer's
+event_index_helper, copies the documents from whatever `event` currently points
+at, and swaps the alias in one _aliases call. When `event` is still the
+original dynamically mapped index it has to be deleted in that same call
+before the name can become an alias, which only happens with
+--remove-legacy-index. Writes that reach the old index during the copy are not
+carried over, so pause writers or re-sync from DynamoDB afterwards.
+
+    python3 scripts/bootstrap_event_index.py --endpoint search-xxx.ap-southeast-1.es.amazonaws.com
+    python3 scripts/bootstrap_event_index.py --version 2 --dry-run
+"""
+import argparse
+import os
+import sys
+
+MAIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAYERS_DIR = os.path.join(MAIN_DIR, 'lambda', 'layers')
+sys.path[:0] = [os.path.join(LAYERS_DIR, layer, 'python') for layer in sorted(os.listdir(LAYERS_DIR))]
+
+import boto3
+import simplejson as json
+from requests_aws4auth import AWS4Auth
+
+from opensearch_helper import OpenSearchTransport
+from event_index_helper import (
+    EVENT_INDEX_ALIAS,
+    EVENT_INDEX_VERSION,
+    EventIndexName,
+    EventIndexTemplate,
+    PutEventIndexTemplate,
+    CreateEventIndex,
+    GetEventAliasIndices,
+    ReindexEvents,
+    SwapEventAlias
+)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--endpoint', default=os.environ.get('ES_DOMAIN_ENDPOINT'))
+    parser.add_argument('--region', default=os.environ.get('AWS_DEFAULT_REGION', 'ap-southeast-1'))
+    parser.add_argument('--version', type=int, default=EVENT_INDEX_VERSION)
+    parser.add_argument('--remove-legacy-index', action='store_true', help='Delete the dynamically mapped `event` index once its documents are copied')
+    parser.add_argument('--dry-run', action='store_true', help='Print the index template and exit')
+    args = parser.parse_args()
+
+    if args.dry_run:
+        print(json.dumps(EventIndexTemplate(), indent=2))
+        return 0
+    if not args.endpoint:
+        parser.error('--endpoint or ES_DOMAIN_ENDPOINT is required')
+
+    credentials = boto3.session.Session().get_credentials()
+    auth = AWS4Auth(region=args.region, service='es', refreshable_credentials=credentials)
+    transport = OpenSearchTransport(args.endpoint, auth, readTimeout=60)
+
+    destIndex = EventIndexName(args.version)
+    currentIndices = GetEventAliasIndices(transport)
+    isLegacyIndex = currentIndices is None
+    if isLegacyIndex and not args.remove_legacy_index:
+        print(f'`{EVENT_INDEX_ALIAS}` is a concrete index, rerun with --remove-legacy-index to replace it with an alias')
+        return 1
+    if currentIndices and destIndex in currentIndices:
+        print(f'`{EVENT_INDEX_ALIAS}` already points at {destIndex}')
+        return 0
+
+    PutEventIndexTemplate(transport)
+    CreateEventIndex(transport, args.version)
+    print(f'Created {destIndex}')
+
+    sourceIndices = [EVENT_INDEX_ALIAS] if isLegacyIndex else currentIndices
+    if sourceIndices:
+        result = ReindexEvents(transport, sourceIndices, destIndex)
+        print(f'Copied {result.get("created", 0)} documents into {destIndex} in {result.get("took", 0)} ms')
+        transport.request('POST', f'/{destIndex}/_refresh')
+
+    SwapEventAlias(transport, destIndex, currentIndices, removeLegacyIndex=isLegacyIndex)
+    print(f'`{EVENT_INDEX_ALIAS}` now points at {destIndex}')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())